@@ -1,12 +1,31 @@
+import os
 import sys
 import math
+import time
+import functools
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                             QTreeWidget, QTreeWidgetItem, QInputDialog)
-from PyQt5.QtGui import QPainter, QPen, QBrush
+                             QTreeWidget, QTreeWidgetItem, QInputDialog, QMessageBox, QFileDialog, QCheckBox)
+from PyQt5.QtGui import QPainter, QPen, QBrush, QPixmap
 from PyQt5.QtCore import Qt, QRectF
 from PyQt5.QtCore import pyqtSignal
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from tsp import solvers
+from tsp.cache import SolveCache
+from tsp.chart import ConvergenceChart
+from tsp.graph import Graph
+from tsp.incremental import IncrementalTour
+from tsp.exact import HELD_KARP_MAX_VERTICES
+from tsp.formats import FormatError, read_graphs, write_graph
+from tsp.solvers import SolverError
+from tsp.spatial import GridIndex
+from tsp.worker import SolverWorker
+
+HELD_KARP_CONFIRM_MB = 256
+BRANCH_AND_BOUND_TIME_LIMIT = 30.0
+IMPORT_EDGE_LIMIT = 2000
+GRAPH_FILE_FILTER = "Графы (*.json *.tsp *.atsp *.csv *.tspm);;Все файлы (*)"
 
 
 class Vertex:
@@ -25,6 +44,8 @@ class Edge:
 
 class GraphWidget(QWidget):
     edge_added = pyqtSignal()
+    vertex_added = pyqtSignal(object)
+    weight_changed = pyqtSignal(object, object, object)
 
     def __init__(self, is_output=False):
         super().__init__()
@@ -36,8 +57,83 @@ class GraphWidget(QWidget):
         self.removed_vertices = []
         self.action_stack = []
         self.is_output = is_output
+        self.index = GridIndex(self.min_distance)
+        self.vertex_by_id = {}
+        self.edge_index = {}
+        self.cache = None
+        self.matrix = None
+        self.trace = None
+
+    def log(self, message):
+        if self.trace is not None:
+            self.trace(message)
+
+    def invalidate(self):
+        self.cache = None
+        self.update()
+
+    def clear(self):
+        self.vertices.clear()
+        self.edges.clear()
+        self.vertex_by_id.clear()
+        self.edge_index.clear()
+        self.index.clear()
+        self.matrix = None
+        self.vertex_counter = 0
+        self.selected_vertex = None
+        self.removed_vertices.clear()
+        self.action_stack.clear()
+        self.invalidate()
+
+    def set_graph(self, vertices, edges):
+        self.clear()
+        for vertex in vertices:
+            self.vertices.append(vertex)
+            self.vertex_by_id[vertex.id] = vertex
+            self.index.insert(vertex)
+        for edge in edges:
+            self.edges.append(edge)
+            self.edge_index[(edge.start_vertex.id, edge.end_vertex.id)] = edge
+
+    def load_graph(self, graph):
+        # Imported coordinates are fitted into the widget. Above IMPORT_EDGE_LIMIT arcs the weights
+        # stay in the distance matrix: no Edge objects are created and the arcs are not drawn.
+        self.clear()
+        margin = 30
+        xs = [x for _, x, _ in graph.vertices]
+        ys = [y for _, _, y in graph.vertices]
+        if xs:
+            scale = min((self.width() - 2 * margin) / max(max(xs) - min(xs), 1),
+                        (self.height() - 2 * margin) / max(max(ys) - min(ys), 1))
+            for vertex_id, x, y in graph.vertices:
+                vertex = Vertex(vertex_id, int(margin + (x - min(xs)) * scale), int(margin + (y - min(ys)) * scale))
+                self.vertices.append(vertex)
+                self.vertex_by_id[vertex_id] = vertex
+                self.index.insert(vertex)
+
+        dm = graph.distance_matrix()
+        if dm.arcs > IMPORT_EDGE_LIMIT:
+            self.matrix = dm
+        else:
+            for start_id, end_id, weight in graph.edges:
+                edge = Edge(self.vertex_by_id[start_id], self.vertex_by_id[end_id], weight)
+                self.edges.append(edge)
+                self.edge_index[(start_id, end_id)] = edge
+        self.vertex_counter = max((v.id for v in self.vertices if isinstance(v.id, int)), default=0)
+        self.invalidate()
+
+    def edge(self, start_id, end_id):
+        edge = self.edge_index.get((start_id, end_id))
+        if edge is None and self.matrix is not None and start_id in self.matrix.index and end_id in self.matrix.index:
+            weight = self.matrix.matrix[self.matrix.index[start_id], self.matrix.index[end_id]]
+            if math.isfinite(weight):
+                edge = Edge(self.vertex_by_id[start_id], self.vertex_by_id[end_id], self.matrix.cost_value(weight))
+        return edge
 
     def add_vertex(self, x, y):
+        if self.index.within(x, y, self.min_distance):
+            return
+
         if self.removed_vertices:
             vertex_id = min(self.removed_vertices)
             self.removed_vertices.remove(vertex_id)
@@ -45,141 +141,139 @@ class GraphWidget(QWidget):
             self.vertex_counter += 1
             vertex_id = self.vertex_counter
 
-        for vertex in self.vertices:
-            distance = math.sqrt((x - vertex.x) ** 2 + (y - vertex.y) ** 2)
-            if distance < self.min_distance:
-                return
-
         vertex = Vertex(vertex_id, x, y)
         self.vertices.append(vertex)
+        self.vertex_by_id[vertex_id] = vertex
+        self.index.insert(vertex)
         self.action_stack.append(("vertex", vertex))
-        self.update()
+        self.invalidate()
+        self.vertex_added.emit(vertex_id)
 
     def select_vertex_for_edge(self, x, y):
         try:
-            print("Начало select_vertex_for_edge")
-            for vertex in self.vertices:
-                print(f"Проверка вершины {vertex.id} на расстояние")
-                distance = math.sqrt((x - vertex.x) ** 2 + (y - vertex.y) ** 2)
-                if distance < 20:
-                    print(f"Вершина {vertex.id} находится в радиусе")
-                    if self.selected_vertex is None:
-                        print(f"Выбрана вершина {vertex.id} для начала ребра")
-                        self.selected_vertex = vertex
-                        self.update()
-                        return
-                    else:
-                        if self.selected_vertex != vertex:
-                            print(f"Попытка создать ребро между {self.selected_vertex.id} и {vertex.id}")
-                            edge_exists = False
-                            edge_index = -1
-
-                            for idx, edge in enumerate(self.edges):
-                                if (edge.start_vertex.id == self.selected_vertex.id and
-                                        edge.end_vertex.id == vertex.id):
-                                    edge_exists = True
-                                    edge_index = idx
-                                    break
-
-                            if edge_exists:
-                                print(f"Ребро уже существует, индекс {edge_index}")
-                                current_weight = self.edges[edge_index].weight
-                                new_weight, ok = QInputDialog.getInt(self, "Вес рёбра",
-                                                                     f"Ребро между {self.selected_vertex.id} и {vertex.id} уже существует. Текущий вес: {current_weight}\nВведите новый вес:",
-                                                                     current_weight)
-                                if ok:
-                                    print(f"Обновление веса ребра на {new_weight}")
-                                    old_edge = self.edges[edge_index]
-                                    self.edges[edge_index].weight = new_weight
-                                    self.action_stack.append(("weight_change", old_edge, self.edges[edge_index]))
-                                    self.update()
-
-                                self.selected_vertex = None
-                                self.update()
-                                self.edge_added.emit()
-                                return
-
-                            print("Запрос веса ребра")
-                            weight, ok = QInputDialog.getInt(self, "Вес рёбра",
-                                                             f"Введите вес рёбра от {self.selected_vertex.id} до {vertex.id}:")
-                            if not ok:
-                                print("Пользователь отменил ввод веса")
-                                return
-
-                            print(f"Создание ребра с весом {weight}")
-                            if self.selected_vertex is None or vertex is None:
-                                print("Ошибка: одна из вершин равна None")
-                                return
-
-                            edge = Edge(self.selected_vertex, vertex, weight)
-                            if edge is None:
-                                print("Ошибка: не удалось создать ребро")
-                                return
-
-                            self.edges.append(edge)
-                            if edge not in self.edges:
-                                print("Ошибка: ребро не добавлено в список")
-                                return
-
-                            self.action_stack.append(("edge", edge))
-                            if ("edge", edge) not in self.action_stack:
-                                print("Ошибка: действие не добавлено в стек")
-                                return
-                            try:
-                                self.update()
-                                print("Виджет успешно обновлен")
-                            except Exception as e:
-                                print(f"Ошибка при обновлении виджета: {e}")
-                                return
+            self.log("Начало select_vertex_for_edge")
+            vertex = self.index.nearest(x, y, 20)
+            if vertex is not None:
+                self.log(f"Вершина {vertex.id} находится в радиусе")
+                if self.selected_vertex is None:
+                    self.log(f"Выбрана вершина {vertex.id} для начала ребра")
+                    self.selected_vertex = vertex
+                    self.update()
+                    return
+                else:
+                    if self.selected_vertex != vertex:
+                        self.log(f"Попытка создать ребро между {self.selected_vertex.id} и {vertex.id}")
+                        edge = self.edge_index.get((self.selected_vertex.id, vertex.id))
+
+                        if edge is not None:
+                            self.log(f"Ребро {self.selected_vertex.id} -> {vertex.id} уже существует")
+                            current_weight = edge.weight
+                            new_weight, ok = QInputDialog.getInt(self, "Вес рёбра",
+                                                                 f"Ребро между {self.selected_vertex.id} и {vertex.id} уже существует. Текущий вес: {current_weight}\nВведите новый вес:",
+                                                                 current_weight)
+                            if ok:
+                                self.log(f"Обновление веса ребра на {new_weight}")
+                                old_edge = edge
+                                edge.weight = new_weight
+                                self.action_stack.append(("weight_change", old_edge, edge))
+                                self.weight_changed.emit(edge.start_vertex.id, edge.end_vertex.id, new_weight)
+                                self.invalidate()
 
                             self.selected_vertex = None
                             self.update()
                             self.edge_added.emit()
                             return
-                        else:
-                            print("Выбрана та же вершина, сброс выбора")
-                            self.selected_vertex = None
-                            self.update()
+
+                        self.log("Запрос веса ребра")
+                        weight, ok = QInputDialog.getInt(self, "Вес рёбра",
+                                                         f"Введите вес рёбра от {self.selected_vertex.id} до {vertex.id}:")
+                        if not ok:
+                            self.log("Пользователь отменил ввод веса")
+                            return
+
+                        self.log(f"Создание ребра с весом {weight}")
+                        if self.selected_vertex is None or vertex is None:
+                            self.log("Ошибка: одна из вершин равна None")
+                            return
+
+                        edge = Edge(self.selected_vertex, vertex, weight)
+                        if edge is None:
+                            self.log("Ошибка: не удалось создать ребро")
+                            return
+
+                        self.edges.append(edge)
+                        self.edge_index[(self.selected_vertex.id, vertex.id)] = edge
+                        if self.edges[-1] is not edge:
+                            self.log("Ошибка: ребро не добавлено в список")
+                            return
+
+                        self.action_stack.append(("edge", edge))
+                        if self.action_stack[-1] != ("edge", edge):
+                            self.log("Ошибка: действие не добавлено в стек")
+                            return
+                        try:
+                            self.invalidate()
+                            self.log("Виджет успешно обновлен")
+                        except Exception as e:
+                            self.log(f"Ошибка при обновлении виджета: {e}")
+                            return
+
+                        self.selected_vertex = None
+                        self.update()
+                        self.edge_added.emit()
+                        self.weight_changed.emit(edge.start_vertex.id, edge.end_vertex.id, weight)
+                        return
+                    else:
+                        self.log("Выбрана та же вершина, сброс выбора")
+                        self.selected_vertex = None
+                        self.update()
         except Exception as e:
             print(f"Произошла ошибка: {e}")
 
     def paintEvent(self, event):
         try:
-            print("Начало paintEvent")
+            self.log("Начало paintEvent")
+            if self.cache is None or self.cache.size() != self.size():
+                self.render_cache()
             painter = QPainter(self)
-            painter.setRenderHint(QPainter.Antialiasing)
-            painter.setPen(QPen(Qt.black, 2, Qt.DashLine))
-            painter.drawRect(10, 10, self.width() - 20, self.height() - 20)
-            print(f"Количество рёбер: {len(self.edges)}")
-            for edge in self.edges:
-                if edge is None:
-                    print("Ошибка: ребро равно None")
-                    continue
-                if edge.start_vertex is None or edge.end_vertex is None:
-                    print("Ошибка: одна из вершин ребра равна None")
-                    continue
-                print(f"Отрисовка ребра между {edge.start_vertex.id} и {edge.end_vertex.id}")
-                self.draw_directed_edge(painter, edge)
-
-            print(f"Количество вершин: {len(self.vertices)}")
-            for vertex in self.vertices:
-                if vertex is None:
-                    print("Ошибка: вершина равна None")
-                    continue
-                print(f"Отрисовка вершины {vertex.id}")
-                self.draw_vertex(painter, vertex)
+            painter.drawPixmap(0, 0, self.cache)
 
             if self.selected_vertex and not self.is_output:
-                if self.selected_vertex is None:
-                    print("Ошибка: выбранная вершина равна None")
-                else:
-                    print(f"Отрисовка выбранной вершины {self.selected_vertex.id}")
-                    self.draw_selected_vertex(painter, self.selected_vertex)
+                painter.setRenderHint(QPainter.Antialiasing)
+                self.log(f"Отрисовка выбранной вершины {self.selected_vertex.id}")
+                self.draw_selected_vertex(painter, self.selected_vertex)
 
-            print("Завершение paintEvent")
+            self.log("Завершение paintEvent")
         except Exception as e:
             print(f"Ошибка в paintEvent: {e}")
 
+    def render_cache(self):
+        self.cache = QPixmap(self.size())
+        self.cache.fill(Qt.transparent)
+        painter = QPainter(self.cache)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(Qt.black, 2, Qt.DashLine))
+        painter.drawRect(10, 10, self.width() - 20, self.height() - 20)
+        self.log(f"Количество рёбер: {len(self.edges)}")
+        for edge in self.edges:
+            if edge is None:
+                self.log("Ошибка: ребро равно None")
+                continue
+            if edge.start_vertex is None or edge.end_vertex is None:
+                self.log("Ошибка: одна из вершин ребра равна None")
+                continue
+            self.log(f"Отрисовка ребра между {edge.start_vertex.id} и {edge.end_vertex.id}")
+            self.draw_directed_edge(painter, edge)
+
+        self.log(f"Количество вершин: {len(self.vertices)}")
+        for vertex in self.vertices:
+            if vertex is None:
+                self.log("Ошибка: вершина равна None")
+                continue
+            self.log(f"Отрисовка вершины {vertex.id}")
+            self.draw_vertex(painter, vertex)
+        painter.end()
+
     def draw_vertex(self, painter, vertex):
         if self.is_output:
             painter.setPen(QPen(Qt.blue, 2))
@@ -193,7 +287,8 @@ class GraphWidget(QWidget):
 
     def draw_selected_vertex(self, painter, vertex):
         painter.setPen(QPen(Qt.green, 2))
-        painter.drawText(vertex.x - 28, vertex.y - 28)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawEllipse(QRectF(vertex.x - 18, vertex.y - 18, 36, 36))
 
     def draw_directed_edge(self, painter, edge):
         start_vertex = edge.start_vertex
@@ -240,6 +335,10 @@ class GraphWidget(QWidget):
         mid_y = (start_y + end_y) / 2
         painter.drawText(int(mid_x), int(mid_y), str(edge.weight))
 
+    def resizeEvent(self, event):
+        self.cache = None
+        super().resizeEvent(event)
+
     def mousePressEvent(self, event):
         if self.is_output:
             return
@@ -267,13 +366,32 @@ class MainWindow(QMainWindow):
 
         self.results_label = QLabel("Пусто")
         self.results_label.setAlignment(Qt.AlignCenter)
+        self.chart = ConvergenceChart()
 
         self.calculate_button = QPushButton("Рассчитать")
         self.calculate_modified_button = QPushButton("Рассчитать модификацию")
+        self.exact_button = QPushButton("Точное решение (Held-Karp)")
+        self.branch_and_bound_button = QPushButton("Ветви и границы")
+        self.cancel_button = QPushButton("Отменить")
+        self.cancel_button.setEnabled(False)
+        self.import_button = QPushButton("Импорт графа")
+        self.export_button = QPushButton("Экспорт графа")
         self.clear_button = QPushButton("Очистить")
+        self.worker = None
+        self.solver_stats = None
+        self.solve_cache = SolveCache()
+        self.incremental = None
+        self.edited_during_solve = False
+        self.incremental_check = QCheckBox("Перестраивать путь при правке графа")
+        self.incremental_check.setChecked(True)
 
         self.calculate_button.clicked.connect(self.calculate_tsp)
         self.calculate_modified_button.clicked.connect(self.calculate_tsp_modified)
+        self.exact_button.clicked.connect(self.calculate_exact)
+        self.branch_and_bound_button.clicked.connect(self.calculate_branch_and_bound)
+        self.cancel_button.clicked.connect(self.cancel_solver)
+        self.import_button.clicked.connect(self.import_graph)
+        self.export_button.clicked.connect(self.export_graph)
         self.clear_button.clicked.connect(self.clear_all)
 
         left_layout = QVBoxLayout()
@@ -287,9 +405,17 @@ class MainWindow(QMainWindow):
         right_layout.addWidget(self.tree_widget)
         right_layout.addWidget(self.calculate_button)
         right_layout.addWidget(self.calculate_modified_button)
+        right_layout.addWidget(self.exact_button)
+        right_layout.addWidget(self.branch_and_bound_button)
+        right_layout.addWidget(self.cancel_button)
+        right_layout.addWidget(self.import_button)
+        right_layout.addWidget(self.export_button)
         right_layout.addWidget(self.clear_button)
+        right_layout.addWidget(self.incremental_check)
         right_layout.addWidget(QLabel("Результаты"))
         right_layout.addWidget(self.results_label)
+        right_layout.addWidget(QLabel("Сходимость"))
+        right_layout.addWidget(self.chart)
 
         main_layout = QHBoxLayout()
         main_layout.addLayout(left_layout, 2)
@@ -299,216 +425,215 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
         self.input_graph.edge_added.connect(self.update_edges_table)
+        self.input_graph.vertex_added.connect(self.vertex_added)
+        self.input_graph.weight_changed.connect(self.weight_changed)
 
     def update_output_graph(self):
-        self.output_graph.vertices.clear()
-        self.output_graph.edges.clear()
+        vertices = []
         for vertex_id in self.best_path:
-            vertex = next((v for v in self.input_graph.vertices if v.id == vertex_id), None)
+            vertex = self.input_graph.vertex_by_id.get(vertex_id)
             if vertex:
-                self.output_graph.vertices.append(vertex)
-
-        for i in range(len(self.best_path) - 1):
-            start_id = self.best_path[i]
-            end_id = self.best_path[i + 1]
-            edge = next(
-                (e for e in self.input_graph.edges if e.start_vertex.id == start_id and e.end_vertex.id == end_id),
-                None)
-            if edge:
-                self.output_graph.edges.append(edge)
+                vertices.append(vertex)
 
+        edges = []
         if len(self.best_path) > 1:
-            start_id = self.best_path[-1]
-            end_id = self.best_path[0]
-            edge = next(
-                (e for e in self.input_graph.edges if e.start_vertex.id == start_id and e.end_vertex.id == end_id),
-                None)
-            if edge:
-                self.output_graph.edges.append(edge)
+            for start_id, end_id in zip(self.best_path, self.best_path[1:] + self.best_path[:1]):
+                edge = self.input_graph.edge(start_id, end_id)
+                if edge:
+                    edges.append(edge)
 
-        self.output_graph.update()
+        self.output_graph.set_graph(vertices, edges)
+
+    def show_no_path(self, message):
+        self.results_label.setText(message)
+        self.best_path = []
+        self.output_graph.clear()
 
     def calculate_tsp(self):
-        if len(self.input_graph.vertices) < 2:
-            self.results_label.setText("Недостаточно вершин для решения задачи")
+        try:
+            graph = Graph.from_widget(self.input_graph)
+            best_path, best_distance = self.solve_cache.solve(graph, solvers.calculate_tsp)
+        except SolverError as e:
+            self.show_no_path(str(e))
             return
 
-        adj_matrix = {}
-        for vertex in self.input_graph.vertices:
-            adj_matrix[vertex.id] = {}
-
-        for edge in self.input_graph.edges:
-            adj_matrix[edge.start_vertex.id][edge.end_vertex.id] = edge.weight
-
-        start = next((v for v in self.input_graph.vertices if v.id == 1), None)
-
-        if start is None:
-            self.results_label.setText("Вершина 1 не существует!")
-            return
+        results_text = f"Лучший путь: {' -> '.join(map(str, best_path))} -> {best_path[0]}\nРасстояние: {best_distance}"
+        self.results_label.setText(results_text)
+        self.best_path = best_path
+        self.update_output_graph()
+        self.track_edits(best_path, best_distance)
 
-        visited = {v.id: False for v in self.input_graph.vertices}
-        current_path = [start.id]
-        current_distance = 0
-        visited[start.id] = True
-        current_vertex = start
-
-        while len(current_path) < len(self.input_graph.vertices):
-            min_dist = float('inf')
-            next_vertex = None
-            for neighbor_id, weight in adj_matrix[current_vertex.id].items():
-                if not visited[neighbor_id] and weight < min_dist:
-                    min_dist = weight
-                    next_vertex = neighbor_id
-
-            if next_vertex is None:
-                self.results_label.setText("Невозможно найти путь: тупиковая ситуация")
-                return
-
-            current_path.append(next_vertex)
-            current_distance += min_dist
-            visited[next_vertex] = True
-            current_vertex = next((v for v in self.input_graph.vertices if v.id == next_vertex), None)
-
-        if len(current_path) == len(self.input_graph.vertices):
-            if start.id in adj_matrix[current_vertex.id]:
-                current_distance += adj_matrix[current_vertex.id][start.id]
-            else:
-                self.results_label.setText("Невозможно найти путь: нет обратного ребра")
-                return
-
-            results_text = f"Лучший путь: {' -> '.join(map(str, current_path))} -> {current_path[0]}\nРасстояние: {current_distance}"
-            self.results_label.setText(results_text)
-
-            self.best_path = current_path
-            self.update_output_graph()
-        else:
-            self.results_label.setText("Невозможно найти путь")
-            self.best_path = []
-            self.output_graph.vertices.clear()
-            self.output_graph.edges.clear()
-            self.output_graph.update()
-
-    def calculate_path_distance(self, path, adj_matrix):
-        distance = 0
-        for i in range(len(path) - 1):
-            if path[i] not in adj_matrix or path[i + 1] not in adj_matrix[path[i]]:
-                print(f"Ошибка: отсутствует ребро между {path[i]} и {path[i + 1]}")
-                return float('inf')
-            distance += adj_matrix[path[i]][path[i + 1]]
-
-        if path[-1] not in adj_matrix or path[0] not in adj_matrix[path[-1]]:
-            print(f"Ошибка: отсутствует ребро между {path[-1]} и {path[0]}")
-            return float('inf')
-        distance += adj_matrix[path[-1]][path[0]]
-        return distance
-
-    def two_opt(self, path, adj_matrix):
-        improved = True
-        while improved:
-            improved = False
-            for i in range(1, len(path) - 2):
-                for j in range(i + 1, len(path)):
-                    if j - i == 1:
-                        continue
-
-                    if i < 0 or j < 0 or i >= len(path) or j >= len(path):
-                        print(f"Ошибка: некорректные индексы i={i}, j={j}")
-                        continue
-                    new_path = path[:i] + path[i:j][::-1] + path[j:]
-                    new_distance = self.calculate_path_distance(new_path, adj_matrix)
-                    if new_distance < self.calculate_path_distance(path, adj_matrix):
-                        path = new_path
-                        improved = True
-        return path
     def calculate_tsp_modified(self):
-        if len(self.input_graph.vertices) < 2:
-            self.results_label.setText("Недостаточно вершин для решения задачи")
+        self.run_solver(solvers.calculate_tsp_modified, "2-opt")
+
+    def calculate_exact(self):
+        graph = Graph.from_widget(self.input_graph)
+        if 2 <= len(graph.vertices) <= HELD_KARP_MAX_VERTICES:
+            memory = solvers.held_karp_memory_estimate(graph) / 2 ** 20
+            self.results_label.setText(f"Held-Karp: оценка памяти {memory:.1f} МБ")
+            if memory > HELD_KARP_CONFIRM_MB:
+                answer = QMessageBox.question(self, "Точное решение",
+                                              f"Для Held-Karp потребуется около {memory:.0f} МБ памяти.\nПродолжить?")
+                if answer != QMessageBox.Yes:
+                    return
+        self.run_solver(solvers.held_karp, "Held-Karp")
+
+    def calculate_branch_and_bound(self):
+        stats = {}
+        self.run_solver(functools.partial(solvers.branch_and_bound, time_limit=BRANCH_AND_BOUND_TIME_LIMIT, stats=stats),
+                        "ветви и границы", stats)
+
+    def run_solver(self, solver, title, stats=None):
+        if self.worker is not None:
             return
 
-        adj_matrix = {}
-        for vertex in self.input_graph.vertices:
-            adj_matrix[vertex.id] = {}
-
-        for edge in self.input_graph.edges:
-            adj_matrix[edge.start_vertex.id][edge.end_vertex.id] = edge.weight
-
-        for vertex1 in self.input_graph.vertices:
-            for vertex2 in self.input_graph.vertices:
-                if vertex1.id != vertex2.id and vertex2.id not in adj_matrix[vertex1.id]:
-                    adj_matrix[vertex1.id][vertex2.id] = float('inf')
-
-        best_path = None
-        best_distance = float('inf')
-
-        for start in self.input_graph.vertices:
-            visited = {v.id: False for v in self.input_graph.vertices}
-            current_path = [start.id]
-            current_distance = 0
-            visited[start.id] = True
-            current_vertex = start
-
-            while len(current_path) < len(self.input_graph.vertices):
-                min_dist = float('inf')
-                next_vertex = None
-                for neighbor_id, weight in adj_matrix[current_vertex.id].items():
-                    if not visited[neighbor_id] and weight < min_dist:
-                        min_dist = weight
-                        next_vertex = neighbor_id
-
-                if next_vertex is None:
-                    break
-
-                current_path.append(next_vertex)
-                current_distance += min_dist
-                visited[next_vertex] = True
-                current_vertex = next((v for v in self.input_graph.vertices if v.id == next_vertex), None)
-
-            if len(current_path) == len(self.input_graph.vertices):
-                if start.id in adj_matrix[current_vertex.id]:
-                    current_distance += adj_matrix[current_vertex.id][start.id]
-                else:
-                    continue
-
-                if current_distance < best_distance:
-                    best_distance = current_distance
-                    best_path = current_path
-
-        if best_path is not None:
-            best_path = self.two_opt(best_path, adj_matrix)
-            best_distance = self.calculate_path_distance(best_path, adj_matrix)
-
-            results_text = f"Лучший путь (2-opt): {' -> '.join(map(str, best_path))} -> {best_path[0]}\nРасстояние: {best_distance}"
-            self.results_label.setText(results_text)
-            self.best_path = best_path
-            self.update_output_graph()
-        else:
-            results_text = "Невозможно найти путь"
-            self.results_label.setText(results_text)
-            self.best_path = []
-            self.output_graph.vertices.clear()
-            self.output_graph.edges.clear()
-            self.output_graph.update()
+        graph = Graph.from_widget(self.input_graph)
+        self.incremental = None
+        self.edited_during_solve = False
+        self.solver_title = title
+        self.solver_stats = {} if stats is None else stats
+        self.chart.clear()
+        self.worker = SolverWorker(lambda progress, observer: self.solve_cache.solve(
+            graph, solver, progress=progress, observer=observer, stats=self.solver_stats))
+        self.worker.telemetry.connect(self.chart.add_records)
+        self.worker.progress.connect(self.show_progress)
+        self.worker.improved.connect(self.show_improved)
+        self.worker.done.connect(self.show_result)
+        self.worker.failed.connect(self.show_no_path)
+        self.worker.finished.connect(self.solver_finished)
+        self.set_running(True)
+        self.worker.start()
+
+    def set_running(self, running):
+        self.calculate_button.setEnabled(not running)
+        self.calculate_modified_button.setEnabled(not running)
+        self.exact_button.setEnabled(not running)
+        self.branch_and_bound_button.setEnabled(not running)
+        self.import_button.setEnabled(not running)
+        self.clear_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def cancel_solver(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def solver_finished(self):
+        self.worker = None
+        self.set_running(False)
+
+    def show_progress(self, iteration, temperature, best_distance):
+        progress_text = f"Итерация: {iteration}"
+        if temperature is not None:
+            progress_text += f", температура: {temperature:.3f}"
+        self.results_label.setText(f"{progress_text}\nЛучшее расстояние: {best_distance}")
+
+    def show_improved(self, best_path, best_distance):
+        self.best_path = best_path
+        self.update_output_graph()
+
+    def show_result(self, best_path, best_distance, cancelled):
+        results_text = f"Лучший путь ({self.solver_title}): {' -> '.join(map(str, best_path))} -> {best_path[0]}\nРасстояние: {best_distance}"
+        if "lower_bound" in self.solver_stats:
+            results_text += f"\nНижняя граница: {self.solver_stats['lower_bound']:g}, разрыв: {self.solver_stats['gap']:.2%}"
+        if self.solver_stats.get("cached"):
+            results_text += "\n(из кэша)"
+        if cancelled:
+            results_text += "\n(расчёт остановлен)"
+        self.results_label.setText(results_text)
+        self.best_path = best_path
+        self.update_output_graph()
+        if not cancelled:
+            self.track_edits(best_path, best_distance)
+            if self.incremental is not None and self.edited_during_solve and self.incremental_check.isChecked():
+                self.show_incremental(self.incremental.improve)
+
+    def track_edits(self, best_path, best_distance):
+        # Later edits of the graph update this tour in place instead of waiting for a new solve.
+        # The tracker starts from the graph as it is now, edits made during the solve included.
+        self.incremental = None
+        if best_distance != math.inf and len(best_path) > 2:
+            self.incremental = IncrementalTour(Graph.from_widget(self.input_graph), best_path)
+
+    def edit_applies(self):
+        if self.worker is not None:
+            self.edited_during_solve = True
+            return False
+        if self.incremental is None:
+            return False
+        if not self.incremental_check.isChecked():
+            self.incremental = None
+            return False
+        return True
+
+    def vertex_added(self, vertex_id):
+        if self.edit_applies():
+            self.show_incremental(lambda: self.incremental.add_vertex(vertex_id))
+
+    def weight_changed(self, start_id, end_id, weight):
+        if self.edit_applies():
+            self.show_incremental(lambda: self.incremental.set_weight(start_id, end_id, weight))
+
+    def show_incremental(self, edit):
+        started = time.perf_counter()
+        result = edit()
+        if result is None:
+            # The tour does not know a vertex of the edit; the next solve starts tracking again.
+            self.incremental = None
+            return
+        best_path, best_distance = result
+        elapsed = (time.perf_counter() - started) * 1000
+        results_text = (f"Путь после правки: {' -> '.join(map(str, best_path))} -> {best_path[0]}\n"
+                        f"Расстояние: {best_distance}\n(перестроен за {elapsed:.1f} мс)")
+        if self.incremental.pending:
+            results_text += ("\nЖдут рёбер в путь и из пути: "
+                             + ", ".join(map(str, self.incremental.pending)))
+        self.results_label.setText(results_text)
+        self.best_path = best_path
+        self.update_output_graph()
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
     def update_edges_table(self):
-        print("Обновление таблицы рёбер")
+        self.input_graph.log("Обновление таблицы рёбер")
         self.tree_widget.clear()
         for edge in self.input_graph.edges:
             item = QTreeWidgetItem([str(edge.start_vertex.id), str(edge.end_vertex.id), str(edge.weight)])
             self.tree_widget.addTopLevelItem(item)
 
+    def import_graph(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт графа", "", GRAPH_FILE_FILTER)
+        if not path:
+            return
+        try:
+            graph = read_graphs(path)[0]
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            QMessageBox.warning(self, "Импорт графа", f"Не удалось прочитать {path}:\n{e}")
+            return
+        self.clear_all()
+        self.input_graph.load_graph(graph)
+        self.update_edges_table()
+        self.results_label.setText(f"Загружен граф {graph.name}: {len(graph.vertices)} вершин")
+
+    def export_graph(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт графа", "", GRAPH_FILE_FILTER)
+        if not path:
+            return
+        try:
+            write_graph(Graph.from_widget(self.input_graph), path)
+        except (OSError, FormatError) as e:
+            QMessageBox.warning(self, "Экспорт графа", f"Не удалось сохранить {path}:\n{e}")
+
     def clear_all(self):
-        self.input_graph.vertices.clear()
-        self.input_graph.edges.clear()
-        self.input_graph.vertex_counter = 0
-        self.input_graph.selected_vertex = None
-        self.input_graph.removed_vertices.clear()
-        self.input_graph.action_stack.clear()
-        self.output_graph.vertices.clear()
-        self.output_graph.edges.clear()
+        self.input_graph.clear()
+        self.output_graph.clear()
         self.tree_widget.clear()
         self.results_label.setText("")
-        self.input_graph.update()
-        self.output_graph.update()
+        self.chart.clear()
+        self.incremental = None
 
    
 
@@ -519,6 +644,9 @@ class MainWindow(QMainWindow):
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
+    if os.environ.get("TSP_TRACE"):
+        window.input_graph.trace = print
+        window.output_graph.trace = print
     window.show()
 
     sys.exit(app.exec_())
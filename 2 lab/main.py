@@ -1,11 +1,35 @@
+import os
 import sys
 import math
-import random
+import time
+import functools
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QPushButton, QTreeWidget, QTreeWidgetItem, QInputDialog)
-from PyQt5.QtGui import QPainter, QPen, QBrush
+                             QLabel, QPushButton, QTreeWidget, QTreeWidgetItem, QInputDialog, QMessageBox,
+                             QFileDialog, QCheckBox)
+from PyQt5.QtGui import QPainter, QPen, QBrush, QPixmap
 from PyQt5.QtCore import Qt, QRectF, pyqtSignal
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tsp import solvers
+from tsp.cache import SolveCache
+from tsp.chart import ConvergenceChart
+from tsp.graph import Graph
+from tsp.incremental import IncrementalTour
+from tsp.exact import HELD_KARP_MAX_VERTICES
+from tsp.formats import FormatError, read_graphs, write_graph
+from tsp.spatial import GridIndex
+from tsp.worker import SolverWorker
+
+HELD_KARP_CONFIRM_MB = 256
+BRANCH_AND_BOUND_TIME_LIMIT = 30.0
+IMPORT_EDGE_LIMIT = 2000
+GRAPH_FILE_FILTER = "Графы (*.json *.tsp *.atsp *.csv *.tspm);;Все файлы (*)"
+GENETIC_POPULATION = 200
+GENETIC_GENERATIONS = 1000
+GENETIC_ELITE = 2
+COLONY_ITERATIONS = 200
+
 
 class Vertex:
     def __init__(self, id, x, y):
@@ -23,6 +47,8 @@ class Edge:
 
 class GraphWidget(QWidget):
     edge_added = pyqtSignal()
+    vertex_added = pyqtSignal(object)
+    weight_changed = pyqtSignal(object, object, object)
 
     def __init__(self, is_output=False):
         super().__init__()
@@ -34,8 +60,78 @@ class GraphWidget(QWidget):
         self.removed_vertices = []
         self.action_stack = []
         self.is_output = is_output
+        self.index = GridIndex(self.min_distance)
+        self.vertex_by_id = {}
+        self.edge_index = {}
+        self.cache = None
+        self.matrix = None
+
+    def invalidate(self):
+        self.cache = None
+        self.update()
+
+    def clear(self):
+        self.vertices.clear()
+        self.edges.clear()
+        self.vertex_by_id.clear()
+        self.edge_index.clear()
+        self.index.clear()
+        self.matrix = None
+        self.vertex_counter = 0
+        self.selected_vertex = None
+        self.removed_vertices.clear()
+        self.action_stack.clear()
+        self.invalidate()
+
+    def set_graph(self, vertices, edges):
+        self.clear()
+        for vertex in vertices:
+            self.vertices.append(vertex)
+            self.vertex_by_id[vertex.id] = vertex
+            self.index.insert(vertex)
+        for edge in edges:
+            self.edges.append(edge)
+            self.edge_index[(edge.start_vertex.id, edge.end_vertex.id)] = edge
+
+    def load_graph(self, graph):
+        # Imported coordinates are fitted into the widget. Above IMPORT_EDGE_LIMIT arcs the weights
+        # stay in the distance matrix: no Edge objects are created and the arcs are not drawn.
+        self.clear()
+        margin = 30
+        xs = [x for _, x, _ in graph.vertices]
+        ys = [y for _, _, y in graph.vertices]
+        if xs:
+            scale = min((self.width() - 2 * margin) / max(max(xs) - min(xs), 1),
+                        (self.height() - 2 * margin) / max(max(ys) - min(ys), 1))
+            for vertex_id, x, y in graph.vertices:
+                vertex = Vertex(vertex_id, int(margin + (x - min(xs)) * scale), int(margin + (y - min(ys)) * scale))
+                self.vertices.append(vertex)
+                self.vertex_by_id[vertex_id] = vertex
+                self.index.insert(vertex)
+
+        dm = graph.distance_matrix()
+        if dm.arcs > IMPORT_EDGE_LIMIT:
+            self.matrix = dm
+        else:
+            for start_id, end_id, weight in graph.edges:
+                edge = Edge(self.vertex_by_id[start_id], self.vertex_by_id[end_id], weight)
+                self.edges.append(edge)
+                self.edge_index[(start_id, end_id)] = edge
+        self.vertex_counter = max((v.id for v in self.vertices if isinstance(v.id, int)), default=0)
+        self.invalidate()
+
+    def edge(self, start_id, end_id):
+        edge = self.edge_index.get((start_id, end_id))
+        if edge is None and self.matrix is not None and start_id in self.matrix.index and end_id in self.matrix.index:
+            weight = self.matrix.matrix[self.matrix.index[start_id], self.matrix.index[end_id]]
+            if math.isfinite(weight):
+                edge = Edge(self.vertex_by_id[start_id], self.vertex_by_id[end_id], self.matrix.cost_value(weight))
+        return edge
 
     def add_vertex(self, x, y):
+        if self.index.within(x, y, self.min_distance):
+            return
+
         if self.removed_vertices:
             vertex_id = min(self.removed_vertices)
             self.removed_vertices.remove(vertex_id)
@@ -43,97 +139,98 @@ class GraphWidget(QWidget):
             self.vertex_counter += 1
             vertex_id = self.vertex_counter
 
-        for vertex in self.vertices:
-            distance = math.sqrt((x - vertex.x) ** 2 + (y - vertex.y) ** 2)
-            if distance < self.min_distance:
-                return
-
         vertex = Vertex(vertex_id, x, y)
         self.vertices.append(vertex)
+        self.vertex_by_id[vertex_id] = vertex
+        self.index.insert(vertex)
         self.action_stack.append(("vertex", vertex))
-        self.update()
+        self.invalidate()
+        self.vertex_added.emit(vertex_id)
 
     def select_vertex_for_edge(self, x, y):
         try:
-            for vertex in self.vertices:
-                distance = math.sqrt((x - vertex.x) ** 2 + (y - vertex.y) ** 2)
-                if distance < 20:
-                    if self.selected_vertex is None:
-                        self.selected_vertex = vertex
-                        self.update()
-                        return
-                    else:
-                        if self.selected_vertex != vertex:
-                            edge_exists = False
-                            edge_index = -1
-
-                            for idx, edge in enumerate(self.edges):
-                                if (edge.start_vertex.id == self.selected_vertex.id and
-                                        edge.end_vertex.id == vertex.id):
-                                    edge_exists = True
-                                    edge_index = idx
-                                    break
-
-                            if edge_exists:
-                                current_weight = self.edges[edge_index].weight
-                                new_weight, ok = QInputDialog.getInt(self, "Вес рёбра",
-                                                                     f"Ребро между {self.selected_vertex.id} и {vertex.id} уже существует. Текущий вес: {current_weight}\nВведите новый вес:",
-                                                                     current_weight)
-                                if ok:
-                                    old_edge = self.edges[edge_index]
-                                    self.edges[edge_index].weight = new_weight
-                                    self.action_stack.append(("weight_change", old_edge, self.edges[edge_index]))
-                                    self.update()
-
-                                self.selected_vertex = None
-                                self.update()
-                                self.edge_added.emit()
-                                return
-
-                            weight, ok = QInputDialog.getInt(self, "Вес рёбра",
-                                                             f"Введите вес рёбра от {self.selected_vertex.id} до {vertex.id}:")
-                            if not ok:
-                                return
-
-                            edge = Edge(self.selected_vertex, vertex, weight)
-                            self.edges.append(edge)
-                            self.action_stack.append(("edge", edge))
-                            self.update()
+            vertex = self.index.nearest(x, y, 20)
+            if vertex is not None:
+                if self.selected_vertex is None:
+                    self.selected_vertex = vertex
+                    self.update()
+                    return
+                else:
+                    if self.selected_vertex != vertex:
+                        edge = self.edge_index.get((self.selected_vertex.id, vertex.id))
+
+                        if edge is not None:
+                            current_weight = edge.weight
+                            new_weight, ok = QInputDialog.getInt(self, "Вес рёбра",
+                                                                 f"Ребро между {self.selected_vertex.id} и {vertex.id} уже существует. Текущий вес: {current_weight}\nВведите новый вес:",
+                                                                 current_weight)
+                            if ok:
+                                old_edge = edge
+                                edge.weight = new_weight
+                                self.action_stack.append(("weight_change", old_edge, edge))
+                                self.weight_changed.emit(edge.start_vertex.id, edge.end_vertex.id, new_weight)
+                                self.invalidate()
 
                             self.selected_vertex = None
                             self.update()
                             self.edge_added.emit()
                             return
-                        else:
-                            self.selected_vertex = None
-                            self.update()
+
+                        weight, ok = QInputDialog.getInt(self, "Вес рёбра",
+                                                         f"Введите вес рёбра от {self.selected_vertex.id} до {vertex.id}:")
+                        if not ok:
+                            return
+
+                        edge = Edge(self.selected_vertex, vertex, weight)
+                        self.edges.append(edge)
+                        self.edge_index[(self.selected_vertex.id, vertex.id)] = edge
+                        self.action_stack.append(("edge", edge))
+                        self.invalidate()
+
+                        self.selected_vertex = None
+                        self.update()
+                        self.edge_added.emit()
+                        self.weight_changed.emit(edge.start_vertex.id, edge.end_vertex.id, weight)
+                        return
+                    else:
+                        self.selected_vertex = None
+                        self.update()
         except Exception as e:
             print(f"Произошла ошибка: {e}")
 
     def paintEvent(self, event):
         try:
+            if self.cache is None or self.cache.size() != self.size():
+                self.render_cache()
             painter = QPainter(self)
-            painter.setRenderHint(QPainter.Antialiasing)
-            painter.setPen(QPen(Qt.black, 2, Qt.DashLine))
-            painter.drawRect(10, 10, self.width() - 20, self.height() - 20)
-
-            for edge in self.edges:
-                if edge is None or edge.start_vertex is None or edge.end_vertex is None:
-                    continue
-                self.draw_directed_edge(painter, edge)
-
-            for vertex in self.vertices:
-                if vertex is None:
-                    continue
-                self.draw_vertex(painter, vertex)
+            painter.drawPixmap(0, 0, self.cache)
 
             if self.selected_vertex and not self.is_output:
-                if self.selected_vertex is not None:
-                    self.draw_selected_vertex(painter, self.selected_vertex)
+                painter.setRenderHint(QPainter.Antialiasing)
+                self.draw_selected_vertex(painter, self.selected_vertex)
 
         except Exception as e:
             print(f"Ошибка в paintEvent: {e}")
 
+    def render_cache(self):
+        self.cache = QPixmap(self.size())
+        self.cache.fill(Qt.transparent)
+        painter = QPainter(self.cache)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(Qt.black, 2, Qt.DashLine))
+        painter.drawRect(10, 10, self.width() - 20, self.height() - 20)
+
+        for edge in self.edges:
+            if edge is None or edge.start_vertex is None or edge.end_vertex is None:
+                continue
+            self.draw_directed_edge(painter, edge)
+
+        for vertex in self.vertices:
+            if vertex is None:
+                continue
+            self.draw_vertex(painter, vertex)
+        painter.end()
+
     def draw_vertex(self, painter, vertex):
         if self.is_output:
             painter.setPen(QPen(Qt.blue, 2))
@@ -147,7 +244,8 @@ class GraphWidget(QWidget):
 
     def draw_selected_vertex(self, painter, vertex):
         painter.setPen(QPen(Qt.green, 2))
-        painter.drawText(vertex.x - 28, vertex.y - 28)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawEllipse(QRectF(vertex.x - 18, vertex.y - 18, 36, 36))
 
     def draw_directed_edge(self, painter, edge):
         start_vertex = edge.start_vertex
@@ -194,6 +292,10 @@ class GraphWidget(QWidget):
         mid_y = (start_y + end_y) / 2
         painter.drawText(int(mid_x), int(mid_y), str(edge.weight))
 
+    def resizeEvent(self, event):
+        self.cache = None
+        super().resizeEvent(event)
+
     def mousePressEvent(self, event):
         if self.is_output:
             return
@@ -221,13 +323,38 @@ class MainWindow(QMainWindow):
 
         self.results_label = QLabel("Пусто")
         self.results_label.setAlignment(Qt.AlignCenter)
+        self.chart = ConvergenceChart()
 
         self.calculate_button = QPushButton("Имитация отжига")
         self.calculate_modified_button = QPushButton("Больцмановский отжиг")
+        self.tempering_button = QPushButton("Параллельный отжиг (реплики)")
+        self.genetic_button = QPushButton("Генетический алгоритм")
+        self.colony_button = QPushButton("Муравьиный алгоритм")
+        self.exact_button = QPushButton("Точное решение (Held-Karp)")
+        self.branch_and_bound_button = QPushButton("Ветви и границы")
+        self.cancel_button = QPushButton("Отменить")
+        self.cancel_button.setEnabled(False)
+        self.import_button = QPushButton("Импорт графа")
+        self.export_button = QPushButton("Экспорт графа")
         self.clear_button = QPushButton("Очистить")
+        self.worker = None
+        self.solver_stats = None
+        self.solve_cache = SolveCache()
+        self.incremental = None
+        self.edited_during_solve = False
+        self.incremental_check = QCheckBox("Перестраивать путь при правке графа")
+        self.incremental_check.setChecked(True)
 
         self.calculate_button.clicked.connect(self.simulated_annealing)
         self.calculate_modified_button.clicked.connect(self.boltzmann_annealing)
+        self.tempering_button.clicked.connect(self.parallel_tempering)
+        self.genetic_button.clicked.connect(self.genetic_algorithm)
+        self.colony_button.clicked.connect(self.ant_colony)
+        self.exact_button.clicked.connect(self.calculate_exact)
+        self.branch_and_bound_button.clicked.connect(self.calculate_branch_and_bound)
+        self.cancel_button.clicked.connect(self.cancel_solver)
+        self.import_button.clicked.connect(self.import_graph)
+        self.export_button.clicked.connect(self.export_graph)
         self.clear_button.clicked.connect(self.clear_all)
 
         left_layout = QVBoxLayout()
@@ -241,9 +368,20 @@ class MainWindow(QMainWindow):
         right_layout.addWidget(self.tree_widget)
         right_layout.addWidget(self.calculate_button)
         right_layout.addWidget(self.calculate_modified_button)
+        right_layout.addWidget(self.tempering_button)
+        right_layout.addWidget(self.genetic_button)
+        right_layout.addWidget(self.colony_button)
+        right_layout.addWidget(self.exact_button)
+        right_layout.addWidget(self.branch_and_bound_button)
+        right_layout.addWidget(self.cancel_button)
+        right_layout.addWidget(self.import_button)
+        right_layout.addWidget(self.export_button)
         right_layout.addWidget(self.clear_button)
+        right_layout.addWidget(self.incremental_check)
         right_layout.addWidget(QLabel("Результаты"))
         right_layout.addWidget(self.results_label)
+        right_layout.addWidget(QLabel("Сходимость"))
+        right_layout.addWidget(self.chart)
 
         main_layout = QHBoxLayout()
         main_layout.addLayout(left_layout, 2)
@@ -253,169 +391,179 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
         self.input_graph.edge_added.connect(self.update_edges_table)
+        self.input_graph.vertex_added.connect(self.vertex_added)
+        self.input_graph.weight_changed.connect(self.weight_changed)
 
     def update_output_graph(self):
-        self.output_graph.vertices.clear()
-        self.output_graph.edges.clear()
+        vertices = []
         for vertex_id in self.best_path:
-            vertex = next((v for v in self.input_graph.vertices if v.id == vertex_id), None)
+            vertex = self.input_graph.vertex_by_id.get(vertex_id)
             if vertex:
-                self.output_graph.vertices.append(vertex)
-
-        for i in range(len(self.best_path) - 1):
-            start_id = self.best_path[i]
-            end_id = self.best_path[i + 1]
-            edge = next(
-                (e for e in self.input_graph.edges if e.start_vertex.id == start_id and e.end_vertex.id == end_id),
-                None)
-            if edge:
-                self.output_graph.edges.append(edge)
+                vertices.append(vertex)
 
+        edges = []
         if len(self.best_path) > 1:
-            start_id = self.best_path[-1]
-            end_id = self.best_path[0]
-            edge = next(
-                (e for e in self.input_graph.edges if e.start_vertex.id == start_id and e.end_vertex.id == end_id),
-                None)
-            if edge:
-                self.output_graph.edges.append(edge)
-
-        self.output_graph.update()
-
-    def calculate_path_distance(self, path, adj_matrix):
-        distance = 0
-        for i in range(len(path) - 1):
-            if path[i] not in adj_matrix or path[i + 1] not in adj_matrix[path[i]]:
-                return float('inf')
-            distance += adj_matrix[path[i]][path[i + 1]]
-
-        if path[-1] not in adj_matrix or path[0] not in adj_matrix[path[-1]]:
-            return float('inf')
-        distance += adj_matrix[path[-1]][path[0]]
-        return distance
-
-    def get_adjacency_matrix(self):
-        adj_matrix = {}
-        for vertex in self.input_graph.vertices:
-            adj_matrix[vertex.id] = {}
-
-        for edge in self.input_graph.edges:
-            adj_matrix[edge.start_vertex.id][edge.end_vertex.id] = edge.weight
-
-        for vertex1 in self.input_graph.vertices:
-            for vertex2 in self.input_graph.vertices:
-                if vertex1.id != vertex2.id and vertex2.id not in adj_matrix[vertex1.id]:
-                    adj_matrix[vertex1.id][vertex2.id] = float('inf')
-
-        return adj_matrix
-
-    def simulated_annealing(self):
-        if len(self.input_graph.vertices) < 2:
-            self.results_label.setText("Недостаточно вершин для решения задачи")
+            for start_id, end_id in zip(self.best_path, self.best_path[1:] + self.best_path[:1]):
+                edge = self.input_graph.edge(start_id, end_id)
+                if edge:
+                    edges.append(edge)
+
+        self.output_graph.set_graph(vertices, edges)
+
+    def calculate_exact(self):
+        graph = Graph.from_widget(self.input_graph)
+        if 2 <= len(graph.vertices) <= HELD_KARP_MAX_VERTICES:
+            memory = solvers.held_karp_memory_estimate(graph) / 2 ** 20
+            self.results_label.setText(f"Held-Karp: оценка памяти {memory:.1f} МБ")
+            if memory > HELD_KARP_CONFIRM_MB:
+                answer = QMessageBox.question(self, "Точное решение",
+                                              f"Для Held-Karp потребуется около {memory:.0f} МБ памяти.\nПродолжить?")
+                if answer != QMessageBox.Yes:
+                    return
+        self.run_solver(solvers.held_karp, "Held-Karp")
+
+    def calculate_branch_and_bound(self):
+        stats = {}
+        self.run_solver(functools.partial(solvers.branch_and_bound, time_limit=BRANCH_AND_BOUND_TIME_LIMIT, stats=stats),
+                        "ветви и границы", stats)
+
+    def run_solver(self, solver, title, stats=None):
+        if self.worker is not None:
             return
 
-        adj_matrix = self.get_adjacency_matrix()
-        vertices = [v.id for v in self.input_graph.vertices]
-
-        initial_temp = 1000
-        final_temp = 0.1
-        cooling_rate = 0.99
-        iterations_per_temp = 100
-
-        current_path = vertices.copy()
-        random.shuffle(current_path)
-        current_distance = self.calculate_path_distance(current_path, adj_matrix)
-
-        best_path = current_path.copy()
-        best_distance = current_distance
-
-        temp = initial_temp
-
-        while temp > final_temp:
-            for _ in range(iterations_per_temp):
-
-                new_path = current_path.copy()
-                i, j = random.sample(range(len(new_path)), 2)
-                new_path[i], new_path[j] = new_path[j], new_path[i]
-                new_distance = self.calculate_path_distance(new_path, adj_matrix)
-
-                delta = new_distance - current_distance
-
-                if delta < 0 or random.random() < math.exp(-delta / temp):
-                    current_path = new_path
-                    current_distance = new_distance
-
-                    if current_distance < best_distance:
-                        best_path = current_path.copy()
-                        best_distance = current_distance
-
-            temp *= cooling_rate
-
+        graph = Graph.from_widget(self.input_graph)
+        self.incremental = None
+        self.edited_during_solve = False
+        self.solver_title = title
+        self.solver_stats = {} if stats is None else stats
+        self.chart.clear()
+        self.worker = SolverWorker(lambda progress, observer: self.solve_cache.solve(
+            graph, solver, progress=progress, observer=observer, stats=self.solver_stats))
+        self.worker.telemetry.connect(self.chart.add_records)
+        self.worker.progress.connect(self.show_progress)
+        self.worker.improved.connect(self.show_improved)
+        self.worker.done.connect(self.show_result)
+        self.worker.failed.connect(self.show_no_path)
+        self.worker.finished.connect(self.solver_finished)
+        self.set_running(True)
+        self.worker.start()
+
+    def set_running(self, running):
+        self.calculate_button.setEnabled(not running)
+        self.calculate_modified_button.setEnabled(not running)
+        self.tempering_button.setEnabled(not running)
+        self.genetic_button.setEnabled(not running)
+        self.colony_button.setEnabled(not running)
+        self.exact_button.setEnabled(not running)
+        self.branch_and_bound_button.setEnabled(not running)
+        self.import_button.setEnabled(not running)
+        self.clear_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def cancel_solver(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def solver_finished(self):
+        self.worker = None
+        self.set_running(False)
+
+    def show_progress(self, iteration, temperature, best_distance):
+        progress_text = f"Итерация: {iteration}"
+        if temperature is not None:
+            progress_text += f", температура: {temperature:.3f}"
+        self.results_label.setText(f"{progress_text}\nЛучшее расстояние: {best_distance}")
+
+    def show_improved(self, best_path, best_distance):
         self.best_path = best_path
-        results_text = f"Лучший путь (Имитация отжига): {' -> '.join(map(str, best_path))} -> {best_path[0]}\nРасстояние: {best_distance}"
-        self.results_label.setText(results_text)
         self.update_output_graph()
 
-    def boltzmann_annealing(self):
-        if len(self.input_graph.vertices) < 2:
-            self.results_label.setText("Недостаточно вершин для решения задачи")
+    def show_result(self, best_path, best_distance, cancelled):
+        results_text = f"Лучший путь ({self.solver_title}): {' -> '.join(map(str, best_path))} -> {best_path[0]}\nРасстояние: {best_distance}"
+        if "lower_bound" in self.solver_stats:
+            results_text += f"\nНижняя граница: {self.solver_stats['lower_bound']:g}, разрыв: {self.solver_stats['gap']:.2%}"
+        if self.solver_stats.get("cached"):
+            results_text += "\n(из кэша)"
+        if cancelled:
+            results_text += "\n(расчёт остановлен)"
+        self.results_label.setText(results_text)
+        self.best_path = best_path
+        self.update_output_graph()
+        if not cancelled:
+            self.track_edits(best_path, best_distance)
+            if self.incremental is not None and self.edited_during_solve and self.incremental_check.isChecked():
+                self.show_incremental(self.incremental.improve)
+
+    def track_edits(self, best_path, best_distance):
+        # Later edits of the graph update this tour in place instead of waiting for a new solve.
+        # The tracker starts from the graph as it is now, edits made during the solve included.
+        self.incremental = None
+        if best_distance != math.inf and len(best_path) > 2:
+            self.incremental = IncrementalTour(Graph.from_widget(self.input_graph), best_path)
+
+    def edit_applies(self):
+        if self.worker is not None:
+            self.edited_during_solve = True
+            return False
+        if self.incremental is None:
+            return False
+        if not self.incremental_check.isChecked():
+            self.incremental = None
+            return False
+        return True
+
+    def vertex_added(self, vertex_id):
+        if self.edit_applies():
+            self.show_incremental(lambda: self.incremental.add_vertex(vertex_id))
+
+    def weight_changed(self, start_id, end_id, weight):
+        if self.edit_applies():
+            self.show_incremental(lambda: self.incremental.set_weight(start_id, end_id, weight))
+
+    def show_incremental(self, edit):
+        started = time.perf_counter()
+        result = edit()
+        if result is None:
+            # The tour does not know a vertex of the edit; the next solve starts tracking again.
+            self.incremental = None
             return
+        best_path, best_distance = result
+        elapsed = (time.perf_counter() - started) * 1000
+        results_text = (f"Путь после правки: {' -> '.join(map(str, best_path))} -> {best_path[0]}\n"
+                        f"Расстояние: {best_distance}\n(перестроен за {elapsed:.1f} мс)")
+        if self.incremental.pending:
+            results_text += ("\nЖдут рёбер в путь и из пути: "
+                             + ", ".join(map(str, self.incremental.pending)))
+        self.results_label.setText(results_text)
+        self.best_path = best_path
+        self.update_output_graph()
 
-        adj_matrix = self.get_adjacency_matrix()
-        vertices = [v.id for v in self.input_graph.vertices]
-
-        initial_temp = 1000
-        final_temp = 0.1
-        cooling_rate = 0.95
-        iterations_per_temp = 200
-
-        current_path = vertices.copy()
-        random.shuffle(current_path)
-        current_distance = self.calculate_path_distance(current_path, adj_matrix)
-
-        best_path = current_path.copy()
-        best_distance = current_distance
-
-        temp = initial_temp
-
-        while temp > final_temp:
-            accepted = 0
-            for _ in range(iterations_per_temp):
-                new_path = current_path.copy()
-                if random.random() < 0.7:
-                    i, j = random.sample(range(len(new_path)), 2)
-                    new_path[i], new_path[j] = new_path[j], new_path[i]
-                else:
-                    i, j = sorted(random.sample(range(len(new_path)), 2))
-                    new_path[i:j + 1] = reversed(new_path[i:j + 1])
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
-                new_distance = self.calculate_path_distance(new_path, adj_matrix)
+    def show_no_path(self, message):
+        self.results_label.setText(message)
 
-                delta = new_distance - current_distance
+    def simulated_annealing(self):
+        self.run_solver(solvers.simulated_annealing, "Имитация отжига")
 
-                if delta < 0 or random.random() < math.exp(-delta / temp):
-                    current_path = new_path
-                    current_distance = new_distance
-                    accepted += 1
+    def boltzmann_annealing(self):
+        self.run_solver(solvers.boltzmann_annealing, "Больцмановский отжиг")
 
-                    if current_distance < best_distance:
-                        best_path = current_path.copy()
-                        best_distance = current_distance
+    def parallel_tempering(self):
+        self.run_solver(solvers.parallel_tempering, "Параллельный отжиг")
 
-            acceptance_ratio = accepted / iterations_per_temp
-            if acceptance_ratio > 0.6:
-                cooling_rate = 0.99
-            elif acceptance_ratio > 0.3:
-                cooling_rate = 0.95
-            else:
-                cooling_rate = 0.9
+    def genetic_algorithm(self):
+        solver = functools.partial(solvers.genetic, population=GENETIC_POPULATION, generations=GENETIC_GENERATIONS,
+                                   elite=GENETIC_ELITE)
+        self.run_solver(solver, "Генетический алгоритм")
 
-            temp *= cooling_rate
-
-        self.best_path = best_path
-        results_text = f"Лучший путь (Больцмановский отжиг): {' -> '.join(map(str, best_path))} -> {best_path[0]}\nРасстояние: {best_distance}"
-        self.results_label.setText(results_text)
-        self.update_output_graph()
+    def ant_colony(self):
+        solver = functools.partial(solvers.ant_colony, iterations=COLONY_ITERATIONS, local_search="auto")
+        self.run_solver(solver, "Муравьиный алгоритм")
 
     def update_edges_table(self):
         self.tree_widget.clear()
@@ -423,19 +571,36 @@ class MainWindow(QMainWindow):
             item = QTreeWidgetItem([str(edge.start_vertex.id), str(edge.end_vertex.id), str(edge.weight)])
             self.tree_widget.addTopLevelItem(item)
 
+    def import_graph(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт графа", "", GRAPH_FILE_FILTER)
+        if not path:
+            return
+        try:
+            graph = read_graphs(path)[0]
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            QMessageBox.warning(self, "Импорт графа", f"Не удалось прочитать {path}:\n{e}")
+            return
+        self.clear_all()
+        self.input_graph.load_graph(graph)
+        self.update_edges_table()
+        self.results_label.setText(f"Загружен граф {graph.name}: {len(graph.vertices)} вершин")
+
+    def export_graph(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт графа", "", GRAPH_FILE_FILTER)
+        if not path:
+            return
+        try:
+            write_graph(Graph.from_widget(self.input_graph), path)
+        except (OSError, FormatError) as e:
+            QMessageBox.warning(self, "Экспорт графа", f"Не удалось сохранить {path}:\n{e}")
+
     def clear_all(self):
-        self.input_graph.vertices.clear()
-        self.input_graph.edges.clear()
-        self.input_graph.vertex_counter = 0
-        self.input_graph.selected_vertex = None
-        self.input_graph.removed_vertices.clear()
-        self.input_graph.action_stack.clear()
-        self.output_graph.vertices.clear()
-        self.output_graph.edges.clear()
+        self.input_graph.clear()
+        self.output_graph.clear()
         self.tree_widget.clear()
         self.results_label.setText("")
-        self.input_graph.update()
-        self.output_graph.update()
+        self.chart.clear()
+        self.incremental = None
 
 
 if __name__ == "__main__":
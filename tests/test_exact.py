@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+
+from tsp.benchmark import load_corpus
+from tsp.exact import branch_and_bound_tour, held_karp_tour
+from tsp.solvers import branch_and_bound
+
+CORPUS = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "corpus.json")
+
+
+def test_branch_and_bound_proves_asymmetric_corpus_optimum():
+    entry, graph = next((entry, graph) for entry, graph in load_corpus(CORPUS) if entry["name"] == "asymmetric-50")
+    stats = {}
+    path, cost = branch_and_bound(graph, time_limit=None, stats=stats)
+    assert stats["optimal"]
+    assert stats["gap"] == 0
+    assert cost == entry["best_known"]
+    assert path[0] == graph.vertex_ids[0] and sorted(path) == sorted(graph.vertex_ids)
+
+
+def test_branch_and_bound_matches_held_karp_on_nearly_symmetric_weights():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        n = int(rng.integers(5, 11))
+        matrix = rng.integers(1, 100, size=(n, n)).astype(float)
+        matrix = matrix + matrix.T + rng.integers(0, 5, size=(n, n))
+        np.fill_diagonal(matrix, np.inf)
+        tour, cost, stats = branch_and_bound_tour(matrix, integral=True)
+        assert stats["optimal"]
+        assert cost == held_karp_tour(matrix)[1]
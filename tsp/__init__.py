@@ -0,0 +1,23 @@
+from .annealing import anneal
+from .cache import SolveCache, graph_fingerprint
+from .colony import ant_colony_tour
+from .construction import multi_start_nearest_neighbour, nearest_neighbour_batch
+from .cooling import (SCHEDULES, AcceptanceRatioCooling, AdaptiveCooling, GeometricCooling, LogarithmicCooling,
+                      LundyMeesCooling, calibrate_temperature)
+from .exact import branch_and_bound_tour, held_karp_memory, held_karp_tour
+from .formats import (FormatError, read_binary, read_csv, read_graphs, read_tsplib, write_binary, write_csv, write_graph,
+                      write_tsplib)
+from .genetic import genetic_tour, order_crossover
+from .graph import Graph, get_adjacency_matrix, load_graphs, save_graph
+from .incremental import IncrementalTour
+from .local_search import OrOpt, TwoOpt, candidate_lists, geometric_candidate_lists, or_opt, two_opt
+from .matrix import DistanceMatrix, batch_tour_cost, tour_cost
+from .moves import MoveEngine
+from .sparse import SparseMatrix
+from .parallel import parallel_annealing
+from .presolve import Infeasible, Reduction, presolve
+from .spatial import GridIndex, candidate_lists_from_coords
+from .telemetry import JsonlTrace, progress_observer
+from .tempering import tempering_tour
+from .solvers import (SOLVERS, SolverError, ant_colony, boltzmann_annealing, branch_and_bound, calculate_tsp,
+                      calculate_tsp_modified, genetic, held_karp, parallel_tempering, simulated_annealing, solve)
@@ -0,0 +1,185 @@
+import argparse
+import json
+import math
+import sys
+import time
+
+from .benchmark import diff_results, load_results, run_benchmark, save_results
+from .cache import SolveCache
+from .cooling import SCHEDULES
+from .formats import FormatError, read_graphs, write_graph
+from .local_search import NEIGHBOURHOODS
+from .solvers import RANDOMIZED, SOLVERS, SolverError, solve
+from .telemetry import JsonlTrace
+
+
+def solve_command(args):
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    trace = JsonlTrace(args.trace) if args.trace else None
+    cache = SolveCache(path=args.cache) if args.cache else None
+    failed = 0
+    try:
+        for path in args.input:
+            for index, graph in enumerate(read_graphs(path)):
+                seed = None if args.seed is None else args.seed + index
+                record = {"input": path, "index": index, "name": graph.name, "algo": args.algo, "seed": seed}
+                started = time.perf_counter()
+                if trace is not None:
+                    trace.context = {"input": path, "index": index, "name": graph.name, "algo": args.algo}
+                try:
+                    options = {}
+                    stats = {}
+                    if args.algo in RANDOMIZED:
+                        options = {"chains": args.chains, "workers": args.workers, "schedule": args.schedule,
+                                   "acceptance": args.acceptance, "patience": args.patience}
+                    if args.algo == "pt":
+                        options = {"replicas": args.replicas, "candidates": args.candidates,
+                                   "acceptance": args.acceptance, "patience": args.patience}
+                    if args.algo == "nn-2opt":
+                        options = {"local_search": args.local_search or "auto"}
+                    if args.algo == "aco":
+                        options = {"ants": args.ants, "iterations": args.iterations, "local_search": args.local_search}
+                    if args.algo == "ga":
+                        options = {"population": args.population, "generations": args.generations, "elite": args.elite}
+                    if args.algo == "bnb":
+                        options = {"time_limit": args.time_limit}
+                    options["stats"] = stats
+                    run = solve if cache is None else cache.solve
+                    tour, cost = run(graph, args.algo, seed=seed, presolve=not args.no_presolve, observer=trace,
+                                     **options)
+                    record["tour"] = tour
+                    record["cost"] = cost if math.isfinite(cost) else None
+                    if "lower_bound" in stats:
+                        record["lower_bound"] = stats["lower_bound"]
+                        record["gap"] = stats["gap"]
+                        record["optimal"] = stats["optimal"]
+                    if stats.get("enumerated"):
+                        record["enumerated"] = True
+                except SolverError as e:
+                    record["error"] = str(e)
+                    failed += 1
+                except Exception as e:
+                    # One broken instance must not lose the records of the rest of the batch.
+                    record["error"] = f"{type(e).__name__}: {e}"
+                    failed += 1
+                record["time"] = time.perf_counter() - started
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if trace is not None:
+            trace.close()
+    return 1 if failed else 0
+
+
+def convert_command(args):
+    graphs = read_graphs(args.input)
+    if len(graphs) > 1 and args.index is None:
+        print(f"В {args.input} несколько графов ({len(graphs)}), выберите один через --index", file=sys.stderr)
+        return 1
+    try:
+        write_graph(graphs[args.index or 0], args.output)
+    except FormatError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+def bench_command(args):
+    def log(record):
+        cost = record["cost"] if record["cost"] is not None else record.get("error", "—")
+        gap = f"{record['gap']:.2%}" if record["gap"] is not None else "—"
+        print(f"{record['instance']:<16} {record['algo']:<10} {cost!s:>12} {gap:>8} {record['time']:8.3f} с",
+              file=sys.stderr)
+
+    results = run_benchmark(args.corpus, args.algo, args.instance, args.seed, not args.no_memory, log)
+    if args.output:
+        save_results(results, args.output)
+    else:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=1)
+        sys.stdout.write("\n")
+    return 0
+
+
+def bench_diff_command(args):
+    regressions, notes = diff_results(load_results(args.baseline), load_results(args.current), args.time_tolerance,
+                                      args.memory_tolerance, args.cost_tolerance)
+    for line in notes:
+        print(line)
+    for line in regressions:
+        print(f"РЕГРЕССИЯ: {line}", file=sys.stderr)
+    if regressions:
+        print(f"Найдено регрессий: {len(regressions)}", file=sys.stderr)
+        return 1
+    print("Регрессий нет")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tsp", description="Решение задачи коммивояжёра без GUI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    solve_parser = subparsers.add_parser("solve", help="решить один или несколько графов")
+    solve_parser.add_argument("--algo", choices=sorted(SOLVERS), required=True)
+    solve_parser.add_argument("--input", nargs="+", required=True, help="файлы с графами: JSON, TSPLIB (.tsp, .atsp), CSV или .tspm")
+    solve_parser.add_argument("--seed", type=int, default=None)
+    solve_parser.add_argument("--chains", type=int, default=1, help="число независимых цепочек отжига")
+    solve_parser.add_argument("--workers", type=int, default=None, help="число процессов для цепочек")
+    solve_parser.add_argument("--schedule", choices=sorted(SCHEDULES), default=None,
+                              help="расписание охлаждения для sa (по умолчанию geometric) и boltzmann "
+                                   "(по умолчанию adaptive)")
+    solve_parser.add_argument("--acceptance", type=float, default=None,
+                              help="доля ухудшающих ходов, принимаемых при начальной температуре отжига "
+                                   "(0.5, при старте с готового тура 0.05)")
+    solve_parser.add_argument("--patience", type=int, default=None,
+                              help="остановить отжиг после стольких температур без улучшения")
+    solve_parser.add_argument("--replicas", type=int, default=16, help="число реплик для pt")
+    solve_parser.add_argument("--candidates", type=int, default=16,
+                              help="число ходов, которые каждая реплика pt пробует за раунд")
+    solve_parser.add_argument("--local-search", choices=["auto"] + sorted(NEIGHBOURHOODS), default=None,
+                              help="окрестность локального поиска для nn-2opt (по умолчанию auto) и aco")
+    solve_parser.add_argument("--population", type=int, default=100, help="размер популяции для ga")
+    solve_parser.add_argument("--generations", type=int, default=500, help="число поколений для ga")
+    solve_parser.add_argument("--elite", type=int, default=2, help="число лучших особей, переходящих без изменений")
+    solve_parser.add_argument("--ants", type=int, default=None, help="число муравьёв для aco (по умолчанию n)")
+    solve_parser.add_argument("--iterations", type=int, default=200, help="число итераций для aco")
+    solve_parser.add_argument("--time-limit", type=float, default=10.0, help="лимит времени для bnb, секунды")
+    solve_parser.add_argument("--no-presolve", action="store_true",
+                              help="не проверять граф и не сжимать цепочки обязательных рёбер перед решением")
+    solve_parser.add_argument("--output", default=None, help="файл JSON Lines (по умолчанию stdout)")
+    solve_parser.add_argument("--cache", default=None,
+                              help="JSON-файл кэша решений: повторный запуск на том же графе берёт ответ из него")
+    solve_parser.add_argument("--trace", default=None,
+                              help="файл JSON Lines для телеметрии: запись на каждый шаг температуры или итерацию")
+    solve_parser.set_defaults(func=solve_command)
+
+    convert_parser = subparsers.add_parser("convert", help="преобразовать граф между JSON, TSPLIB, CSV и бинарным форматом")
+    convert_parser.add_argument("input")
+    convert_parser.add_argument("output", help="формат выбирается по расширению: .json, .tsp, .atsp, .csv или .tspm")
+    convert_parser.add_argument("--index", type=int, default=None, help="номер графа, если во входном файле их несколько")
+    convert_parser.set_defaults(func=convert_command)
+
+    bench_parser = subparsers.add_parser("bench", help="прогнать решатели на наборе тестовых графов")
+    bench_parser.add_argument("--corpus", default="benchmarks/corpus.json")
+    bench_parser.add_argument("--algo", nargs="+", choices=sorted(SOLVERS), default=None)
+    bench_parser.add_argument("--instance", nargs="+", default=None, help="имена графов из набора")
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--no-memory", action="store_true", help="не измерять пиковую память")
+    bench_parser.add_argument("--output", default=None, help="JSON-файл с результатами (по умолчанию stdout)")
+    bench_parser.set_defaults(func=bench_command)
+
+    diff_parser = subparsers.add_parser("bench-diff", help="сравнить результаты с сохранённым эталоном")
+    diff_parser.add_argument("baseline")
+    diff_parser.add_argument("current")
+    diff_parser.add_argument("--time-tolerance", type=float, default=0.25)
+    diff_parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    diff_parser.add_argument("--cost-tolerance", type=float, default=0.0)
+    diff_parser.set_defaults(func=bench_diff_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
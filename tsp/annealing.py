@@ -0,0 +1,170 @@
+import math
+import random
+import time
+
+from .cooling import calibrate_temperature, make_schedule
+from .moves import MoveEngine, as_delta
+
+COLD_ACCEPTANCE = 0.5
+WARM_ACCEPTANCE = 0.05
+
+
+def random_insertion(rng, n):
+    length = rng.randint(1, n - 2)
+    i = rng.randrange(n)
+    k = (i + rng.randint(length, n - 2)) % n
+    return i, (i + length - 1) % n, k
+
+
+def swap_moves(engine, rng):
+    n = engine.n
+
+    def propose():
+        i, j = rng.sample(range(n), 2)
+        return i, j, engine.swap_delta, engine.apply_swap
+
+    return propose
+
+
+def mixed_moves(engine, rng):
+    n = engine.n
+
+    def propose():
+        if rng.random() < 0.7:
+            i, j = rng.sample(range(n), 2)
+            return i, j, engine.swap_delta, engine.apply_swap
+        if engine.symmetric or n < 4:
+            i, j = sorted(rng.sample(range(n), 2))
+            return i, j, engine.reverse_delta, engine.apply_reverse
+        # On asymmetric weights move a segment instead of reversing it: three arcs change.
+        i, j, k = random_insertion(rng, n)
+        return (i, j, lambda i, j: engine.insert_delta(i, j, k),
+                lambda i, j, move: engine.apply_insert(i, j, k, move))
+
+    return propose
+
+
+def anneal(matrix, moves, seed=None, progress=None, schedule="geometric", steps=300, iterations=300,
+           acceptance=None, final_acceptance=0.001, samples=200, patience=30, observer=None, initial=None,
+           symmetric=None):
+    # The initial and final temperatures are calibrated on the deltas of samples random moves from
+    # the starting tour: at the initial one about acceptance of the uphill moves pass, at the final
+    # one about final_acceptance. The schedule takes steps temperature steps of iterations moves
+    # between them; the run stops early after patience steps without a new best tour, unless the
+    # schedule reheats. An observer gets a telemetry record after every temperature step; only then
+    # are the moves timed, split into generating a move and evaluating its delta.
+    # An initial tour (vertex indices) replaces the random start; it is then annealed from a low
+    # temperature, WARM_ACCEPTANCE unless acceptance is given, so that it is refined, not destroyed.
+    # symmetric, when the caller already knows it, saves the engine a pass over the matrix.
+    rng = random.Random(seed)
+    n = len(matrix)
+
+    if initial is None:
+        order = list(range(n))
+        rng.shuffle(order)
+    else:
+        order = [int(v) for v in initial]
+    if acceptance is None:
+        acceptance = COLD_ACCEPTANCE if initial is None else WARM_ACCEPTANCE
+    engine = MoveEngine(matrix, order, symmetric)
+    propose = moves(engine, rng)
+
+    deltas = []
+    for _ in range(samples if n > 2 else 0):
+        i, j, evaluate, _ = propose()
+        deltas.append(as_delta(*evaluate(i, j)))
+    initial_temp = calibrate_temperature(deltas, acceptance) or 1.0
+    final_temp = calibrate_temperature(deltas, final_acceptance) or initial_temp
+    if final_temp >= initial_temp:
+        final_temp = initial_temp * final_acceptance
+    schedule = make_schedule(schedule)
+    schedule.start(initial_temp, final_temp, steps)
+
+    best_tour = engine.tour.copy()
+    best_key = (engine.missing, engine.total)
+    best_temp = initial_temp
+    evaluations = len(deltas)
+    accepted_total = 0
+    reheats = 0
+    stagnant = 0
+    step = 0
+    temp = initial_temp
+    timed = observer is not None
+    clock = time.perf_counter
+    started = clock()
+
+    while True:
+        accepted = 0
+        improved = False
+        step_started = clock()
+        move_time = evaluation_time = 0.0
+        for _ in range(iterations):
+            if timed:
+                generated = clock()
+                i, j, evaluate, apply = propose()
+                evaluated = clock()
+                move = evaluate(i, j)
+                move_time += evaluated - generated
+                evaluation_time += clock() - evaluated
+            else:
+                i, j, evaluate, apply = propose()
+                move = evaluate(i, j)
+            delta = as_delta(*move)
+            evaluations += 1
+
+            if delta < 0 or rng.random() < math.exp(-delta / temp):
+                apply(i, j, move)
+                accepted += 1
+
+                if (engine.missing, engine.total) < best_key:
+                    best_tour = engine.tour.copy()
+                    best_key = (engine.missing, engine.total)
+                    improved = True
+
+        accepted_total += accepted
+        if improved:
+            best_temp = temp
+            stagnant = 0
+        else:
+            stagnant += 1
+        previous = temp
+        temp = schedule.next(temp, step, accepted / iterations)
+        step += 1
+
+        if timed:
+            now = clock()
+            observer({"step": step, "iteration": evaluations, "time": now - started, "temperature": previous,
+                      "cooling_rate": temp / previous, "best": as_delta(*best_key), "current": engine.cost,
+                      "acceptance": accepted / iterations, "evaluations_per_second": iterations / (now - step_started),
+                      "move_time": move_time, "evaluation_time": evaluation_time})
+
+        if progress is not None and progress(evaluations, temp, as_delta(*best_key), best_tour):
+            break
+        if stagnant >= patience or temp <= final_temp:
+            temp = schedule.reheat(best_temp)
+            if temp is None:
+                break
+            reheats += 1
+            stagnant = 0
+
+    stats = {"evaluations": evaluations, "accepted": accepted_total, "steps": step, "reheats": reheats,
+             "initial_temperature": initial_temp}
+    return best_tour, as_delta(*best_key), stats
+
+
+def simulated_annealing_tour(matrix, seed=None, progress=None, **options):
+    return anneal(matrix, swap_moves, seed, progress, **options)
+
+
+def boltzmann_annealing_tour(matrix, seed=None, progress=None, **options):
+    options.setdefault("steps", 150)
+    options.setdefault("iterations", 200)
+    options.setdefault("patience", 20)
+    options.setdefault("schedule", "adaptive")
+    return anneal(matrix, mixed_moves, seed, progress, **options)
+
+
+ANNEALERS = {
+    "sa": simulated_annealing_tour,
+    "boltzmann": boltzmann_annealing_tour,
+}
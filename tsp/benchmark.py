@@ -0,0 +1,157 @@
+import json
+import math
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from .generators import GENERATORS
+from .formats import read_graphs
+from .solvers import SEEDED, SOLVERS, SolverError
+
+BENCHMARK_OPTIONS = {"bnb": {"time_limit": 10.0}}
+HELD_KARP_BENCHMARK_LIMIT = 16
+
+
+def load_corpus(path):
+    # Each entry is either {"generator", "n", "seed"} or {"file", "index"} relative to the corpus file,
+    # plus "name" and an optional "best_known" tour cost.
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    corpus = []
+    for entry in data["instances"]:
+        if "generator" in entry:
+            graph = GENERATORS[entry["generator"]](entry["n"], entry.get("seed"), **entry.get("options", {}))
+        else:
+            graph = read_graphs(os.path.join(os.path.dirname(path), entry["file"]))[entry.get("index", 0)]
+        graph.name = entry["name"]
+        corpus.append((entry, graph))
+    return corpus
+
+
+def skipped(algo, graph):
+    return algo == "held-karp" and len(graph.vertices) > HELD_KARP_BENCHMARK_LIMIT
+
+
+def run_solver(graph, algo, seed):
+    options = dict(BENCHMARK_OPTIONS.get(algo, {}))
+    if algo in SEEDED:
+        options["seed"] = seed
+    stats = {}
+    started = time.perf_counter()
+    try:
+        _, cost = SOLVERS[algo](graph, stats=stats, **options)
+        error = None
+    except SolverError as e:
+        cost, error = None, str(e)
+    except Exception as e:
+        # As in solve: one broken instance must not lose the records of the rest of the corpus.
+        cost, error = None, f"{type(e).__name__}: {e}"
+    return cost, error, time.perf_counter() - started, stats
+
+
+def peak_memory(graph, algo, seed):
+    tracemalloc.start()
+    try:
+        run_solver(graph, algo, seed)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_record(entry, graph, algo, seed, memory):
+    cost, error, elapsed, stats = run_solver(graph, algo, seed)
+    if cost is not None and not math.isfinite(cost):
+        cost = None
+    best_known = entry.get("best_known")
+    evaluations = stats.get("evaluations")
+    record = {
+        "instance": entry["name"],
+        "n": len(graph.vertices),
+        "algo": algo,
+        "seed": seed if algo in SEEDED else None,
+        "cost": cost,
+        "best_known": best_known,
+        "gap": (cost - best_known) / best_known if cost is not None and best_known else None,
+        "time": elapsed,
+        "peak_memory": peak_memory(graph, algo, seed) if memory else None,
+        "evaluations": evaluations,
+        "evals_per_sec": evaluations / elapsed if evaluations and elapsed > 0 else None,
+    }
+    if error is not None:
+        record["error"] = error
+    return record
+
+
+def run_benchmark(corpus_path, algos=None, instances=None, seed=0, memory=True, log=None):
+    algos = algos or list(SOLVERS)
+    results = []
+    for entry, graph in load_corpus(corpus_path):
+        if instances and entry["name"] not in instances:
+            continue
+        for algo in algos:
+            if skipped(algo, graph):
+                continue
+            record = benchmark_record(entry, graph, algo, seed, memory)
+            results.append(record)
+            if log is not None:
+                log(record)
+    meta = {
+        "corpus": corpus_path,
+        "seed": seed,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return {"meta": meta, "results": results}
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+
+
+def diff_results(baseline, current, time_tolerance=0.25, memory_tolerance=0.25, cost_tolerance=0.0, min_time=0.05,
+                 min_memory=1 << 20):
+    # Returns (regressions, notes); each item is a human-readable line keyed by instance/algo.
+    # Costs are seeded and so reproducible; time and memory only count past a relative tolerance.
+    before = {(r["instance"], r["algo"]): r for r in baseline["results"]}
+    after = {(r["instance"], r["algo"]): r for r in current["results"]}
+    regressions = []
+    notes = []
+
+    for key in sorted(before.keys() - after.keys()):
+        regressions.append(f"{key[0]} / {key[1]}: нет результата в текущем прогоне")
+    for key in sorted(after.keys() - before.keys()):
+        notes.append(f"{key[0]} / {key[1]}: новый результат, сравнивать не с чем")
+
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        label = f"{key[0]} / {key[1]}"
+        if new["cost"] is None and old["cost"] is not None:
+            regressions.append(f"{label}: путь не найден ({new.get('error', 'нет стоимости')})")
+        elif new["cost"] is not None and old["cost"] is not None:
+            if new["cost"] > old["cost"] * (1 + cost_tolerance) + 1e-9:
+                regressions.append(f"{label}: стоимость {old['cost']} -> {new['cost']}")
+            elif new["cost"] < old["cost"] - 1e-9:
+                notes.append(f"{label}: стоимость улучшилась {old['cost']} -> {new['cost']}")
+
+        if new["time"] > old["time"] * (1 + time_tolerance) and new["time"] - old["time"] > min_time:
+            regressions.append(f"{label}: время {old['time']:.3f} -> {new['time']:.3f} с")
+        elif new["time"] < old["time"] / (1 + time_tolerance) and old["time"] - new["time"] > min_time:
+            notes.append(f"{label}: время улучшилось {old['time']:.3f} -> {new['time']:.3f} с")
+
+        if old.get("peak_memory") and new.get("peak_memory"):
+            growth = new["peak_memory"] - old["peak_memory"]
+            if new["peak_memory"] > old["peak_memory"] * (1 + memory_tolerance) and growth > min_memory:
+                regressions.append(f"{label}: память {old['peak_memory']} -> {new['peak_memory']} байт")
+    return regressions, notes
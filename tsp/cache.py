@@ -0,0 +1,251 @@
+import functools
+import hashlib
+import inspect
+import json
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .solvers import SEEDED, SOLVERS, SolverError
+
+CACHE_BUDGET = 64 * 2 ** 20
+ENTRY_OVERHEAD = 512
+VERTEX_BYTES = 40
+NEAR_MISS = 0.1
+HASH_BLOCK = 256
+SKETCH_SIZE = 256
+SKETCH_BYTES = 8
+UNKEYED_OPTIONS = {"progress", "observer", "stats", "workers"}
+
+
+def arc_blocks(graph, sm=None):
+    # Finite arcs as (row * n + col keys, weights) in key order, HASH_BLOCK rows at a time, the same
+    # for a graph with a ready matrix and one built from edges. A graph built from edges reads them
+    # from sm, its sparse_matrix(), when the caller already has it.
+    n = len(graph.vertices)
+    if graph.matrix is not None:
+        matrix = graph.matrix.matrix
+        for start in range(0, n, HASH_BLOCK):
+            block = np.asarray(matrix[start:start + HASH_BLOCK])
+            finite = np.isfinite(block)
+            yield np.flatnonzero(finite) + start * n, block[finite]
+        return
+    if sm is None:
+        sm = graph.sparse_matrix()
+    weights = sm.weights[sm.key_order]
+    finite = np.isfinite(weights)
+    keys, weights = sm.keys[finite], weights[finite]
+    bounds = np.searchsorted(keys, np.arange(0, n + HASH_BLOCK, HASH_BLOCK, dtype=np.int64) * n)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        yield keys[start:end], weights[start:end]
+
+
+def graph_fingerprint(graph, sm=None):
+    # Content hash of the vertices with their coordinates (geometric candidate lists depend on
+    # them) and of every arc weight; the order of the edges does not matter.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(graph.vertices, default=str).encode("utf-8"))
+    for keys, weights in arc_blocks(graph, sm):
+        digest.update(keys.astype(np.int64).tobytes())
+        digest.update(weights.astype(np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def mix(x):
+    # splitmix64 finalizer, on uint64 arrays (overflow wraps around).
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def arc_sketch(graph, size=SKETCH_SIZE, sm=None):
+    # Bottom-k sketch of the arcs as (start id, end id, weight): the size smallest arc hashes plus
+    # the number of arcs. Arcs are named by vertex ids, so graphs over different vertex sets compare.
+    vertex_ids = graph.vertex_ids
+    n = len(vertex_ids)
+    names = np.array([int.from_bytes(hashlib.blake2b(json.dumps(vertex_id, default=str).encode("utf-8"),
+                                                     digest_size=8).digest(), "little") for vertex_id in vertex_ids],
+                     dtype=np.uint64)
+    smallest = np.empty(0, dtype=np.uint64)
+    count = 0
+    for keys, weights in arc_blocks(graph, sm):
+        starts, ends = names[keys // n], names[keys % n]
+        hashes = mix(mix(starts) ^ mix(ends + np.uint64(1)) ^ weights.astype(np.float64).view(np.uint64))
+        count += len(hashes)
+        if len(hashes) > size:
+            hashes = np.partition(hashes, size)[:size]
+        smallest = np.unique(np.concatenate((smallest, hashes)))[:size]
+    return smallest, count
+
+
+def changed_arcs(first, second, size=SKETCH_SIZE):
+    # Size of the symmetric difference of two arc sets (a changed weight counts twice). Exact while
+    # the sketches hold every arc, otherwise estimated from the Jaccard similarity of the union's
+    # bottom-k hashes.
+    (first, first_count), (second, second_count) = first, second
+    if len(first) == first_count and len(second) == second_count:
+        return len(np.setxor1d(first, second))
+    union = np.union1d(first, second)[:size]
+    jaccard = np.count_nonzero(np.isin(union, first) & np.isin(union, second)) / len(union)
+    return (1 - jaccard) * (first_count + second_count) / (1 + jaccard)
+
+
+def solver_call(solver, seed, options):
+    # Accepts an algorithm name as in solve(), a solver or a functools.partial of one;
+    # returns the function, its name and the options it will actually get.
+    if isinstance(solver, str):
+        if solver not in SOLVERS:
+            raise SolverError(f"Неизвестный алгоритм: {solver}")
+        if solver in SEEDED:
+            options = dict(options, seed=seed)
+        solver = SOLVERS[solver]
+    elif seed is not None:
+        options = dict(options, seed=seed)
+    if isinstance(solver, functools.partial):
+        options = {**solver.keywords, **options}
+        solver = solver.func
+    return solver, solver.__name__, options
+
+
+def entry_size(path, sketch):
+    return ENTRY_OVERHEAD + VERTEX_BYTES * len(path) + (0 if sketch is None else SKETCH_BYTES * len(sketch[0]))
+
+
+class SolveCache:
+    # LRU cache of solutions keyed by the graph fingerprint, the solver and its options.
+    # Entries are evicted from the least recently used end once their estimated size exceeds
+    # budget bytes. With a path the cache is loaded from and saved to a JSON file.
+    # A miss on a graph whose arcs differ from those of a cached entry by at most NEAR_MISS of
+    # its arcs warm-starts solvers that take an initial tour (the annealers).
+    def __init__(self, budget=CACHE_BUDGET, path=None):
+        self.budget = budget
+        self.path = path
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.warm_starts = 0
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, graph, name, options, sm=None):
+        keyed = {option: value for option, value in options.items() if option not in UNKEYED_OPTIONS}
+        signature = json.dumps([name, sorted(keyed.items())], default=repr)
+        return hashlib.blake2b(f"{graph_fingerprint(graph, sm)}:{signature}".encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, path, cost, stats=None, sketch=None):
+        if key in self.entries:
+            self.size -= self.entries.pop(key)["size"]
+        entry = {"path": list(path), "cost": cost, "stats": dict(stats or {}), "sketch": sketch,
+                 "size": entry_size(path, sketch)}
+        self.entries[key] = entry
+        self.size += entry["size"]
+        while self.size > self.budget and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted["size"]
+        if self.path is not None:
+            self.save()
+
+    def warm_start(self, graph, sketch=None):
+        # The finite tour of the entry whose arcs are closest to the graph's, if they differ by at
+        # most NEAR_MISS of them; ties go to the most recent one. Same vertex ids alone prove nothing,
+        # the GUI numbers every graph 1..n. Vertices that are gone are dropped, new ones appended.
+        if sketch is None:
+            sketch = arc_sketch(graph)
+        vertex_ids = graph.vertex_ids
+        present = set(vertex_ids)
+        limit = NEAR_MISS * sketch[1]
+        best = None
+        for entry in reversed(self.entries.values()):
+            if not math.isfinite(entry["cost"]) or entry["sketch"] is None:
+                continue
+            difference = changed_arcs(entry["sketch"], sketch)
+            if difference <= limit and (best is None or difference < best[0]):
+                best = difference, entry["path"]
+                if difference == 0:
+                    break
+        if best is None:
+            return None
+        path = [vertex_id for vertex_id in best[1] if vertex_id in present]
+        seen = set(path)
+        return path + [vertex_id for vertex_id in vertex_ids if vertex_id not in seen]
+
+    def solve(self, graph, solver, seed=None, **options):
+        solver, name, options = solver_call(solver, seed, options)
+        # Built once for both the key and, on a miss, the sketch.
+        sm = None if graph.matrix is not None else graph.sparse_matrix()
+        key = self.key(graph, name, options, sm)
+        stats = options.get("stats")
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            if stats is not None:
+                stats.update(entry["stats"], cached=True)
+            if options.get("observer") is not None:
+                options["observer"]({"done": True, "time": 0.0, "best": entry["cost"], "cached": True})
+            return list(entry["path"]), entry["cost"]
+
+        self.misses += 1
+        sketch = arc_sketch(graph, sm=sm)
+        if "initial" in inspect.signature(solver).parameters and options.get("initial") is None:
+            options["initial"] = self.warm_start(graph, sketch)
+            if options["initial"] is not None:
+                self.warm_starts += 1
+        if stats is None:
+            stats = options["stats"] = {}
+
+        # A cancelled run returns whatever it had; that is not worth remembering.
+        cancelled = []
+        progress = options.get("progress")
+        if progress is not None:
+            def report(iteration, temperature, best_cost, best_tour):
+                stop = progress(iteration, temperature, best_cost, best_tour)
+                if stop:
+                    cancelled.append(True)
+                return stop
+            options["progress"] = report
+
+        path, cost = solver(graph, **options)
+        if not cancelled:
+            self.put(key, path, cost, stats, sketch)
+        return path, cost
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in data.get("entries", []):
+            # Entries saved without a sketch are still hits, they only never warm-start.
+            sketch = item.get("sketch")
+            if sketch is not None:
+                sketch = np.array(sketch["hashes"], dtype=np.uint64), sketch["arcs"]
+            entry = {"path": item["path"], "cost": item["cost"], "stats": item.get("stats", {}), "sketch": sketch,
+                     "size": entry_size(item["path"], sketch)}
+            self.entries[item["key"]] = entry
+            self.size += entry["size"]
+
+    def save(self):
+        # Written to a temporary file first, so an interrupted save never leaves a broken cache.
+        entries = [{"key": key, "path": entry["path"], "cost": entry["cost"], "stats": entry["stats"],
+                    "sketch": None if entry["sketch"] is None else {"hashes": entry["sketch"][0].tolist(),
+                                                                   "arcs": entry["sketch"][1]}}
+                   for key, entry in self.entries.items()]
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"entries": entries}, f, ensure_ascii=False, default=float)
+        os.replace(temporary, self.path)
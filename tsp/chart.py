@@ -0,0 +1,85 @@
+import math
+
+from PyQt5.QtCore import QPointF, Qt
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import QWidget
+
+CHART_MARGIN = 22
+CHART_POINTS = 2000
+
+
+class ConvergenceChart(QWidget):
+    # Live plot of telemetry records: the best cost and, for the annealers, the current cost
+    # against the iteration; the cost range, the last acceptance ratio and throughput are printed on top.
+    def __init__(self):
+        super().__init__()
+        self.setMinimumHeight(140)
+        self.best = []
+        self.current = []
+        self.last = None
+
+    def clear(self):
+        self.best = []
+        self.current = []
+        self.last = None
+        self.update()
+
+    def add_records(self, records):
+        for record in records:
+            if record.get("done"):
+                continue
+            iteration = record.get("iteration")
+            best = record.get("best")
+            if iteration is None:
+                continue
+            if best is not None and math.isfinite(best):
+                self.best.append((iteration, best))
+            current = record.get("current")
+            if current is not None and math.isfinite(current):
+                self.current.append((iteration, current))
+            self.last = record
+        # Long runs are thinned out instead of growing without bound.
+        if len(self.best) > CHART_POINTS:
+            self.best = self.best[::2]
+        if len(self.current) > CHART_POINTS:
+            self.current = self.current[::2]
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), Qt.white)
+        painter.setPen(QPen(Qt.gray))
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+
+        points = self.best + self.current
+        if not points:
+            painter.drawText(self.rect(), Qt.AlignCenter, "Нет данных о сходимости")
+            return
+
+        x_min = min(x for x, _ in points)
+        x_max = max(x for x, _ in points)
+        y_min = min(y for _, y in points)
+        y_max = max(y for _, y in points)
+        width = self.width() - 2 * CHART_MARGIN
+        height = self.height() - 2 * CHART_MARGIN
+
+        def point(x, y):
+            px = CHART_MARGIN + (x - x_min) / max(x_max - x_min, 1e-12) * width
+            py = CHART_MARGIN + (1 - (y - y_min) / max(y_max - y_min, 1e-12)) * height
+            return QPointF(px, py)
+
+        for series, color in ((self.current, QColor(180, 180, 180)), (self.best, QColor(30, 90, 200))):
+            if series:
+                painter.setPen(QPen(color, 2))
+                painter.drawPolyline(QPolygonF([point(x, y) for x, y in series]))
+
+        painter.setPen(QPen(Qt.black))
+        top = self.rect().adjusted(4, 2, -4, 0)
+        bottom = self.rect().adjusted(4, 0, -4, -2)
+        painter.drawText(top, Qt.AlignLeft | Qt.AlignTop, f"{y_min:g} – {y_max:g}")
+        painter.drawText(bottom, Qt.AlignLeft | Qt.AlignBottom, f"{x_min:g}")
+        painter.drawText(bottom, Qt.AlignRight | Qt.AlignBottom, f"{x_max:g}")
+        if self.last is not None and "acceptance" in self.last:
+            info = f"приём {self.last['acceptance']:.0%}, {self.last['evaluations_per_second']:.0f} ход/с"
+            painter.drawText(top, Qt.AlignRight | Qt.AlignTop, info)
@@ -0,0 +1,125 @@
+import numpy as np
+
+from .construction import nearest_neighbour, sorted_candidates
+from .local_search import OrOpt, TwoOpt, candidate_lists
+from .matrix import batch_tour_cost, tour_cost
+
+
+def heuristic_matrix(matrix):
+    # eta = 1 / d on existing arcs; missing arcs (inf) get exactly zero desirability.
+    finite = np.isfinite(matrix)
+    positive = matrix[finite & (matrix > 0)]
+    floor = positive.min() / 2 if positive.size else 1.0
+    eta = np.zeros_like(matrix, dtype=np.float64)
+    np.divide(1.0, np.maximum(matrix, floor), out=eta, where=finite)
+    return eta
+
+
+def pheromone_limits(best_cost, n, rho, p_best=0.05):
+    tau_max = 1.0 / (rho * max(best_cost, 1e-12))
+    root = p_best ** (1.0 / n)
+    tau_min = tau_max * (1 - root) / ((n / 2 - 1) * root) if n > 2 else tau_max / 2
+    return min(tau_min, tau_max), tau_max
+
+
+def roulette(choice, rng):
+    wheel = np.cumsum(choice, axis=1)
+    total = wheel[:, -1]
+    spin = rng.random(len(choice)) * total
+    return np.minimum((wheel <= spin[:, None]).sum(axis=1), choice.shape[1] - 1), total
+
+
+def construct_tours(weights, candidates, starts, rng):
+    # All ants advance one step at a time. Each picks from its current vertex's candidate list
+    # by roulette wheel; only ants whose candidates are all visited spin over the full row.
+    count = len(starts)
+    n = len(weights)
+    rows = np.arange(count)
+    tours = np.empty((count, n), dtype=np.int64)
+    tours[:, 0] = starts
+    visited = np.zeros((count, n), dtype=bool)
+    visited[rows, starts] = True
+    current = starts
+
+    for step in range(1, n):
+        near = candidates[current]
+        choice = weights[current[:, None], near]
+        choice[visited[rows[:, None], near]] = 0.0
+        picked, total = roulette(choice, rng)
+        next_vertex = near[rows, picked]
+
+        exhausted = np.flatnonzero(total <= 0)
+        if len(exhausted):
+            choice = weights[current[exhausted]]
+            choice[visited[exhausted]] = 0.0
+            picked, total = roulette(choice, rng)
+            # No existing arc to an unvisited vertex: finish the permutation, the tour costs inf.
+            stuck = total <= 0
+            picked[stuck] = (~visited[exhausted[stuck]]).argmax(axis=1)
+            next_vertex[exhausted] = picked
+
+        tours[:, step] = next_vertex
+        visited[rows, next_vertex] = True
+        current = next_vertex
+    return tours
+
+
+def ant_colony_tour(matrix, seed=None, ants=None, iterations=200, alpha=1.0, beta=3.0, rho=0.02, k=20,
+                    local_search=None, progress=None):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    ants = n if ants is None else max(ants, 1)
+    eta = heuristic_matrix(matrix) ** beta
+    candidates = sorted_candidates(matrix, k)
+
+    best_tour, best_cost, complete = nearest_neighbour(matrix, 0)
+    best_tour = best_tour.tolist()
+    if complete and np.isfinite(best_cost):
+        reference = best_cost
+    else:
+        finite = matrix[np.isfinite(matrix)]
+        best_tour, best_cost = list(range(n)), np.inf
+        reference = finite.mean() * n if finite.size else 1.0
+    tau_min, tau_max = pheromone_limits(reference, n, rho)
+    tau = np.full((n, n), tau_max)
+    evaluations = 0
+    iteration = 0
+    search = None
+    if local_search is not None:
+        # One search for the whole run: every iteration only restarts its engine from a new tour.
+        neighbours = candidate_lists(matrix), candidate_lists(matrix.T)
+        if local_search == "2-opt":
+            search = TwoOpt(matrix, best_tour, neighbours)
+        else:
+            search = OrOpt(matrix, best_tour, neighbours, neighbourhood=local_search)
+
+    for iteration in range(1, iterations + 1):
+        tours = construct_tours(tau ** alpha * eta, candidates, rng.integers(n, size=ants), rng)
+        costs = batch_tour_cost(matrix, tours)
+        evaluations += ants
+
+        leader = int(costs.argmin())
+        tour, cost = tours[leader], float(costs[leader])
+        if search is not None:
+            search.engine.reset(tour)
+            tour = np.array(search.run())
+            cost = tour_cost(matrix, tour)
+        if cost < best_cost:
+            best_tour, best_cost = tour.tolist(), cost
+            tau_min, tau_max = pheromone_limits(best_cost, n, rho)
+
+        # MMAS: evaporate everywhere, let the iteration-best ant deposit (the global best every
+        # tenth iteration), then clamp to [tau_min, tau_max] to avoid stagnation.
+        tau *= 1 - rho
+        if iteration % 10 == 0 and np.isfinite(best_cost):
+            tour, cost = np.asarray(best_tour), best_cost
+        if np.isfinite(cost):
+            tau[tour, np.roll(tour, -1)] += 1.0 / max(cost, 1e-12)
+        np.clip(tau, tau_min, tau_max, out=tau)
+
+        if progress is not None and progress(iteration, None, best_cost, best_tour):
+            break
+
+    stats = {"evaluations": evaluations, "iterations": iteration}
+    return best_tour, best_cost, stats
@@ -0,0 +1,109 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .matrix import mapped_source, open_mapped
+from .sparse import SparseMatrix
+
+CHUNK_ELEMENTS = 1 << 20
+
+
+def nearest_neighbour_batch(matrix, starts, order=None):
+    # Each start extends its tour with the first unvisited vertex from the current vertex's
+    # pre-sorted candidate row; only starts whose candidates are exhausted fall back to a
+    # masked argmin over the full matrix row. On a SparseMatrix the fallback walks the vertex's
+    # CSR row instead, and a vertex with no arc to an unvisited one leaves the tour incomplete.
+    starts = np.asarray(starts, dtype=np.int64)
+    count = len(starts)
+    n = len(matrix)
+    rows_index = np.arange(count)
+    sparse = isinstance(matrix, SparseMatrix)
+    if order is None:
+        order = matrix.sorted_rows() if sparse else sorted_candidates(matrix)
+
+    tours = np.empty((count, n), dtype=np.int64)
+    tours[:, 0] = starts
+    visited = np.zeros((count, n), dtype=bool)
+    visited[rows_index, starts] = True
+    complete = np.ones(count, dtype=bool)
+    costs = np.zeros(count)
+    current = starts
+
+    for step in range(1, n):
+        candidates = order[current]
+        free = ~visited[rows_index[:, None], candidates]
+        if sparse:
+            free &= candidates >= 0
+        next_vertex = candidates[rows_index, free.argmax(axis=1)]
+        exhausted = np.flatnonzero(~free.any(axis=1))
+        if len(exhausted) and sparse:
+            for row in exhausted:
+                targets = matrix.row(current[row])[0]
+                targets = targets[~visited[row, targets]]
+                next_vertex[row] = targets[0] if len(targets) else visited[row].argmin()
+        elif len(exhausted):
+            rows = matrix[current[exhausted]]
+            np.putmask(rows, visited[exhausted], np.inf)
+            next_vertex[exhausted] = rows.argmin(axis=1)
+
+        weights = matrix.lookup(current, next_vertex) if sparse else matrix[current, next_vertex]
+        complete &= (weights != np.inf) & ~visited[rows_index, next_vertex]
+        tours[:, step] = next_vertex
+        visited[rows_index, next_vertex] = True
+        costs += weights
+        current = next_vertex
+
+    costs += matrix.lookup(current, starts) if sparse else matrix[current, starts]
+    costs[~complete] = np.inf
+    return tours, costs, complete
+
+
+def sorted_candidates(matrix, k=16):
+    n = len(matrix)
+    k = min(k, n)
+    nearest = np.argpartition(matrix, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (n, 1))
+    weights = np.take_along_axis(matrix, nearest, axis=1)
+    # lexsort breaks ties between equal weights by vertex index, like argmin
+    order = np.lexsort((nearest, weights), axis=1)
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+def nearest_neighbour(matrix, start):
+    tours, costs, complete = nearest_neighbour_batch(matrix, [start])
+    return tours[0], float(costs[0]), bool(complete[0])
+
+
+def _nearest_neighbour_chunk(args):
+    matrix, starts, order = args
+    if isinstance(matrix, tuple):
+        matrix = open_mapped(matrix)
+    return nearest_neighbour_batch(matrix, starts, order)
+
+
+def multi_start_nearest_neighbour(matrix, starts=None, k=1, workers=None):
+    source = mapped_source(matrix)
+    sparse = isinstance(matrix, SparseMatrix)
+    if not sparse:
+        matrix = np.asarray(matrix)
+    n = len(matrix)
+    starts = np.arange(n) if starts is None else np.asarray(starts, dtype=np.int64)
+    chunk_size = max(1, CHUNK_ELEMENTS // max(n, 1))
+    if workers and workers > 1:
+        chunk_size = min(chunk_size, -(-len(starts) // workers))
+    chunks = [starts[i:i + chunk_size] for i in range(0, len(starts), chunk_size)]
+    order = matrix.sorted_rows() if sparse else sorted_candidates(matrix)
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_nearest_neighbour_chunk, [(source or matrix, chunk, order) for chunk in chunks]))
+    else:
+        results = [nearest_neighbour_batch(matrix, chunk, order) for chunk in chunks]
+
+    if not results:
+        return []
+    tours = np.concatenate([tours for tours, _, _ in results])
+    costs = np.concatenate([costs for _, costs, _ in results])
+
+    finite = np.flatnonzero(np.isfinite(costs))
+    best = finite[np.argsort(costs[finite], kind="stable")[:k]]
+    return [(float(costs[i]), tours[i]) for i in best]
@@ -0,0 +1,118 @@
+import math
+
+CALIBRATION_ROUNDS = 60
+
+
+def calibrate_temperature(deltas, acceptance):
+    # Temperature at which the mean Metropolis probability exp(-delta / T) over the sampled uphill
+    # deltas equals acceptance. The mean grows with T, so bisection between the bounds given by
+    # the smallest and the largest delta finds it. Returns None when there is nothing to calibrate on.
+    deltas = [delta for delta in deltas if 0 < delta < math.inf]
+    if not deltas:
+        return None
+    scale = -math.log(acceptance)
+    low, high = min(deltas) / scale, max(deltas) / scale
+    for _ in range(CALIBRATION_ROUNDS):
+        temp = math.sqrt(low * high)
+        if sum(math.exp(-delta / temp) for delta in deltas) / len(deltas) < acceptance:
+            low = temp
+        else:
+            high = temp
+    return math.sqrt(low * high)
+
+
+class GeometricCooling:
+    # T <- rate * T. Without an explicit rate it is chosen so that the schedule goes from the
+    # initial to the final temperature in the given number of steps.
+    name = "geometric"
+
+    def __init__(self, rate=None):
+        self.rate = rate
+
+    def start(self, initial, final, steps):
+        self.step_rate = self.rate or (final / initial) ** (1 / steps)
+
+    def next(self, temp, step, acceptance):
+        return temp * self.step_rate
+
+    def reheat(self, best_temp):
+        return None
+
+
+class LundyMeesCooling(GeometricCooling):
+    # T <- T / (1 + beta * T): fast at high temperature, slow near the end.
+    name = "lundy-mees"
+
+    def start(self, initial, final, steps):
+        self.beta = (initial - final) / (steps * initial * final)
+
+    def next(self, temp, step, acceptance):
+        return temp / (1 + self.beta * temp)
+
+
+class LogarithmicCooling(GeometricCooling):
+    # T_k = T_0 / (1 + c * ln(1 + k)), the shape of the convergent logarithmic schedule,
+    # with c chosen to reach the final temperature in the given number of steps.
+    name = "logarithmic"
+
+    def start(self, initial, final, steps):
+        self.initial = initial
+        self.c = (initial / final - 1) / math.log(1 + steps)
+
+    def next(self, temp, step, acceptance):
+        return self.initial / (1 + self.c * math.log(2 + step))
+
+
+class AdaptiveCooling(GeometricCooling):
+    # Geometric cooling that slows down while moves are still being accepted at a moderate
+    # rate and reheats on stagnation: back to a multiple of the temperature at which the best
+    # tour was found, at most reheats times.
+    name = "adaptive"
+
+    def __init__(self, rate=None, reheats=3, factor=4.0):
+        super().__init__(rate)
+        self.reheats = reheats
+        self.factor = factor
+
+    def start(self, initial, final, steps):
+        super().start(initial, final, steps)
+        self.initial = initial
+        self.remaining = self.reheats
+
+    def next(self, temp, step, acceptance):
+        if 0.05 < acceptance < 0.5:
+            return temp * math.sqrt(self.step_rate)
+        return temp * self.step_rate
+
+    def reheat(self, best_temp):
+        if self.remaining == 0:
+            return None
+        self.remaining -= 1
+        return min(self.initial, best_temp * self.factor)
+
+
+class AcceptanceRatioCooling(GeometricCooling):
+    # The rule the Boltzmann annealer used before the temperatures were calibrated: the rate follows
+    # the share of accepted moves at the last temperature, slow while most moves pass, fast once few do.
+    name = "acceptance-ratio"
+
+    def next(self, temp, step, acceptance):
+        if acceptance > 0.6:
+            return temp * 0.99
+        if acceptance > 0.3:
+            return temp * 0.95
+        return temp * 0.9
+
+
+SCHEDULES = {
+    schedule.name: schedule
+    for schedule in (GeometricCooling, LundyMeesCooling, LogarithmicCooling, AdaptiveCooling, AcceptanceRatioCooling)
+}
+
+
+def make_schedule(schedule):
+    if isinstance(schedule, str):
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Неизвестное расписание охлаждения: {schedule}")
+        return SCHEDULES[schedule]()
+    return schedule
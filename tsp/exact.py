@@ -0,0 +1,627 @@
+import heapq
+import time
+
+import numpy as np
+
+from .matrix import tour_cost
+
+HELD_KARP_MAX_VERTICES = 23
+BRANCH_AND_BOUND_REPORT_INTERVAL = 64
+ASSIGNMENT_TOLERANCE = 1e-3
+
+
+def held_karp_dtype(matrix):
+    finite = matrix[np.isfinite(matrix)]
+    if finite.size == 0:
+        return np.float32
+    integral = np.array_equal(finite, np.round(finite))
+    if integral and finite.min() >= 0 and finite.max() * len(matrix) < 2 ** 24:
+        return np.float32
+    return np.float64
+
+
+def held_karp_memory(n, dtype=np.float64):
+    if n < 2:
+        return 0
+    states = (1 << (n - 1)) * (n - 1)
+    return states * (np.dtype(dtype).itemsize + 1)
+
+
+def popcounts(count):
+    masks = np.arange(1 << count, dtype=np.int64)
+    bits = np.zeros(len(masks), dtype=np.int8)
+    for b in range(count):
+        bits += ((masks >> b) & 1).astype(np.int8)
+    return bits
+
+
+def held_karp_tour(matrix, progress=None):
+    # Vertex 0 is the fixed start; the remaining m = n - 1 vertices are bits of the mask.
+    # cost[mask, j] is the cheapest path 0 -> ... -> j+1 through exactly the vertices in mask,
+    # parent[mask, j] the vertex visited before j+1 on that path (-1 when it is vertex 0).
+    matrix = np.asarray(matrix)
+    n = len(matrix)
+    if n == 1:
+        return [0], 0.0
+    m = n - 1
+    dtype = held_karp_dtype(matrix)
+    inner = matrix[1:, 1:].astype(dtype)
+
+    cost = np.full((1 << m, m), np.inf, dtype=dtype)
+    parent = np.full((1 << m, m), -1, dtype=np.int8)
+    singles = 1 << np.arange(m)
+    cost[singles, np.arange(m)] = matrix[0, 1:]
+
+    bits = popcounts(m)
+    order = np.argsort(bits, kind="stable")
+    bounds = np.searchsorted(bits[order], np.arange(m + 2))
+
+    for size in range(2, m + 1):
+        layer = order[bounds[size]:bounds[size + 1]]
+        for j in range(m):
+            masks = layer[(layer >> j) & 1 == 1]
+            previous = cost[masks ^ (1 << j)] + inner[:, j]
+            best = previous.argmin(axis=1)
+            cost[masks, j] = previous[np.arange(len(masks)), best]
+            parent[masks, j] = best
+        if progress is not None and progress(size, None, np.inf, []):
+            return None, np.inf
+
+    full = (1 << m) - 1
+    closing = cost[full] + matrix[1:, 0]
+    last = int(closing.argmin())
+    total = float(closing[last])
+
+    tour = []
+    mask = full
+    while last >= 0:
+        tour.append(last + 1)
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    tour.append(0)
+    return tour[::-1], total
+
+
+def assignment_augment(cost, u, v, row_of_col, row):
+    # One shortest augmenting path of the Hungarian method; column n is the virtual root.
+    n = len(cost)
+    row_of_col[n] = row
+    minv = np.full(n, np.inf)
+    used = np.zeros(n + 1, dtype=bool)
+    way = np.full(n, n)
+    j0 = n
+    while True:
+        used[j0] = True
+        i0 = row_of_col[j0]
+        free = ~used[:n]
+        reduced = cost[i0] - u[i0] - v[:n]
+        better = free & (reduced < minv)
+        minv[better] = reduced[better]
+        way[better] = j0
+        j1 = int(np.where(free, minv, np.inf).argmin())
+        delta = minv[j1]
+        columns = np.flatnonzero(used)
+        u[row_of_col[columns]] += delta
+        v[columns] -= delta
+        minv[free] -= delta
+        j0 = j1
+        if row_of_col[j0] < 0:
+            break
+    while j0 != n:
+        j1 = way[j0]
+        row_of_col[j0] = row_of_col[j1]
+        j0 = j1
+
+
+def assignment(cost):
+    n = len(cost)
+    u = np.zeros(n)
+    v = np.zeros(n + 1)
+    row_of_col = np.full(n + 1, -1)
+    for row in range(n):
+        assignment_augment(cost, u, v, row_of_col, row)
+    return u, v, row_of_col
+
+
+def assignment_cycles(row_of_col):
+    n = len(row_of_col) - 1
+    successor = np.empty(n, dtype=np.int64)
+    successor[row_of_col[:n]] = np.arange(n)
+    seen = np.zeros(n, dtype=bool)
+    cycles = []
+    for start in range(n):
+        if seen[start]:
+            continue
+        cycle = []
+        vertex = start
+        while not seen[vertex]:
+            seen[vertex] = True
+            cycle.append(vertex)
+            vertex = int(successor[vertex])
+        cycles.append(cycle)
+    return cycles
+
+
+class BranchAndBound:
+    # Best-first search over subproblems; subclasses provide the root and the branching rule.
+    # Every evaluated node is either pruned, turned into a tour (a new incumbent) or pushed as (bound, payload).
+
+    def __init__(self, matrix, incumbent=None, time_limit=None, progress=None, integral=False):
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        n = len(self.matrix)
+        finite = self.matrix[np.isfinite(self.matrix)]
+        self.big = (np.abs(finite).max() if finite.size else 1.0) * (n + 1) + 1
+        self.cost = np.where(np.isfinite(self.matrix), self.matrix, self.big)
+        self.time_limit = time_limit
+        self.progress = progress
+        self.integral = integral
+        self.best_tour = None
+        self.best_cost = np.inf
+        if incumbent is not None:
+            self.accept([int(i) for i in incumbent])
+        self.lower_bound = -np.inf
+        self.nodes = 0
+        self.stopped = False
+
+    def accept(self, tour):
+        cost = tour_cost(self.matrix, tour)
+        if cost < self.best_cost:
+            start = tour.index(0)
+            self.best_tour = tour[start:] + tour[:start]
+            self.best_cost = cost
+
+    def can_improve(self, bound):
+        if bound >= self.big:
+            return False
+        if self.best_cost == np.inf:
+            return True
+        if self.integral:
+            return np.ceil(bound - 1e-6) < self.best_cost
+        return bound < self.best_cost - 1e-9 * max(1.0, abs(self.best_cost))
+
+    def report(self):
+        if self.progress is None:
+            return False
+        return self.progress(self.nodes, None, self.best_cost, self.best_tour or [])
+
+    def interrupted(self):
+        # Also checked inside long bound computations, so that the time limit and cancelling
+        # apply there and not only between nodes.
+        if self.report() or (self.time_limit is not None and time.perf_counter() - self.started > self.time_limit):
+            self.stopped = True
+        return self.stopped
+
+    def gap(self):
+        if not np.isfinite(self.best_cost):
+            return np.inf
+        return max(self.best_cost - self.lower_bound, 0.0) / max(abs(self.best_cost), 1e-12)
+
+    def root(self):
+        raise NotImplementedError
+
+    def branch(self, payload):
+        raise NotImplementedError
+
+    def run(self):
+        self.started = time.perf_counter()
+        n = len(self.matrix)
+        if n < 2:
+            self.best_tour, self.best_cost, self.lower_bound = list(range(n)), 0.0, 0.0
+            return self.best_tour, self.best_cost
+
+        heap = []
+        counter = 0
+        for bound, payload in self.root():
+            heap.append((bound, counter, payload))
+        while heap and not self.stopped:
+            bound, _, payload = heap[0]
+            self.lower_bound = bound
+            if not self.can_improve(bound):
+                heap.clear()
+                break
+            heapq.heappop(heap)
+            self.nodes += 1
+            for child_bound, child_payload in self.branch(payload):
+                if self.can_improve(child_bound):
+                    counter += 1
+                    heapq.heappush(heap, (child_bound, counter, child_payload))
+
+            if self.nodes % BRANCH_AND_BOUND_REPORT_INTERVAL == 0 and self.report():
+                self.stopped = True
+                break
+            if self.time_limit is not None and time.perf_counter() - self.started > self.time_limit:
+                self.stopped = True
+                break
+
+        if heap:
+            self.lower_bound = min(heap[0][0], self.best_cost)
+        else:
+            self.lower_bound = self.best_cost
+        self.report()
+        return self.best_tour, self.best_cost
+
+
+class AssignmentBranchAndBound(BranchAndBound):
+    # Carpaneto-Toth scheme: assignment lower bound, branching on the free arcs of the shortest subtour.
+    # Children inherit the parent's duals, so each one is re-solved with a single augmentation.
+
+    def node_cost(self, excluded, included):
+        cost = self.cost.copy()
+        if excluded:
+            rows, cols = map(list, zip(*excluded))
+            cost[rows, cols] = self.big
+        if included:
+            rows, cols = map(list, zip(*included))
+            kept = cost[rows, cols]
+            cost[rows, :] = self.big
+            cost[:, cols] = self.big
+            cost[rows, cols] = kept
+        return cost
+
+    def evaluate(self, cost, excluded, included, u, v, row_of_col):
+        n = len(cost)
+        bound = float(cost[row_of_col[:n], np.arange(n)].sum())
+        if not self.can_improve(bound):
+            return None
+        cycles = assignment_cycles(row_of_col)
+        if len(cycles) == 1:
+            self.accept(cycles[0])
+            return None
+        return bound, (excluded, included, u, v, row_of_col, cycles)
+
+    def root(self):
+        u, v, row_of_col = assignment(self.cost)
+        node = self.evaluate(self.cost, (), (), u, v, row_of_col)
+        return [node] if node is not None else []
+
+    def branch(self, payload):
+        excluded, included, u, v, row_of_col, cycles = payload
+        fixed = set(included)
+        arcs = min(([(a, b) for a, b in zip(cycle, cycle[1:] + cycle[:1]) if (a, b) not in fixed]
+                    for cycle in cycles), key=len)
+        children = []
+        for h, arc in enumerate(arcs):
+            child_excluded = excluded + (arc,)
+            child_included = included + tuple(arcs[:h])
+            cost = self.node_cost(child_excluded, child_included)
+            child_u, child_v, child_rows = u.copy(), v.copy(), row_of_col.copy()
+            child_rows[arc[1]] = -1
+            assignment_augment(cost, child_u, child_v, child_rows, arc[0])
+            node = self.evaluate(cost, child_excluded, child_included, child_u, child_v, child_rows)
+            if node is not None:
+                children.append(node)
+        return children
+
+
+def spanning_tree(weights):
+    # Prim from vertex 0 on a symmetric weight matrix; returns the edges as (parents, children), or
+    # None when some vertex is only reachable through infinite weights.
+    n = len(weights)
+    weights = weights.copy()
+    weights[:, 0] = np.inf
+    key = weights[0].copy()
+    parent = np.zeros(n, dtype=np.int64)
+    tails = np.empty(n - 1, dtype=np.int64)
+    for position in range(n - 1):
+        j = int(key.argmin())
+        if key[j] == np.inf:
+            return None
+        tails[position] = j
+        # A column of infinities takes j out of every later comparison.
+        key[j] = np.inf
+        weights[:, j] = np.inf
+        better = weights[j] < key
+        key[better] = weights[j][better]
+        parent[better] = j
+    return parent[tails], tails
+
+
+def one_tree(weights):
+    # Minimum spanning tree on vertices 1..n-1 plus the two cheapest edges at vertex 0.
+    tree = spanning_tree(weights[1:, 1:])
+    if tree is None:
+        return None
+    heads, tails = tree
+    ends = np.argpartition(weights[0, 1:], 1)[:2] + 1
+    return np.concatenate(([0, 0], heads + 1)), np.concatenate((ends, tails + 1))
+
+
+def arc_tree(arcs):
+    # Directed counterpart of the 1-tree (Jonker-Volgenant): the 1-tree of the symmetric instance on
+    # 2n vertices, with every vertex split into an in and an out copy joined by a forced edge, comes
+    # down to a spanning tree of the n vertices whose edges are arcs in either direction, leaving
+    # vertex 0 only by its outgoing arcs, plus the cheapest arc back into vertex 0. Returns the arcs
+    # as (starts, ends).
+    forward = arcs <= arcs.T
+    forward[0] = True
+    forward[:, 0] = False
+    tree = spanning_tree(np.where(forward, arcs, arcs.T))
+    if tree is None:
+        return None
+    heads, tails = tree
+    starts = np.where(forward[heads, tails], heads, tails)
+    back = int(arcs[:, 0].argmin())
+    return np.append(starts, back), np.append(heads + tails - starts, 0)
+
+
+class LagrangianBranchAndBound(BranchAndBound):
+    # Held-Karp style bound: a tree relaxation of the tour whose degree constraints are moved into the
+    # objective as penalties and improved by subgradient ascent. Subclasses provide the relaxation,
+    # relax(weights, penalties) -> (heads, tails, gradient) or None, with gradient == 0 exactly for a
+    # tour. state[i, j] is 1 for an included arc, -1 for an excluded (or missing) one, 0 for a free one.
+
+    root_iterations = 3000
+    check_interval = 10
+    root_period = 50
+    child_iterations = 30
+    directed = False
+
+    def evaluate(self, state, penalties, iterations, period=5, margin=0.01):
+        # Penalties are unbounded, so forced and forbidden arcs are pinned with infinities.
+        modified = np.where(state == 1, -np.inf, self.cost)
+        modified[state == -1] = np.inf
+
+        best_bound = -np.inf
+        best = None
+        step_scale = 2.0
+        stall = 0
+        for iteration in range(1, iterations + 1):
+            relaxed = self.relax(modified, penalties)
+            if relaxed is None:
+                return None
+            heads, tails, gradient = relaxed
+            if (state[heads, tails] == -1).any():
+                return None
+            bound = float(self.cost[heads, tails].sum() + (penalties * gradient).sum())
+            if bound > best_bound + 1e-9:
+                best_bound = bound
+                best = (penalties.copy(), heads, tails, gradient)
+                stall = 0
+            else:
+                stall += 1
+                if stall >= period:
+                    step_scale /= 2
+                    stall = 0
+            if not self.can_improve(best_bound):
+                return None
+            if not gradient.any():
+                self.accept(self.tour_from_edges(heads, tails))
+                return None
+            if step_scale < 1e-4:
+                break
+            # Every ascent bound is a valid lower bound, so an interrupted ascent keeps the best so far.
+            if iteration % self.check_interval == 0 and self.interrupted():
+                break
+            target = min(self.best_cost, best_bound + margin * abs(best_bound) + 1e-9)
+            penalties = penalties + step_scale * (target - bound) / float((gradient * gradient).sum()) * gradient
+        return best_bound, (state,) + best
+
+    def child(self, state, penalties, included, excluded):
+        state = state.copy()
+        for arcs, value in ((included, 1), (excluded, -1)):
+            for a, b in arcs:
+                state[a, b] = value
+                if not self.directed:
+                    state[b, a] = value
+        if not self.propagate(state):
+            return None
+        return self.evaluate(state, penalties, self.child_iterations)
+
+    def root(self):
+        state = np.where(np.isfinite(self.matrix), 0, -1).astype(np.int8)
+        np.fill_diagonal(state, -1)
+        if not self.propagate(state):
+            return []
+        # The root ascent aims at the incumbent and halves its step rarely, so it gets close to
+        # the Held-Karp bound; children start from the parent's penalties and only refine them.
+        node = self.evaluate(state, self.initial_penalties(), self.root_iterations, self.root_period, 1.0)
+        return [node] if node is not None else []
+
+
+class OneTreeBranchAndBound(LagrangianBranchAndBound):
+    # Symmetric instances: 1-tree bound with one penalty per vertex,
+    # Volgenant-Jonker branching on the free tree edges of a vertex of degree above two.
+
+    def initial_penalties(self):
+        return np.zeros(len(self.matrix))
+
+    def relax(self, weights, pi):
+        tree = one_tree(weights + pi[:, None] + pi[None, :])
+        if tree is None:
+            return None
+        heads, tails = tree
+        return heads, tails, np.bincount(np.concatenate([heads, tails]), minlength=len(pi)) - 2
+
+    def propagate(self, state):
+        n = len(state)
+        changed = True
+        while changed:
+            changed = False
+            included = (state == 1).sum(axis=1)
+            free = (state == 0).sum(axis=1)
+            if (included > 2).any() or (included + free < 2).any():
+                return False
+            for v in np.flatnonzero((included == 2) & (free > 0)):
+                row = state[v] == 0
+                state[v, row] = -1
+                state[row, v] = -1
+                changed = True
+            if changed:
+                continue
+            for v in np.flatnonzero((included + free == 2) & (free > 0)):
+                row = state[v] == 0
+                state[v, row] = 1
+                state[row, v] = 1
+                changed = True
+            if changed:
+                continue
+
+            # Included edges form paths; the edge closing a path early would create a subtour.
+            neighbours = [np.flatnonzero(state[v] == 1) for v in range(n)]
+            seen = np.zeros(n, dtype=bool)
+            for start in range(n):
+                if seen[start] or len(neighbours[start]) != 1:
+                    continue
+                previous, vertex, length = -1, start, 1
+                seen[start] = True
+                while True:
+                    following = [w for w in neighbours[vertex] if w != previous]
+                    if not following:
+                        break
+                    previous, vertex = vertex, int(following[0])
+                    seen[vertex] = True
+                    length += 1
+                if length < n and state[start, vertex] == 0:
+                    state[start, vertex] = state[vertex, start] = -1
+                    changed = True
+            cyclic = ~seen & (included == 2)
+            if cyclic.any() and (included == 2).sum() < n:
+                return False
+        return True
+
+    def tour_from_edges(self, heads, tails):
+        n = len(self.matrix)
+        neighbours = [[] for _ in range(n)]
+        for a, b in zip(heads, tails):
+            neighbours[a].append(int(b))
+            neighbours[b].append(int(a))
+        tour = [0, neighbours[0][0]]
+        while len(tour) < n:
+            a, b = neighbours[tour[-1]]
+            tour.append(a if a != tour[-2] else b)
+        return tour
+
+    def branch(self, payload):
+        state, pi, heads, tails, gradient = payload
+        v = int(gradient.argmax())
+        tree = [int(b) for a, b in zip(heads, tails) if a == v] + [int(a) for a, b in zip(heads, tails) if b == v]
+        free = sorted((w for w in tree if state[v, w] == 0), key=lambda w: -self.cost[v, w])
+        first = (v, free[0])
+        options = [((), (first,))]
+        if (state[v] == 1).any() or len(free) < 2:
+            options.append(((first,), ()))
+        else:
+            second = (v, free[1])
+            options.append(((first,), (second,)))
+            options.append(((first, second), ()))
+        children = []
+        for included, excluded in options:
+            node = self.child(state, pi, included, excluded)
+            if node is not None:
+                children.append(node)
+        return children
+
+
+class ArcTreeBranchAndBound(LagrangianBranchAndBound):
+    # Asymmetric instances whose assignment bound is weak (nearly symmetric weights, where the
+    # assignment falls apart into 2-cycles): arc tree bound with a penalty on the out- and on the
+    # in-degree of every vertex, starting from the assignment duals so that the root bound is never
+    # below the assignment bound. Branching excludes, then includes the dearest free tree arc at the
+    # vertex with the most arcs on one side.
+
+    directed = True
+
+    def initial_penalties(self):
+        u, v, _ = assignment(self.cost)
+        return -np.stack((u, v[:len(u)]))
+
+    def relax(self, weights, penalties):
+        tree = arc_tree(weights + penalties[0][:, None] + penalties[1][None, :])
+        if tree is None:
+            return None
+        starts, ends = tree
+        n = len(weights)
+        return starts, ends, np.stack((np.bincount(starts, minlength=n), np.bincount(ends, minlength=n))) - 1
+
+    def propagate(self, state):
+        n = len(state)
+        changed = True
+        while changed:
+            changed = False
+            included, free = state == 1, state == 0
+            out_included, in_included = included.sum(axis=1), included.sum(axis=0)
+            out_free, in_free = free.sum(axis=1), free.sum(axis=0)
+            if ((out_included > 1).any() or (in_included > 1).any()
+                    or (out_included + out_free < 1).any() or (in_included + in_free < 1).any()):
+                return False
+            rows = np.flatnonzero((out_included == 1) & (out_free > 0))
+            cols = np.flatnonzero((in_included == 1) & (in_free > 0))
+            if len(rows) or len(cols):
+                state[rows] = np.where(state[rows] == 0, -1, state[rows])
+                state[:, cols] = np.where(state[:, cols] == 0, -1, state[:, cols])
+                changed = True
+                continue
+            rows = np.flatnonzero((out_included == 0) & (out_free == 1))
+            cols = np.flatnonzero((in_included == 0) & (in_free == 1))
+            if len(rows) or len(cols):
+                state[rows] = np.where(state[rows] == 0, 1, state[rows])
+                state[:, cols] = np.where(state[:, cols] == 0, 1, state[:, cols])
+                changed = True
+                continue
+
+            # Included arcs form paths; the arc from the end of a path back to its start would
+            # close a subtour.
+            successor = np.where(out_included == 1, included.argmax(axis=1), -1).tolist()
+            seen = np.zeros(n, dtype=bool)
+            for start in np.flatnonzero((in_included == 0) & (out_included == 1)).tolist():
+                vertex, length = start, 1
+                seen[start] = True
+                while successor[vertex] >= 0:
+                    vertex = successor[vertex]
+                    seen[vertex] = True
+                    length += 1
+                if length < n and state[vertex, start] == 0:
+                    state[vertex, start] = -1
+                    changed = True
+            cyclic = ~seen & (out_included == 1)
+            if cyclic.any() and out_included.sum() < n:
+                return False
+        return True
+
+    def tour_from_edges(self, starts, ends):
+        successor = dict(zip(starts.tolist(), ends.tolist()))
+        tour = [0]
+        while len(tour) < len(self.matrix):
+            tour.append(successor[tour[-1]])
+        return tour
+
+    def branch(self, payload):
+        state, penalties, starts, ends, gradient = payload
+        side, v = np.unravel_index(int(gradient.argmax()), gradient.shape)
+        if side == 0:
+            arcs = [(v, int(b)) for a, b in zip(starts, ends) if a == v]
+        else:
+            arcs = [(int(a), v) for a, b in zip(starts, ends) if b == v]
+        first = max((arc for arc in arcs if state[arc] == 0), key=lambda arc: self.cost[arc])
+        children = []
+        for included, excluded in (((), (first,)), ((first,), ())):
+            node = self.child(state, penalties, included, excluded)
+            if node is not None:
+                children.append(node)
+        return children
+
+
+def assignment_suffices(cost, tolerance=ASSIGNMENT_TOLERANCE):
+    # On random-like asymmetric weights the subtours of the assignment are linked at next to no
+    # reduced cost, so the arc tree at the assignment duals adds nothing to the assignment bound and
+    # the far cheaper assignment nodes win.
+    n = len(cost)
+    u, v, _ = assignment(cost)
+    reduced = cost - u[:, None] - v[None, :n]
+    np.fill_diagonal(reduced, np.inf)
+    starts, ends = arc_tree(reduced)
+    return reduced[starts, ends].sum() <= tolerance * abs(u.sum() + v[:n].sum())
+
+def branch_and_bound_tour(matrix, incumbent=None, time_limit=None, progress=None, integral=False):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if len(matrix) >= 5 and np.array_equal(matrix, matrix.T):
+        search = OneTreeBranchAndBound(matrix, incumbent, time_limit, progress, integral)
+    else:
+        search = AssignmentBranchAndBound(matrix, incumbent, time_limit, progress, integral)
+        if len(matrix) >= 5 and not assignment_suffices(search.cost):
+            search = ArcTreeBranchAndBound(matrix, incumbent, time_limit, progress, integral)
+    tour, cost = search.run()
+    stats = {"lower_bound": search.lower_bound, "gap": search.gap(), "nodes": search.nodes, "evaluations": search.nodes,
+             "optimal": not search.stopped and tour is not None}
+    return tour, cost, stats
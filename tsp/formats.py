@@ -0,0 +1,288 @@
+import csv
+import json
+import os
+import struct
+from array import array
+
+import numpy as np
+
+from .graph import Graph, load_graphs, save_graph
+from .matrix import DistanceMatrix
+
+TSPLIB_EXTENSIONS = (".tsp", ".atsp")
+BINARY_EXTENSION = ".tspm"
+BINARY_MAGIC = b"TSPMMAP1"
+BINARY_ALIGNMENT = 4096
+LAYOUT_SIZE = 1000
+DISTANCE_BLOCK = 256
+
+
+class FormatError(ValueError):
+    pass
+
+
+def circle_layout(n):
+    # Formats without coordinates still need somewhere to draw the vertices.
+    angles = 2 * np.pi * np.arange(n) / max(n, 1)
+    radius = LAYOUT_SIZE / 2
+    return np.column_stack((radius + radius * np.cos(angles), radius + radius * np.sin(angles))).round()
+
+
+def coordinate_value(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def matrix_graph(vertex_ids, coords, matrix, integral, name):
+    np.fill_diagonal(matrix, np.inf)
+    vertices = [(vertex_id, coordinate_value(x), coordinate_value(y))
+                for vertex_id, (x, y) in zip(vertex_ids, coords.tolist())]
+    return Graph(vertices, None, name, matrix=DistanceMatrix(vertex_ids, matrix, integral))
+
+
+def next_line(f):
+    line = f.readline()
+    if not line:
+        raise FormatError("Файл TSPLIB оборвался посреди раздела")
+    return line
+
+
+def read_coords(f, n):
+    coords = np.zeros((n, 2))
+    for _ in range(n):
+        parts = next_line(f).split()
+        if len(parts) < 3:
+            raise FormatError(f"Ожидалась строка «номер x y», получено: {' '.join(parts)}")
+        coords[int(parts[0]) - 1] = float(parts[1]), float(parts[2])
+    return coords
+
+
+def read_full_matrix(f, n):
+    # Values may be wrapped over any number of lines; they go straight into the preallocated array.
+    flat = np.empty(n * n)
+    filled = 0
+    while filled < n * n:
+        values = np.array(next_line(f).split(), dtype=np.float64)
+        if filled + len(values) > n * n:
+            raise FormatError("В EDGE_WEIGHT_SECTION больше значений, чем DIMENSION²")
+        flat[filled:filled + len(values)] = values
+        filled += len(values)
+    return flat.reshape(n, n)
+
+
+def euc_2d_matrix(coords):
+    # TSPLIB EUC_2D: nint of the Euclidean distance, computed a block of rows at a time.
+    n = len(coords)
+    matrix = np.empty((n, n))
+    for start in range(0, n, DISTANCE_BLOCK):
+        block = coords[start:start + DISTANCE_BLOCK]
+        distance = np.hypot(block[:, None, 0] - coords[None, :, 0], block[:, None, 1] - coords[None, :, 1])
+        matrix[start:start + DISTANCE_BLOCK] = np.floor(distance + 0.5)
+    return matrix
+
+
+def read_tsplib(path):
+    spec = {}
+    coords = None
+    matrix = None
+    with open(path, encoding="utf-8") as f:
+        for line in iter(f.readline, ""):
+            key, separator, value = line.partition(":")
+            key = key.strip().upper()
+            if not key:
+                continue
+            if key == "EOF":
+                break
+            if key in ("NODE_COORD_SECTION", "DISPLAY_DATA_SECTION", "EDGE_WEIGHT_SECTION"):
+                if "DIMENSION" not in spec:
+                    raise FormatError("В заголовке TSPLIB нет DIMENSION")
+                n = int(spec["DIMENSION"])
+                if key == "EDGE_WEIGHT_SECTION":
+                    if spec.get("EDGE_WEIGHT_FORMAT", "FULL_MATRIX").upper() != "FULL_MATRIX":
+                        raise FormatError(f"Формат весов {spec['EDGE_WEIGHT_FORMAT']} не поддерживается, "
+                                          f"только FULL_MATRIX")
+                    matrix = read_full_matrix(f, n)
+                elif key == "NODE_COORD_SECTION" or coords is None:
+                    coords = read_coords(f, n)
+                else:
+                    read_coords(f, n)
+            elif separator:
+                spec[key] = value.strip()
+            else:
+                raise FormatError(f"Раздел TSPLIB {key} не поддерживается")
+
+    if "DIMENSION" not in spec:
+        raise FormatError("В заголовке TSPLIB нет DIMENSION")
+    n = int(spec["DIMENSION"])
+    weight_type = spec.get("EDGE_WEIGHT_TYPE", "").upper()
+    if weight_type == "EUC_2D":
+        if coords is None:
+            raise FormatError("Для EUC_2D нужен NODE_COORD_SECTION")
+        matrix, integral = euc_2d_matrix(coords), True
+    elif weight_type == "EXPLICIT":
+        if matrix is None:
+            raise FormatError("Для EXPLICIT нужен EDGE_WEIGHT_SECTION")
+        integral = bool(np.array_equal(matrix, np.round(matrix)))
+    else:
+        raise FormatError(f"Тип весов {weight_type or '(не указан)'} не поддерживается, только EXPLICIT и EUC_2D")
+
+    if coords is None:
+        coords = circle_layout(n)
+    return matrix_graph(list(range(1, n + 1)), coords, matrix, integral, spec.get("NAME", path))
+
+
+def write_tsplib(graph, path):
+    # Always EXPLICIT FULL_MATRIX: TSP if the matrix is symmetric, ATSP otherwise.
+    # TSPLIB numbers vertices 1..n, so the original ids are replaced by their position.
+    dm = graph.distance_matrix()
+    n = len(dm)
+    off_diagonal = ~np.eye(n, dtype=bool)
+    if not np.isfinite(dm.matrix[off_diagonal]).all():
+        raise FormatError("В TSPLIB нельзя сохранить граф с отсутствующими рёбрами, используйте CSV")
+
+    fmt = "%d" if dm.integral else "%.17g"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"NAME : {graph.name or os.path.splitext(os.path.basename(path))[0]}\n")
+        f.write(f"TYPE : {'TSP' if dm.symmetric else 'ATSP'}\n")
+        f.write(f"DIMENSION : {n}\n")
+        f.write("EDGE_WEIGHT_TYPE : EXPLICIT\n")
+        f.write("EDGE_WEIGHT_FORMAT : FULL_MATRIX\n")
+        f.write("DISPLAY_DATA_TYPE : TWOD_DISPLAY\n")
+        f.write("EDGE_WEIGHT_SECTION\n")
+        for i in range(n):
+            row = dm.matrix[i].copy()
+            row[i] = 0
+            np.savetxt(f, row[None], fmt=fmt)
+        f.write("DISPLAY_DATA_SECTION\n")
+        for i, (_, x, y) in enumerate(graph.vertices, 1):
+            f.write(f"{i} {x} {y}\n")
+        f.write("EOF\n")
+
+
+def parse_id(value):
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def parse_weight(value):
+    try:
+        return int(value), True
+    except ValueError:
+        return float(value), False
+
+
+def read_csv(path):
+    # Edge list "start,end,weight", one arc per row; a header row and lines starting with # are skipped.
+    index = {}
+    rows, cols, weights = array("q"), array("q"), array("d")
+    integral = True
+    with open(path, newline="", encoding="utf-8") as f:
+        for number, row in enumerate(csv.reader(f), 1):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            if len(row) < 3:
+                raise FormatError(f"Строка {number}: ожидалось «начало,конец,вес»")
+            try:
+                weight, is_int = parse_weight(row[2])
+            except ValueError:
+                if not index:
+                    continue
+                raise FormatError(f"Строка {number}: вес «{row[2]}» не число")
+            start = index.setdefault(parse_id(row[0]), len(index))
+            end = index.setdefault(parse_id(row[1]), len(index))
+            rows.append(start)
+            cols.append(end)
+            weights.append(weight)
+            integral = integral and is_int
+
+    n = len(index)
+    matrix = np.full((n, n), np.inf)
+    matrix[np.frombuffer(rows, dtype=np.int64), np.frombuffer(cols, dtype=np.int64)] = np.frombuffer(weights)
+    name = os.path.splitext(os.path.basename(path))[0]
+    return matrix_graph(list(index), circle_layout(n), matrix, integral, name)
+
+
+def write_csv(graph, path):
+    dm = graph.distance_matrix()
+    ids = dm.vertex_ids
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["start", "end", "weight"])
+        for i in range(len(dm)):
+            row = dm.matrix[i]
+            cols = np.flatnonzero(np.isfinite(row))
+            writer.writerows((ids[i], ids[j], dm.cost_value(row[j])) for j in cols.tolist())
+
+
+def aligned(offset):
+    return -(-offset // BINARY_ALIGNMENT) * BINARY_ALIGNMENT
+
+
+def write_binary(graph, path):
+    # Layout: magic, uint32 header length, JSON header, then page-aligned raw little-endian arrays:
+    # the n x n float64 matrix (row-major, inf for missing arcs), n x 2 float64 coordinates, n int64 ids.
+    dm = graph.distance_matrix()
+    n = len(dm)
+    if not all(isinstance(vertex_id, int) for vertex_id in dm.vertex_ids):
+        raise FormatError("В бинарном формате номера вершин должны быть целыми")
+    coords = {vertex_id: (x, y) for vertex_id, x, y in graph.vertices}
+    coords = np.array([coords[vertex_id] for vertex_id in dm.vertex_ids], dtype="<f8").reshape(n, 2)
+
+    header = json.dumps({"name": graph.name, "n": n, "integral": dm.integral}, ensure_ascii=False).encode("utf-8")
+    matrix_offset = aligned(len(BINARY_MAGIC) + 4 + len(header))
+
+    with open(path, "wb") as f:
+        f.write(BINARY_MAGIC + struct.pack("<I", len(header)) + header)
+        f.write(bytes(matrix_offset - f.tell()))
+        np.ascontiguousarray(dm.matrix, dtype="<f8").tofile(f)
+        coords.tofile(f)
+        np.array(dm.vertex_ids, dtype="<i8").tofile(f)
+
+
+def read_binary(path):
+    # The matrix is not read: it is mapped read-only, so opening is instant and every process
+    # that maps the same file shares the OS page cache.
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise FormatError(f"{path} не является бинарным файлом графа")
+        length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode("utf-8"))
+
+    n = header["n"]
+    matrix_offset = aligned(len(BINARY_MAGIC) + 4 + length)
+    coords_offset = matrix_offset + 8 * n * n
+    if n:
+        matrix = np.memmap(path, dtype="<f8", mode="r", offset=matrix_offset, shape=(n, n))
+    else:
+        matrix = np.empty((0, 0))
+    coords = np.fromfile(path, dtype="<f8", count=2 * n, offset=coords_offset).reshape(n, 2)
+    vertex_ids = np.fromfile(path, dtype="<i8", count=n, offset=coords_offset + 16 * n).tolist()
+    vertices = [(vertex_id, coordinate_value(x), coordinate_value(y))
+                for vertex_id, (x, y) in zip(vertex_ids, coords.tolist())]
+    return Graph(vertices, None, header["name"], matrix=DistanceMatrix(vertex_ids, matrix, header["integral"]))
+
+
+def read_graphs(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == BINARY_EXTENSION:
+        return [read_binary(path)]
+    if extension in TSPLIB_EXTENSIONS:
+        return [read_tsplib(path)]
+    if extension == ".csv":
+        return [read_csv(path)]
+    return load_graphs(path)
+
+
+def write_graph(graph, path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == BINARY_EXTENSION:
+        write_binary(graph, path)
+    elif extension in TSPLIB_EXTENSIONS:
+        write_tsplib(graph, path)
+    elif extension == ".csv":
+        write_csv(graph, path)
+    else:
+        save_graph(graph, path)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from .graph import Graph
+from .matrix import DistanceMatrix
+
+SIZE = 1000
+
+
+def complete_graph(coords, matrix, name):
+    vertices = [(i + 1, int(x), int(y)) for i, (x, y) in enumerate(coords)]
+    matrix = matrix.astype(np.float64)
+    np.fill_diagonal(matrix, np.inf)
+    return Graph(vertices, None, name, matrix=DistanceMatrix([v[0] for v in vertices], matrix, integral=True))
+
+
+def euclidean_distances(coords):
+    difference = coords[:, None, :] - coords[None, :, :]
+    return np.rint(np.hypot(difference[..., 0], difference[..., 1])).astype(np.int64)
+
+
+def euclidean_instance(n, seed=None):
+    rng = np.random.default_rng(seed)
+    coords = rng.integers(0, SIZE, size=(n, 2))
+    return complete_graph(coords, euclidean_distances(coords), f"euclidean-{n}")
+
+
+def clustered_instance(n, seed=None, clusters=None):
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(1, n // 25)
+    centres = rng.integers(SIZE // 10, SIZE - SIZE // 10, size=(clusters, 2))
+    members = rng.integers(clusters, size=n)
+    coords = np.clip(np.rint(centres[members] + rng.normal(0, SIZE / 30, size=(n, 2))), 0, SIZE - 1)
+    return complete_graph(coords, euclidean_distances(coords), f"clustered-{n}")
+
+
+def asymmetric_instance(n, seed=None):
+    # Euclidean distances with an independent surcharge per direction, like one-way streets.
+    rng = np.random.default_rng(seed)
+    coords = rng.integers(0, SIZE, size=(n, 2))
+    base = euclidean_distances(coords)
+    matrix = np.rint(base * rng.uniform(1.0, 1.5, size=(n, n))).astype(np.int64)
+    return complete_graph(coords, matrix, f"asymmetric-{n}")
+
+
+GENERATORS = {
+    "euclidean": euclidean_instance,
+    "clustered": clustered_instance,
+    "asymmetric": asymmetric_instance,
+}
@@ -0,0 +1,90 @@
+import numpy as np
+
+from .construction import nearest_neighbour_batch
+from .matrix import batch_tour_cost
+
+
+def order_crossover(first, second, rng):
+    # OX for a whole batch of parent pairs: each child keeps a slice of the first parent in
+    # place and fills the rest with the missing vertices in the order they follow the slice
+    # in the second parent. The relative order of vertices, and so arc direction, is kept.
+    count, n = first.shape
+    rows = np.arange(count)[:, None]
+    cuts = np.sort(rng.integers(0, n + 1, size=(count, 2)), axis=1)
+    positions = np.arange(n)
+    keep = (positions >= cuts[:, :1]) & (positions < cuts[:, 1:])
+
+    children = np.where(keep, first, -1)
+    in_slice = np.zeros((count, n), dtype=bool)
+    in_slice[np.nonzero(keep)[0], first[keep]] = True
+
+    rotated = (positions + cuts[:, 1:]) % n
+    donors = np.take_along_axis(second, rotated, axis=1)
+    values = donors[~in_slice[rows, donors]]
+    targets = rotated[~np.take_along_axis(keep, rotated, axis=1)]
+    children[np.repeat(np.arange(count), n - keep.sum(axis=1)), targets] = values
+    return children
+
+
+def displacement_mutation(tours, rate, rng):
+    # Moves a random segment to another place without reversing it.
+    count, n = tours.shape
+    if n < 4:
+        return tours
+    for row in np.flatnonzero(rng.random(count) < rate):
+        i, j = np.sort(rng.choice(n + 1, 2, replace=False))
+        tour = tours[row]
+        rest = np.concatenate((tour[:i], tour[j:]))
+        k = rng.integers(len(rest) + 1)
+        tours[row] = np.concatenate((rest[:k], tour[i:j], rest[k:]))
+    return tours
+
+
+def tournament(costs, count, rng, size=3):
+    entrants = rng.integers(len(costs), size=(count, size))
+    return entrants[np.arange(count), costs[entrants].argmin(axis=1)]
+
+
+def initial_population(matrix, population, rng):
+    n = len(matrix)
+    tours = rng.permuted(np.tile(np.arange(n), (population, 1)), axis=1)
+    starts = rng.choice(n, min(n, max(1, population // 4)), replace=False)
+    greedy, _, complete = nearest_neighbour_batch(matrix, starts)
+    greedy = greedy[complete]
+    tours[:len(greedy)] = greedy
+    return tours
+
+
+def genetic_tour(matrix, seed=None, population=100, generations=500, elite=2, mutation_rate=0.2, progress=None):
+    matrix = np.asarray(matrix)
+    rng = np.random.default_rng(seed)
+    population = max(population, 2)
+    elite = min(elite, population)
+
+    tours = initial_population(matrix, population, rng)
+    costs = batch_tour_cost(matrix, tours)
+    best = int(costs.argmin())
+    best_tour, best_cost = tours[best].copy(), float(costs[best])
+    evaluations = population
+    generation = 0
+
+    for generation in range(1, generations + 1):
+        order = np.argsort(costs, kind="stable")
+        offspring = population - elite
+        first = tours[tournament(costs, offspring, rng)]
+        second = tours[tournament(costs, offspring, rng)]
+        children = displacement_mutation(order_crossover(first, second, rng), mutation_rate, rng)
+
+        tours = np.concatenate((tours[order[:elite]], children))
+        costs = np.concatenate((costs[order[:elite]], batch_tour_cost(matrix, children)))
+        evaluations += offspring
+
+        best = int(costs.argmin())
+        if costs[best] < best_cost:
+            best_tour, best_cost = tours[best].copy(), float(costs[best])
+
+        if progress is not None and progress(generation, None, best_cost, best_tour.tolist()):
+            break
+
+    stats = {"evaluations": evaluations, "generations": generation}
+    return best_tour.tolist(), best_cost, stats
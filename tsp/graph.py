@@ -0,0 +1,107 @@
+import json
+
+from .matrix import DistanceMatrix
+from .sparse import SparseMatrix
+
+
+class Graph:
+    def __init__(self, vertices, edges, name=None, matrix=None):
+        # Imported graphs may come with a ready DistanceMatrix and edges=None; the edge list
+        # is then only built if someone asks for it.
+        self.vertices = vertices
+        self._edges = edges
+        self.name = name
+        self.matrix = matrix
+
+    @property
+    def edges(self):
+        if self._edges is None:
+            self._edges = self.matrix.edges()
+        return self._edges
+
+    @property
+    def complete(self):
+        n = len(self.vertices)
+        arcs = self.matrix.arcs if self._edges is None else len(self._edges)
+        return arcs >= n * (n - 1)
+
+    @property
+    def vertex_ids(self):
+        return [vertex_id for vertex_id, _, _ in self.vertices]
+
+    @classmethod
+    def from_widget(cls, widget):
+        vertices = [(v.id, v.x, v.y) for v in widget.vertices]
+        edges = [(e.start_vertex.id, e.end_vertex.id, e.weight) for e in widget.edges]
+        if widget.matrix is not None:
+            # Imported arcs stay in the array; edges drawn by hand are applied on top of it.
+            return cls(vertices, None, matrix=widget.matrix.extended([v[0] for v in vertices], edges))
+        return cls(vertices, edges)
+
+    @classmethod
+    def from_dict(cls, data, name=None):
+        vertices = []
+        for item in data["vertices"]:
+            if isinstance(item, dict):
+                vertices.append((item["id"], item.get("x", 0), item.get("y", 0)))
+            else:
+                vertices.append((item, 0, 0))
+        edges = []
+        for item in data["edges"]:
+            if isinstance(item, dict):
+                edges.append((item["start"], item["end"], item["weight"]))
+            else:
+                start_id, end_id, weight = item
+                edges.append((start_id, end_id, weight))
+        return cls(vertices, edges, data.get("name", name))
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "vertices": [{"id": vertex_id, "x": x, "y": y} for vertex_id, x, y in self.vertices],
+            "edges": [{"start": s, "end": e, "weight": w} for s, e, w in self.edges],
+        }
+
+    def adjacency_matrix(self, fill_missing=True):
+        return get_adjacency_matrix(self.vertex_ids, self.edges, fill_missing)
+
+    def sparse_matrix(self):
+        if self._edges is None:
+            return SparseMatrix.from_dense(self.matrix)
+        return SparseMatrix.from_edges(self.vertex_ids, self.edges)
+
+    def distance_matrix(self):
+        if self.matrix is not None:
+            return self.matrix
+        return DistanceMatrix.from_edges(self.vertex_ids, self.edges)
+
+
+def get_adjacency_matrix(vertex_ids, edges, fill_missing=True):
+    adj_matrix = {vertex_id: {} for vertex_id in vertex_ids}
+
+    for start_id, end_id, weight in edges:
+        adj_matrix[start_id][end_id] = weight
+
+    if fill_missing:
+        for id1 in vertex_ids:
+            for id2 in vertex_ids:
+                if id1 != id2 and id2 not in adj_matrix[id1]:
+                    adj_matrix[id1][id2] = float('inf')
+
+    return adj_matrix
+
+
+def load_graphs(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    if isinstance(data, dict) and "instances" in data:
+        data = data["instances"]
+    if isinstance(data, dict):
+        return [Graph.from_dict(data, name=path)]
+    return [Graph.from_dict(item, name=f"{path}[{i}]") for i, item in enumerate(data)]
+
+
+def save_graph(graph, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(graph.to_dict(), f, ensure_ascii=False)
@@ -0,0 +1,216 @@
+import bisect
+import heapq
+
+from .graph import Graph
+from .local_search import OrOpt
+from .moves import INF, measure
+from .solvers import construction_matrix
+from .sparse import SparseMatrix, SparseRow
+
+
+class IncrementalTour:
+    # Keeps a tour together with its move engine and candidate lists between edits of the graph,
+    # so that an edit costs O(n) bookkeeping plus a local search started only at the vertices the
+    # edit touched, instead of a full solve. Vertices are indexed in the order they were added.
+    # A vertex joins the tour once it has a finite arc from and a finite arc to the tour; until then
+    # it waits in pending with the arcs it has so far, keyed by (start_id, end_id).
+    def __init__(self, graph, path, local_search="auto", k=10):
+        # Vertices of graph missing from path (added while path was being solved) wait like new ones.
+        ids = set(path)
+        later = [vertex_id for vertex_id in graph.vertex_ids if vertex_id not in ids]
+        if later:
+            edges = graph.edges
+            graph = Graph([vertex for vertex in graph.vertices if vertex[0] in ids],
+                          [arc for arc in edges if arc[0] in ids and arc[1] in ids])
+        dm = construction_matrix(graph)
+        self.vertex_ids = list(dm.vertex_ids)
+        self.index = {vertex_id: i for i, vertex_id in enumerate(self.vertex_ids)}
+        self.integral = dm.integral
+        self.k = k
+        if local_search == "auto":
+            local_search = "2-opt" if dm.symmetric else "or-2opt"
+        self.search = OrOpt(dm.matrix, dm.to_indices(path), k=k, neighbourhood=local_search)
+        self.sparse = isinstance(dm, SparseMatrix)
+        if not self.sparse and not isinstance(self.engine.rows[0], list):
+            # Rows of a large matrix are views of the graph's array; edits must not write into it.
+            self.engine.rows = [row.tolist() for row in self.engine.rows]
+        self.pending = {vertex_id: {} for vertex_id in later}
+        for start_id, end_id, weight in (edges if later else ()):
+            for vertex_id in (start_id, end_id):
+                if vertex_id in self.pending:
+                    self.pending[vertex_id][(start_id, end_id)] = weight
+        self.insert_ready()
+
+    @property
+    def engine(self):
+        return self.search.engine
+
+    @property
+    def path(self):
+        # Always from the first vertex, so that an edit does not merely rotate the shown path.
+        tour = self.engine.tour
+        start = self.engine.pos[0]
+        return [self.vertex_ids[v] for v in tour[start:] + tour[:start]]
+
+    @property
+    def cost(self):
+        cost = self.engine.cost
+        if self.integral and cost != INF:
+            return int(cost)
+        return cost
+
+    def out_candidates(self, u):
+        row = self.engine.rows[u]
+        arcs = row.items() if self.sparse else enumerate(row)
+        return [c for _, c in heapq.nsmallest(self.k, ((w, c) for c, w in arcs if w != INF and c != u))]
+
+    def in_candidates(self, v):
+        rows = self.engine.rows
+        arcs = ((rows[c][v], c) for c in range(self.engine.n) if c != v)
+        return [c for _, c in heapq.nsmallest(self.k, ((w, c) for w, c in arcs if w != INF))]
+
+    def offer(self, candidates, c, weight, weight_of):
+        # Merges one new arc into a candidate list sorted by weight_of, in O(k).
+        if weight == INF:
+            return
+        weights = [weight_of(x) for x in candidates]
+        k = bisect.bisect_right(weights, weight)
+        if k < self.k:
+            candidates.insert(k, c)
+            del candidates[self.k:]
+
+    def store(self, u, v, weight):
+        row = self.engine.rows[u]
+        if weight is None or weight == INF:
+            if self.sparse:
+                row.pop(v, None)
+            else:
+                row[v] = INF
+            return
+        row[v] = weight
+        self.integral = self.integral and isinstance(weight, int)
+
+    def check_symmetric(self, arcs):
+        # A symmetric tour may only lose the property; 2-opt stays correct either way.
+        rows = self.engine.rows
+        if self.engine.symmetric and any(rows[u][v] != rows[v][u] for u, v in arcs):
+            self.engine.symmetric = False
+
+    def refresh(self, touched):
+        # Costs are summed again from scratch: O(n), and no drift from the incremental deltas.
+        engine = self.engine
+        engine.missing, engine.total = measure(engine.arc_weights())
+        engine.prefix_valid = False
+        tour = engine.tour
+        pos = engine.pos
+        n = engine.n
+        start = set()
+        for v in touched:
+            start.update((v, tour[pos[v] - 1], tour[(pos[v] + 1) % n]))
+        self.search.run(vertices=sorted(start))
+        return self.path, self.cost
+
+    def improve(self):
+        # Local search from every vertex, for a tour built after edits instead of through them.
+        return self.refresh(range(self.engine.n))
+
+    def add_vertex(self, vertex_id, arcs=()):
+        # arcs: (start_id, end_id, weight) incident to the new vertex.
+        self.pending[vertex_id] = {}
+        for start_id, end_id, weight in arcs:
+            self.pending[vertex_id][(start_id, end_id)] = weight
+        return self.insert_ready()
+
+    def ready(self, arcs):
+        # Some tour vertex a has an arc to the vertex and some other tour vertex b an arc from it,
+        # so it can go between them.
+        sources = {start_id for (start_id, end_id), weight in arcs.items()
+                   if start_id in self.index and weight is not None and weight != INF}
+        targets = {end_id for (start_id, end_id), weight in arcs.items()
+                   if end_id in self.index and weight is not None and weight != INF}
+        return bool(sources) and bool(targets) and len(sources | targets) >= 2
+
+    def insert_ready(self):
+        # Inserting a vertex may make others ready, through their arcs to it.
+        touched = []
+        inserted = True
+        while inserted:
+            inserted = False
+            for vertex_id, arcs in list(self.pending.items()):
+                if not self.ready(arcs):
+                    continue
+                del self.pending[vertex_id]
+                known = [(start_id, end_id, weight) for (start_id, end_id), weight in arcs.items()
+                         if start_id in self.index or end_id in self.index]
+                touched.append(self.insert(vertex_id, known))
+                inserted = True
+        if touched:
+            return self.refresh(touched)
+        return self.path, self.cost
+
+    def insert(self, vertex_id, arcs):
+        # arcs: (start_id, end_id, weight) between the vertex and the tour. It is spliced into the
+        # tour by cheapest insertion.
+        engine = self.engine
+        v = engine.n
+        self.vertex_ids.append(vertex_id)
+        self.index[vertex_id] = v
+        if self.sparse:
+            engine.rows.append(SparseRow())
+        else:
+            for row in engine.rows:
+                row.append(INF)
+            engine.rows.append([INF] * (v + 1))
+        engine.n += 1
+        engine.pos.append(0)
+
+        pairs = []
+        for start_id, end_id, weight in arcs:
+            u, w = self.index[start_id], self.index[end_id]
+            self.store(u, w, weight)
+            pairs.append((u, w))
+        self.check_symmetric(pairs)
+
+        rows = engine.rows
+        tour = engine.tour
+        best = None
+        for k in range(len(tour)):
+            a, b = tour[k], tour[(k + 1) % len(tour)]
+            new = measure((rows[a][v], rows[v][b]))
+            old = measure((rows[a][b],))
+            delta = (new[0] - old[0], new[1] - old[1])
+            if best is None or delta < best[0]:
+                best = delta, k
+        position = best[1] + 1
+        tour.insert(position, v)
+        for k in range(position, len(tour)):
+            engine.pos[tour[k]] = k
+
+        # Only the new vertex needs full candidate lists; every other list just gains v or not.
+        out_neighbours = self.search.out_neighbours
+        in_neighbours = self.search.in_neighbours
+        out_neighbours.append(self.out_candidates(v))
+        in_neighbours.append(self.in_candidates(v))
+        for u, w in pairs:
+            if w == v and u != v:
+                self.offer(out_neighbours[u], v, rows[u][v], lambda c, u=u: rows[u][c])
+            elif u == v and w != v:
+                self.offer(in_neighbours[w], v, rows[v][w], lambda c, w=w: rows[c][w])
+        return v
+
+    def set_weight(self, start_id, end_id, weight):
+        # weight None removes the arc. None comes back for an arc between vertices this tour does
+        # not know.
+        if start_id in self.pending or end_id in self.pending:
+            for vertex_id in (start_id, end_id):
+                if vertex_id in self.pending:
+                    self.pending[vertex_id][(start_id, end_id)] = weight
+            return self.insert_ready()
+        if start_id not in self.index or end_id not in self.index:
+            return None
+        u, v = self.index[start_id], self.index[end_id]
+        self.store(u, v, weight)
+        self.check_symmetric([(u, v)])
+        self.search.out_neighbours[u] = self.out_candidates(u)
+        self.search.in_neighbours[v] = self.in_candidates(v)
+        return self.refresh((u, v))
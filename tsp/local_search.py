@@ -0,0 +1,266 @@
+from collections import deque
+
+import numpy as np
+
+from .moves import MoveEngine
+from .sparse import SparseMatrix
+from .spatial import candidate_lists_from_coords
+
+EPSILON = 1e-9
+PROGRESS_INTERVAL = 256
+
+
+def candidate_lists(matrix, k=10):
+    matrix = np.asarray(matrix)
+    n = len(matrix)
+    k = min(k, n - 1)
+    if k <= 0:
+        return [[] for _ in range(n)]
+
+    nearest = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+    weights = np.take_along_axis(matrix, nearest, axis=1)
+    order = np.argsort(weights, axis=1, kind="stable")
+    nearest = np.take_along_axis(nearest, order, axis=1)
+    weights = np.take_along_axis(weights, order, axis=1)
+
+    finite = np.isfinite(weights)
+    return [nearest[i][finite[i]].tolist() for i in range(n)]
+
+
+def geometric_candidate_lists(coords, matrix, k=10):
+    if not isinstance(matrix, SparseMatrix):
+        matrix = np.asarray(matrix)
+    nearest = candidate_lists_from_coords(coords, k)
+    out_lists = []
+    in_lists = []
+    for v, candidates in enumerate(nearest):
+        out_lists.append(sorted((c for c in candidates if matrix[v, c] != np.inf), key=lambda c: matrix[v, c]))
+        in_lists.append(sorted((c for c in candidates if matrix[c, v] != np.inf), key=lambda c: matrix[c, v]))
+    return out_lists, in_lists
+
+
+def is_improvement(delta):
+    return delta[0] < 0 or (delta[0] == 0 and delta[1] < -EPSILON)
+
+
+class TwoOpt:
+    def __init__(self, matrix, tour, neighbours=None, k=10, best_improvement=False):
+        self.engine = MoveEngine(matrix, tour)
+        if neighbours is None and isinstance(matrix, SparseMatrix):
+            neighbours = matrix.candidate_lists(k), matrix.transpose().candidate_lists(k)
+        elif neighbours is None:
+            neighbours = candidate_lists(matrix, k), candidate_lists(np.asarray(matrix).T, k)
+        self.out_neighbours, self.in_neighbours = neighbours
+        self.best_improvement = best_improvement
+        self.evaluations = 0
+
+    def candidate_moves(self, v):
+        # Every move removes arcs (a, b), (c, d) with b = succ(a), d = succ(c), adds (a, c), (b, d)
+        # and reverses b..c. An improving move shortens at least one arc at a shared endpoint,
+        # so v is tried in each of the four roles against its candidate lists.
+        engine = self.engine
+        rows = engine.rows
+        tour = engine.tour
+        pos = engine.pos
+        n = engine.n
+        succ = tour[(pos[v] + 1) % n]
+        pred = tour[pos[v] - 1]
+
+        limit = rows[v][succ]
+        for c in self.out_neighbours[v]:
+            if rows[v][c] >= limit:
+                break
+            yield v, succ, c, tour[(pos[c] + 1) % n]
+
+        limit = rows[pred][v]
+        for d in self.out_neighbours[v]:
+            if rows[v][d] >= limit:
+                break
+            yield pred, v, tour[pos[d] - 1], d
+
+        limit = rows[v][succ]
+        for a in self.in_neighbours[v]:
+            if rows[a][v] >= limit:
+                break
+            yield a, tour[(pos[a] + 1) % n], v, succ
+
+        limit = rows[pred][v]
+        for b in self.in_neighbours[v]:
+            if rows[b][v] >= limit:
+                break
+            yield tour[pos[b] - 1], b, pred, v
+
+    def improve_city(self, v):
+        engine = self.engine
+        best = None
+        for endpoints in self.candidate_moves(v):
+            a, b, c, d = endpoints
+            if b == c or d == a:
+                continue
+            i = engine.pos[b]
+            j = engine.pos[c]
+            delta = engine.reverse_delta(i, j)
+            self.evaluations += 1
+            if not is_improvement(delta):
+                continue
+            if not self.best_improvement:
+                engine.apply_reverse(i, j, delta)
+                return endpoints
+            if best is None or delta < best[0]:
+                best = (delta, i, j, endpoints)
+
+        if best is None:
+            return None
+        delta, i, j, endpoints = best
+        engine.apply_reverse(i, j, delta)
+        return endpoints
+
+    def run(self, progress=None, vertices=None):
+        # With vertices only they are queued at first: the search spreads from there through the
+        # endpoints of the moves it makes, which keeps re-optimization after a local edit local.
+        engine = self.engine
+        if vertices is None:
+            active = deque(engine.tour)
+            queued = [True] * engine.n
+        else:
+            active = deque(dict.fromkeys(vertices))
+            queued = [False] * engine.n
+            for v in active:
+                queued[v] = True
+        processed = 0
+        self.stopped = False
+
+        while active:
+            v = active.popleft()
+            queued[v] = False
+            processed += 1
+            if progress is not None and processed % PROGRESS_INTERVAL == 0:
+                if progress(processed, None, engine.cost, engine.tour):
+                    self.stopped = True
+                    break
+            while True:
+                endpoints = self.improve_city(v)
+                if endpoints is None:
+                    break
+                for vertex in endpoints:
+                    if not queued[vertex]:
+                        queued[vertex] = True
+                        active.append(vertex)
+
+        return engine.tour
+
+
+NEIGHBOURHOODS = {
+    "2-opt": {"2-opt"},
+    "or-opt": {"or-opt"},
+    "or-2opt": {"or-opt", "2-opt"},
+    "3-opt": {"or-opt", "3-opt"},
+}
+
+
+class OrOpt(TwoOpt):
+    # Moves that keep the orientation of every segment: Or-opt relocates up to max_segment
+    # vertices, 3-opt segment insertion swaps two adjacent segments of any length. Only three
+    # arcs change, so on asymmetric weights the delta stays O(1) without prefix sums.
+
+    def __init__(self, matrix, tour, neighbours=None, k=10, best_improvement=False, neighbourhood="or-opt",
+                 max_segment=3):
+        super().__init__(matrix, tour, neighbours, k, best_improvement)
+        self.moves = NEIGHBOURHOODS[neighbourhood]
+        self.max_segment = max_segment
+
+    def or_opt_moves(self, v):
+        engine = self.engine
+        rows = engine.rows
+        tour = engine.tour
+        pos = engine.pos
+        n = engine.n
+
+        for length in range(1, min(self.max_segment, n - 2) + 1):
+            for i in (pos[v], (pos[v] - length + 1) % n):
+                j = (i + length - 1) % n
+                first = tour[i]
+                last = tour[j]
+                before = tour[i - 1]
+                after = tour[(j + 1) % n]
+
+                limit = rows[before][first]
+                for t in self.in_neighbours[first]:
+                    if rows[t][first] >= limit:
+                        break
+                    if t != before and (pos[t] - i) % n >= length:
+                        yield pos[t], (i, j), (before, first, last, after, t, tour[(pos[t] + 1) % n])
+
+                limit = rows[last][after]
+                for u in self.out_neighbours[last]:
+                    if rows[last][u] >= limit:
+                        break
+                    if u != after and (pos[u] - i) % n >= length:
+                        yield pos[u] - 1, (i, j), (before, first, last, after, tour[pos[u] - 1], u)
+                if length == 1:
+                    break
+
+    def segment_insertion_moves(self, v):
+        # Cut p -> v ... l -> q and t -> u, reconnect as p -> q ... t -> v ... l -> u.
+        engine = self.engine
+        rows = engine.rows
+        tour = engine.tour
+        pos = engine.pos
+        n = engine.n
+        i = pos[v]
+        before = tour[i - 1]
+
+        for t in self.in_neighbours[v]:
+            gain = rows[before][v] - rows[t][v]
+            if gain <= 0:
+                break
+            if t == before:
+                continue
+            u = tour[(pos[t] + 1) % n]
+            offset = (pos[t] - i) % n
+            for last in self.in_neighbours[u]:
+                if gain + rows[t][u] - rows[last][u] <= 0:
+                    break
+                j = pos[last]
+                if (j - i) % n < offset:
+                    yield pos[t], (i, j), (before, v, last, tour[(j + 1) % n], t, u)
+
+    def improve_city(self, v):
+        if "2-opt" in self.moves:
+            endpoints = super().improve_city(v)
+            if endpoints is not None:
+                return endpoints
+
+        engine = self.engine
+        best = None
+        candidates = []
+        if "or-opt" in self.moves:
+            candidates.append(self.or_opt_moves(v))
+        if "3-opt" in self.moves:
+            candidates.append(self.segment_insertion_moves(v))
+        for moves in candidates:
+            for k, (i, j), endpoints in moves:
+                k %= engine.n
+                delta = engine.insert_delta(i, j, k)
+                self.evaluations += 1
+                if not is_improvement(delta):
+                    continue
+                if not self.best_improvement:
+                    engine.apply_insert(i, j, k, delta)
+                    return endpoints
+                if best is None or delta < best[0]:
+                    best = (delta, i, j, k, endpoints)
+
+        if best is None:
+            return None
+        delta, i, j, k, endpoints = best
+        engine.apply_insert(i, j, k, delta)
+        return endpoints
+
+
+def two_opt(tour, matrix, neighbours=None, k=10, best_improvement=False, progress=None):
+    return TwoOpt(matrix, tour, neighbours, k, best_improvement).run(progress)
+
+
+def or_opt(tour, matrix, neighbours=None, k=10, best_improvement=False, progress=None, neighbourhood="or-opt"):
+    return OrOpt(matrix, tour, neighbours, k, best_improvement, neighbourhood).run(progress)
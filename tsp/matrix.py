@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+
+SYMMETRY_BLOCK = 256
+
+
+class DistanceMatrix:
+    def __init__(self, vertex_ids, matrix, integral=False):
+        self.vertex_ids = list(vertex_ids)
+        self.index = {vertex_id: i for i, vertex_id in enumerate(self.vertex_ids)}
+        if isinstance(matrix, np.memmap) and matrix.dtype == np.float64 and matrix.flags.c_contiguous:
+            # Keep memory-mapped matrices as they are: no copy, and workers can map the same file.
+            self.matrix = matrix
+        else:
+            self.matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        self.integral = integral
+
+    @classmethod
+    def from_edges(cls, vertex_ids, edges):
+        vertex_ids = list(vertex_ids)
+        index = {vertex_id: i for i, vertex_id in enumerate(vertex_ids)}
+        n = len(vertex_ids)
+        matrix = np.full((n, n), np.inf)
+        if edges:
+            rows = np.fromiter((index[s] for s, _, _ in edges), dtype=np.int64, count=len(edges))
+            cols = np.fromiter((index[e] for _, e, _ in edges), dtype=np.int64, count=len(edges))
+            weights = np.array([w for _, _, w in edges], dtype=np.float64)
+            matrix[rows, cols] = weights
+            integral = all(isinstance(w, int) for _, _, w in edges)
+        else:
+            integral = True
+        np.fill_diagonal(matrix, np.inf)
+        return cls(vertex_ids, matrix, integral)
+
+    def extended(self, vertex_ids, edges):
+        # Same arcs over a new vertex list (new vertices start unconnected), with edges applied on top.
+        extra = DistanceMatrix.from_edges(vertex_ids, edges)
+        ids = [vertex_id for vertex_id in extra.vertex_ids if vertex_id in self.index]
+        old = np.array([self.index[vertex_id] for vertex_id in ids], dtype=np.int64)
+        new = np.array([extra.index[vertex_id] for vertex_id in ids], dtype=np.int64)
+        matrix = np.full((len(extra), len(extra)), np.inf)
+        matrix[np.ix_(new, new)] = self.matrix[np.ix_(old, old)]
+        rows, cols = np.nonzero(np.isfinite(extra.matrix))
+        matrix[rows, cols] = extra.matrix[rows, cols]
+        return DistanceMatrix(extra.vertex_ids, matrix, self.integral and extra.integral)
+
+    def edges(self):
+        rows, cols = np.nonzero(np.isfinite(self.matrix))
+        weights = self.matrix[rows, cols]
+        if self.integral:
+            weights = weights.astype(np.int64)
+        ids = self.vertex_ids
+        return [(ids[s], ids[e], w) for s, e, w in zip(rows.tolist(), cols.tolist(), weights.tolist())]
+
+    @property
+    def arcs(self):
+        return int(np.isfinite(self.matrix).sum())
+
+    @property
+    def symmetric(self):
+        return is_symmetric(self.matrix)
+
+    def __len__(self):
+        return len(self.vertex_ids)
+
+    def to_indices(self, path):
+        return np.array([self.index[vertex_id] for vertex_id in path], dtype=np.int64)
+
+    def to_ids(self, tour):
+        return [self.vertex_ids[i] for i in tour]
+
+    def tour_cost(self, tour):
+        return tour_cost(self.matrix, tour)
+
+    def batch_tour_cost(self, tours):
+        return batch_tour_cost(self.matrix, tours)
+
+    def cost_value(self, cost):
+        cost = float(cost)
+        if self.integral and math.isfinite(cost):
+            return int(cost)
+        return cost
+
+
+def tour_cost(matrix, tour):
+    tour = np.asarray(tour)
+    return float(matrix[tour, np.roll(tour, -1)].sum())
+
+
+def batch_tour_cost(matrix, tours):
+    tours = np.asarray(tours)
+    return matrix[tours, np.roll(tours, -1, axis=1)].sum(axis=1)
+
+
+def is_symmetric(matrix):
+    # Compared SYMMETRY_BLOCK rows against the same columns at a time, so a memory-mapped matrix
+    # is read once and no n x n temporary is allocated.
+    n = len(matrix)
+    for start in range(0, n, SYMMETRY_BLOCK):
+        end = start + SYMMETRY_BLOCK
+        if not np.array_equal(matrix[start:end], np.asarray(matrix[:, start:end]).T):
+            return False
+    return True
+
+
+def mapped_source(matrix):
+    # A memory-mapped matrix travels to worker processes as (file, offset, shape, dtype)
+    # and is mapped again there instead of being pickled.
+    if isinstance(matrix, np.memmap) and matrix.filename is not None and matrix.flags.c_contiguous:
+        return matrix.filename, matrix.offset, matrix.shape, matrix.dtype.str
+    return None
+
+
+def open_mapped(source):
+    filename, offset, shape, dtype = source
+    return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
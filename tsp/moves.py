@@ -0,0 +1,202 @@
+import math
+from itertools import accumulate
+
+import numpy as np
+
+from .matrix import is_symmetric
+from .sparse import SparseMatrix
+
+INF = math.inf
+ROW_LIST_LIMIT = 1000
+
+
+def measure(weights):
+    missing = 0
+    total = 0
+    for weight in weights:
+        if weight == INF:
+            missing += 1
+        else:
+            total += weight
+    return missing, total
+
+
+def as_delta(missing, total):
+    if missing > 0:
+        return INF
+    if missing < 0:
+        return -INF
+    return total
+
+
+class MoveEngine:
+    def __init__(self, matrix, tour, symmetric=None):
+        if isinstance(matrix, SparseMatrix):
+            self.rows = matrix.rows()
+            self.symmetric = matrix.symmetric if symmetric is None else symmetric
+        else:
+            matrix = np.asarray(matrix)
+            # Python lists are the fastest to index one weight at a time, but take about four times
+            # the matrix; above ROW_LIST_LIMIT vertices the rows are views of the (possibly shared or
+            # memory-mapped) array instead.
+            self.rows = matrix.tolist() if len(matrix) <= ROW_LIST_LIMIT else list(matrix)
+            self.symmetric = is_symmetric(matrix) if symmetric is None else symmetric
+        self.reset(tour)
+
+    def reset(self, tour):
+        # Starts over from another tour on the same matrix, without converting it again.
+        self.tour = [int(v) for v in tour]
+        self.n = len(self.tour)
+        self.pos = [0] * self.n
+        for k, vertex in enumerate(self.tour):
+            self.pos[vertex] = k
+        self.missing, self.total = measure(self.arc_weights())
+        self.prefix_valid = False
+
+    @property
+    def cost(self):
+        return INF if self.missing else self.total
+
+    def arc_weights(self):
+        tour = self.tour
+        rows = self.rows
+        return [rows[tour[k - 1]][tour[k]] for k in range(self.n)]
+
+    def swap_delta(self, i, j):
+        tour = self.tour
+        rows = self.rows
+        n = self.n
+        a = tour[i]
+        b = tour[j]
+        positions = {(i - 1) % n, i, (j - 1) % n, j}
+
+        def at(k):
+            if k == i:
+                return b
+            if k == j:
+                return a
+            return tour[k]
+
+        old = measure([rows[tour[k]][tour[(k + 1) % n]] for k in positions])
+        new = measure([rows[at(k)][at((k + 1) % n)] for k in positions])
+        return new[0] - old[0], new[1] - old[1]
+
+    def apply_swap(self, i, j, delta):
+        tour = self.tour
+        tour[i], tour[j] = tour[j], tour[i]
+        self.pos[tour[i]] = i
+        self.pos[tour[j]] = j
+        self.missing += delta[0]
+        self.total += delta[1]
+        self.prefix_valid = False
+
+    def build_prefix(self):
+        tour = self.tour
+        rows = self.rows
+        n = self.n
+        forward = [rows[tour[k]][tour[(k + 1) % n]] for k in range(n)]
+        backward = [rows[tour[(k + 1) % n]][tour[k]] for k in range(n)]
+        self.forward_missing = list(accumulate((w == INF for w in forward), initial=0))
+        self.forward_total = list(accumulate((0 if w == INF else w for w in forward), initial=0))
+        self.backward_missing = list(accumulate((w == INF for w in backward), initial=0))
+        self.backward_total = list(accumulate((0 if w == INF else w for w in backward), initial=0))
+        self.prefix_valid = True
+
+    def segment_positions(self, i, j):
+        if i <= j:
+            return list(range(i, j + 1))
+        return list(range(i, self.n)) + list(range(0, j + 1))
+
+    def reverse_delta(self, i, j):
+        # Reverses the tour segment from position i to position j (wrapping past the end
+        # when i > j). On a directed graph every arc inside the segment flips direction,
+        # so its cost comes from the forward/backward prefix sums over the cycle.
+        n = self.n
+        length = (j - i) % n + 1
+        if length < 2:
+            return 0, 0
+        if length >= n - 1:
+            tour = self.tour.copy()
+            positions = self.segment_positions(i, j)
+            for k, value in zip(positions, [tour[k] for k in reversed(positions)]):
+                tour[k] = value
+            rows = self.rows
+            missing, total = measure([rows[tour[k - 1]][tour[k]] for k in range(n)])
+            return missing - self.missing, total - self.total
+
+        tour = self.tour
+        rows = self.rows
+        before = tour[i - 1]
+        after = tour[(j + 1) % n]
+        first = tour[i]
+        last = tour[j]
+
+        old = measure((rows[before][first], rows[last][after]))
+        new = measure((rows[before][last], rows[first][after]))
+        if self.symmetric:
+            return new[0] - old[0], new[1] - old[1]
+
+        if not self.prefix_valid:
+            self.build_prefix()
+        if i <= j:
+            forward_missing = self.forward_missing[j] - self.forward_missing[i]
+            forward_total = self.forward_total[j] - self.forward_total[i]
+            backward_missing = self.backward_missing[j] - self.backward_missing[i]
+            backward_total = self.backward_total[j] - self.backward_total[i]
+        else:
+            forward_missing = self.forward_missing[n] - self.forward_missing[i] + self.forward_missing[j]
+            forward_total = self.forward_total[n] - self.forward_total[i] + self.forward_total[j]
+            backward_missing = self.backward_missing[n] - self.backward_missing[i] + self.backward_missing[j]
+            backward_total = self.backward_total[n] - self.backward_total[i] + self.backward_total[j]
+        return (new[0] - old[0] + backward_missing - forward_missing,
+                new[1] - old[1] + backward_total - forward_total)
+
+    def apply_reverse(self, i, j, delta):
+        tour = self.tour
+        pos = self.pos
+        if i <= j:
+            tour[i:j + 1] = tour[i:j + 1][::-1]
+            for k in range(i, j + 1):
+                pos[tour[k]] = k
+        else:
+            positions = self.segment_positions(i, j)
+            values = [tour[k] for k in reversed(positions)]
+            for k, value in zip(positions, values):
+                tour[k] = value
+                pos[value] = k
+        self.missing += delta[0]
+        self.total += delta[1]
+        self.prefix_valid = False
+
+    def insert_delta(self, i, j, k):
+        # Moves the segment from position i to position j (wrapping when i > j) between
+        # tour[k] and its successor without reversing it, so on a directed graph only the
+        # three boundary arcs change. k must lie outside the segment and differ from i - 1.
+        tour = self.tour
+        rows = self.rows
+        n = self.n
+        before = tour[i - 1]
+        after = tour[(j + 1) % n]
+        first = tour[i]
+        last = tour[j]
+        t = tour[k]
+        u = tour[(k + 1) % n]
+
+        old = measure((rows[before][first], rows[last][after], rows[t][u]))
+        new = measure((rows[before][after], rows[t][first], rows[last][u]))
+        return new[0] - old[0], new[1] - old[1]
+
+    def apply_insert(self, i, j, k, delta):
+        tour = self.tour
+        pos = self.pos
+        n = self.n
+        length = (j - i) % n + 1
+        segment = [tour[(i + m) % n] for m in range(length)]
+        rest = [tour[(j + 1 + m) % n] for m in range(n - length)]
+        cut = (k - j - 1) % n + 1
+        tour[:] = rest[:cut] + segment + rest[cut:]
+        for m, vertex in enumerate(tour):
+            pos[vertex] = m
+        self.missing += delta[0]
+        self.total += delta[1]
+        self.prefix_valid = False
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from .annealing import ANNEALERS
+from .matrix import is_symmetric, mapped_source, open_mapped
+
+_shared = {}
+
+
+def chain_seeds(seed, chains):
+    return [int(s) for s in np.random.SeedSequence(seed).generate_state(chains)]
+
+
+def _attach(name, shape, dtype):
+    memory = SharedMemory(name=name)
+    _shared["memory"] = memory
+    _shared["matrix"] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def _map(source):
+    _shared["matrix"] = open_mapped(source)
+
+
+def _run_chain(args):
+    algo, chain, seed, options, telemetry = args
+    return run_chain(_shared["matrix"], algo, chain, seed, options, telemetry)
+
+
+def run_chain(matrix, algo, chain, seed, options=None, telemetry=False):
+    started = time.perf_counter()
+    records = [] if telemetry else None
+    observer = records.append if telemetry else None
+    tour, cost, stats = ANNEALERS[algo](matrix, seed, observer=observer, **(options or {}))
+    stats = dict(stats, chain=chain, seed=seed, cost=cost, time=time.perf_counter() - started)
+    if telemetry:
+        stats["telemetry"] = records
+    return tour, cost, stats
+
+
+def parallel_annealing(matrix, algo="sa", chains=4, seed=None, workers=None, options=None, telemetry=False):
+    source = mapped_source(matrix)
+    matrix = np.ascontiguousarray(matrix)
+    # Checked once here rather than by every chain on its copy of the matrix.
+    options = dict(options or {}, symmetric=is_symmetric(matrix))
+    seeds = chain_seeds(seed, chains)
+    tasks = [(algo, chain, chain_seed, options, telemetry) for chain, chain_seed in enumerate(seeds)]
+
+    if workers == 1 or chains == 1:
+        results = [run_chain(matrix, *task) for task in tasks]
+    elif source is not None:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_map, initargs=(source,)) as executor:
+            results = list(executor.map(_run_chain, tasks))
+    else:
+        memory = SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        try:
+            shared = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=memory.buf)
+            shared[:] = matrix
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(memory.name, matrix.shape, matrix.dtype.str)) as executor:
+                results = list(executor.map(_run_chain, tasks))
+            del shared
+        finally:
+            memory.close()
+            memory.unlink()
+
+    best_tour, best_cost, _ = min(results, key=lambda result: result[1])
+    return best_tour, best_cost, [stats for _, _, stats in results]
@@ -0,0 +1,245 @@
+from itertools import permutations
+
+from .graph import Graph
+
+
+class Infeasible(Exception):
+    pass
+
+
+def strongly_connected_components(out):
+    # Iterative Tarjan over adjacency lists; returns the component number of every vertex.
+    n = len(out)
+    index = [-1] * n
+    low = [0] * n
+    component = [-1] * n
+    on_stack = [False] * n
+    stack = []
+    counter = 0
+    components = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, iter(out[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            v, targets = work[-1]
+            for w in targets:
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, iter(out[w])))
+                    break
+                if on_stack[w]:
+                    low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component[w] = components
+                        if w == v:
+                            break
+                    components += 1
+    return component
+
+
+def articulation_point(neighbours):
+    # Iterative Hopcroft-Tarjan on an undirected graph; returns a cut vertex or None.
+    n = len(neighbours)
+    depth = [-1] * n
+    low = [0] * n
+    depth[0] = 0
+    children = 0
+    work = [(0, -1, iter(neighbours[0]))]
+    while work:
+        v, parent, targets = work[-1]
+        for w in targets:
+            if depth[w] == -1:
+                depth[w] = low[w] = depth[v] + 1
+                work.append((w, v, iter(neighbours[w])))
+                if v == 0:
+                    children += 1
+                break
+            if w != parent:
+                low[v] = min(low[v], depth[w])
+        else:
+            work.pop()
+            if parent >= 0:
+                low[parent] = min(low[parent], low[v])
+                if parent != 0 and low[v] >= depth[parent]:
+                    return parent
+    return 0 if children > 1 else None
+
+
+class Reduction:
+    # Result of presolve: chains of vertices joined by forced arcs, each contracted into one vertex
+    # of the reduced graph named after the chain's first vertex in the original order, or after
+    # vertex 1 if the chain holds it (nn starts from vertex 1). offset is
+    # the weight of the forced arcs, so a reduced tour costs exactly offset less than its expansion.
+    def __init__(self, graph, representatives, chains, offset, forced):
+        self.graph = graph
+        self.chains = chains
+        self.offset = offset
+        self.forced = forced
+        self.expansion = dict(zip(representatives, chains))
+
+    def expand(self, path):
+        # A representative inside its chain still starts the tour, as it did the reduced one.
+        expanded = [vertex_id for representative in path for vertex_id in self.expansion[representative]]
+        if not expanded:
+            return expanded
+        start = expanded.index(path[0])
+        return expanded[start:] + expanded[:start]
+
+    def reduce(self, path):
+        return [vertex_id for vertex_id in path if vertex_id in self.expansion]
+
+    def enumerate_tour(self):
+        # Up to three chains leave at most two tours to compare, no solver needed. The tours start
+        # at vertex 1 when the graph has one, as nn's and the exact solvers' do.
+        dm = self.graph.distance_matrix()
+        if len(dm) == 1:
+            return self.expand(dm.vertex_ids), self.offset
+        start = dm.index.get(1, 0)
+        others = [v for v in range(len(dm)) if v != start]
+        cost, tour = min((dm.tour_cost((start, *rest)), (start, *rest)) for rest in permutations(others))
+        return self.expand(dm.to_ids(tour)), dm.cost_value(cost) + self.offset
+
+
+def presolve(graph):
+    # Cheap necessary conditions for a Hamiltonian cycle, then forced-arc propagation:
+    # a vertex with a single out-arc (in-arc) must use it, which removes the other arcs into
+    # its target (out of its source) and the arc that would close the chain early.
+    # Raises Infeasible with the reason; returns None when nothing can be contracted.
+    sm = graph.sparse_matrix()
+    n = len(sm)
+    ids = sm.vertex_ids
+    indptr = sm.indptr.tolist()
+    targets = sm.indices.tolist()
+    out = [set(targets[indptr[v]:indptr[v + 1]]) for v in range(n)]
+    inn = [set() for _ in range(n)]
+    for v in range(n):
+        for w in out[v]:
+            inn[w].add(v)
+
+    if all(out[v] == inn[v] for v in range(n)):
+        check_undirected(out, ids)
+
+    succ = [-1] * n
+    pred = [-1] * n
+    end = list(range(n))
+    length = [1] * n
+    queue = list(range(n))
+    queued = [True] * n
+
+    def push(v):
+        if not queued[v]:
+            queued[v] = True
+            queue.append(v)
+
+    def remove(u, w):
+        if w in out[u]:
+            out[u].discard(w)
+            inn[w].discard(u)
+            push(u)
+            push(w)
+
+    def force(u, w):
+        if succ[u] == w:
+            return
+        if succ[u] != -1:
+            raise Infeasible(f"из вершины {ids[u]} выходят два обязательных ребра")
+        if pred[w] != -1:
+            raise Infeasible(f"в вершину {ids[w]} входят два обязательных ребра")
+        head, tail = end[u], end[w]
+        if head == w:
+            if length[u] < n:
+                raise Infeasible("обязательные рёбра образуют цикл, не проходящий через все вершины")
+        succ[u] = w
+        pred[w] = u
+        for x in list(out[u] - {w}):
+            remove(u, x)
+        for x in list(inn[w] - {u}):
+            remove(x, w)
+        if head != w:
+            end[head], end[tail] = tail, head
+            length[head] = length[tail] = length[head] + length[tail]
+            if length[head] < n:
+                remove(tail, head)
+
+    while queue:
+        v = queue.pop()
+        queued[v] = False
+        if not out[v]:
+            raise Infeasible(f"из вершины {ids[v]} не выходит ни одного ребра")
+        if not inn[v]:
+            raise Infeasible(f"в вершину {ids[v]} не входит ни одного ребра")
+        if len(out[v]) == 1 and succ[v] == -1:
+            force(v, next(iter(out[v])))
+        if len(inn[v]) == 1 and pred[v] == -1:
+            force(next(iter(inn[v])), v)
+
+    component = strongly_connected_components([list(arcs) for arcs in out])
+    if max(component) > 0:
+        raise Infeasible(f"граф не сильно связен (компонент: {max(component) + 1})")
+
+    forced = sum(1 for v in range(n) if succ[v] != -1)
+    if forced == 0:
+        return None
+    return contract(graph, sm, out, succ, pred, forced)
+
+
+def check_undirected(neighbours, ids):
+    degree = [len(arcs) for arcs in neighbours]
+    for v, d in enumerate(degree):
+        if d < 2:
+            raise Infeasible(f"у вершины {ids[v]} меньше двух соседей")
+        if sum(1 for w in neighbours[v] if degree[w] == 2) > 2:
+            raise Infeasible(f"к вершине {ids[v]} обязаны вести больше двух рёбер")
+    cut = articulation_point([list(arcs) for arcs in neighbours])
+    if cut is not None:
+        raise Infeasible(f"вершина {ids[cut]} разделяет граф на части")
+
+
+def contract(graph, sm, out, succ, pred, forced):
+    n = len(sm)
+    ids = sm.vertex_ids
+    heads = [v for v in range(n) if pred[v] == -1] or [0]
+    chains = []
+    chain_of = {}
+    offset = 0.0
+    for head in heads:
+        chain = [head]
+        while succ[chain[-1]] not in (-1, head):
+            chain.append(succ[chain[-1]])
+        chain_of[head] = len(chains)
+        chains.append(chain)
+        offset += sm.lookup(chain[:-1], chain[1:]).sum()
+    if len(chains) == 1:
+        offset += sm[chains[0][-1], chains[0][0]]
+
+    # A chain is entered at its head and left from its tail, so reduced arcs are tail -> head.
+    coords = {vertex_id: (x, y) for vertex_id, x, y in graph.vertices}
+    representatives = [1 if 1 in (ids[v] for v in chain) else ids[min(chain)] for chain in chains]
+    vertices = [(representative, *coords[representative]) for representative in representatives]
+    edges = []
+    for a, chain in enumerate(chains):
+        tail = chain[-1]
+        for w in out[tail]:
+            if chain_of.get(w, a) != a:
+                edges.append((representatives[a], representatives[chain_of[w]], sm.cost_value(sm[tail, w])))
+
+    reduced = Graph(vertices, edges, graph.name)
+    chains = [[ids[v] for v in chain] for chain in chains]
+    return Reduction(reduced, representatives, chains, sm.cost_value(offset), forced)
@@ -0,0 +1,398 @@
+import functools
+import inspect
+import math
+import time
+
+import numpy as np
+
+from . import annealing
+from .colony import ant_colony_tour
+from .construction import multi_start_nearest_neighbour, nearest_neighbour
+from .cooling import SCHEDULES
+from .exact import HELD_KARP_MAX_VERTICES, branch_and_bound_tour, held_karp_dtype, held_karp_memory, held_karp_tour
+from .genetic import genetic_tour
+from .local_search import NEIGHBOURHOODS, OrOpt, TwoOpt, geometric_candidate_lists
+from .parallel import parallel_annealing
+from .presolve import Infeasible, presolve as presolve_graph
+from .telemetry import progress_observer, shifted
+from .tempering import tempering_tour
+
+SPARSE_DENSITY = 0.1
+
+
+class SolverError(Exception):
+    pass
+
+
+def translate_progress(dm, progress):
+    if progress is None:
+        return None
+
+    def report(iteration, temperature, best_cost, best_tour):
+        return progress(iteration, temperature, dm.cost_value(best_cost), dm.to_ids(best_tour))
+
+    return report
+
+
+def presolved(solver):
+    # Every solver starts with presolve: graphs that cannot have a tour fail at once, chains of
+    # forced arcs are contracted, and the reduced answer is expanded back to the original vertices.
+    @functools.wraps(solver)
+    def run(graph, *args, presolve=True, progress=None, stats=None, **options):
+        if progress is not None:
+            options["progress"] = progress
+        if not presolve or len(graph.vertices) < 3 or graph.complete:
+            return solver(graph, *args, stats=stats, **options)
+        try:
+            reduction = presolve_graph(graph)
+        except Infeasible as e:
+            raise SolverError(f"Невозможно найти путь: {e}")
+        if reduction is None:
+            return solver(graph, *args, stats=stats, **options)
+
+        if stats is not None:
+            stats["forced_arcs"] = reduction.forced
+            stats["reduced_vertices"] = len(reduction.graph.vertices)
+        if len(reduction.graph.vertices) < 4:
+            path, cost = reduction.enumerate_tour()
+            if not math.isfinite(cost):
+                raise SolverError("Невозможно найти путь")
+            # Enumeration is exact whatever solver was asked for, and says so in stats.
+            if stats is not None:
+                stats.update(lower_bound=cost, gap=0.0, optimal=True, enumerated=True)
+            return path, cost
+
+        if progress is not None:
+            def report(iteration, temperature, best_cost, best_tour):
+                return progress(iteration, temperature, best_cost + reduction.offset, reduction.expand(best_tour))
+            options["progress"] = report
+        if options.get("observer") is not None:
+            options["observer"] = shifted(options["observer"], reduction.offset)
+        for option in ("incumbent", "initial"):
+            if isinstance(options.get(option), list):
+                options[option] = reduction.reduce(options[option])
+        path, cost = solver(reduction.graph, *args, stats=stats, **options)
+        cost += reduction.offset
+        if stats is not None and "lower_bound" in stats:
+            stats["lower_bound"] += reduction.offset
+            stats["gap"] = max(cost - stats["lower_bound"], 0) / max(abs(cost), 1e-12)
+        return reduction.expand(path), cost
+
+    return run
+
+
+def observed(solver):
+    # observer(record) receives telemetry dicts: the annealers send one per temperature step with
+    # acceptance and timings, the other solvers one per progress report. A final record with
+    # "done" closes the run, with "optimal" when the solver knows whether its tour is optimal.
+    # Without an observer the solver runs untouched.
+    parameters = inspect.signature(solver).parameters
+    native = "observer" in parameters
+
+    @functools.wraps(solver)
+    def run(graph, *args, observer=None, **options):
+        if observer is None:
+            return solver(graph, *args, **options)
+        started = time.perf_counter()
+        if options.get("stats") is None:
+            options["stats"] = {}
+        stats = options["stats"]
+        if native:
+            options["observer"] = observer
+        elif "progress" in parameters:
+            options["progress"] = progress_observer(observer, options.get("progress"))
+        try:
+            path, cost = solver(graph, *args, **options)
+        except SolverError as e:
+            observer({"done": True, "time": time.perf_counter() - started, "error": str(e)})
+            raise
+        record = {"done": True, "time": time.perf_counter() - started, "best": cost}
+        if "optimal" in stats:
+            record["optimal"] = stats["optimal"]
+        observer(record)
+        return path, cost
+
+    return run
+
+
+def construction_matrix(graph, backend="auto"):
+    # Nearest neighbour and local search only walk existing arcs, so below SPARSE_DENSITY of all
+    # n(n-1) arcs they run on the CSR matrix and never allocate the dense n x n one.
+    if backend == "auto":
+        n = len(graph.vertices)
+        sparse = graph.matrix is None and len(graph.edges) <= SPARSE_DENSITY * n * (n - 1)
+        backend = "sparse" if sparse else "dense"
+    if backend == "sparse":
+        return graph.sparse_matrix()
+    if backend == "dense":
+        return graph.distance_matrix()
+    raise SolverError(f"Неизвестное представление графа: {backend}")
+
+
+@observed
+@presolved
+def calculate_tsp(graph, stats=None, backend="auto"):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+    if 1 not in vertex_ids:
+        raise SolverError("Вершина 1 не существует!")
+
+    dm = construction_matrix(graph, backend)
+    tour, distance, complete = nearest_neighbour(dm.matrix, dm.index[1])
+    if not complete:
+        raise SolverError("Невозможно найти путь: тупиковая ситуация")
+    if distance == np.inf:
+        raise SolverError("Невозможно найти путь: нет обратного ребра")
+    if stats is not None:
+        stats["evaluations"] = len(vertex_ids)
+    return dm.to_ids(tour), dm.cost_value(distance)
+
+
+@observed
+@presolved
+def calculate_tsp_modified(graph, best_improvement=False, top_k=1, workers=None, progress=None, candidates="matrix",
+                           local_search="auto", stats=None, backend="auto"):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+
+    dm = construction_matrix(graph, backend)
+    starting_tours = multi_start_nearest_neighbour(dm.matrix, k=top_k, workers=workers)
+    if not starting_tours:
+        raise SolverError("Невозможно найти путь")
+
+    neighbours = None
+    if candidates == "geometric":
+        neighbours = geometric_candidate_lists([(x, y) for _, x, y in graph.vertices], dm.matrix)
+    if local_search == "auto":
+        # Reversing a segment re-prices all of its arcs on a directed graph; keep orientation there.
+        local_search = "2-opt" if dm.symmetric else "or-2opt"
+    if local_search not in NEIGHBOURHOODS:
+        raise SolverError(f"Неизвестная окрестность локального поиска: {local_search}")
+
+    best_tour = None
+    best_distance = np.inf
+    evaluations = len(vertex_ids) ** 2
+    for _, tour in starting_tours:
+        if local_search == "2-opt":
+            search = TwoOpt(dm.matrix, tour, neighbours, best_improvement=best_improvement)
+        else:
+            search = OrOpt(dm.matrix, tour, neighbours, best_improvement=best_improvement, neighbourhood=local_search)
+        tour = search.run(translate_progress(dm, progress))
+        evaluations += search.evaluations
+        distance = dm.tour_cost(tour)
+        if best_tour is None or distance < best_distance:
+            best_tour = tour
+            best_distance = distance
+        if search.stopped:
+            break
+
+    if stats is not None:
+        stats["evaluations"] = evaluations
+    return dm.to_ids(best_tour), dm.cost_value(best_distance)
+
+
+def replay_telemetry(chain_stats, observer):
+    # Chains in other processes cannot call the observer, so their records come back with the results.
+    for chain in chain_stats:
+        for record in chain.pop("telemetry", ()):
+            observer(dict(record, chain=chain["chain"]))
+
+
+def annealing_options(dm, schedule, acceptance, patience, initial):
+    if isinstance(schedule, str) and schedule not in SCHEDULES:
+        raise SolverError(f"Неизвестное расписание охлаждения: {schedule}")
+    if acceptance is not None and not 0 < acceptance < 1:
+        raise SolverError("Доля принимаемых ходов при начальной температуре должна быть в интервале (0, 1)")
+    options = {} if schedule is None else {"schedule": schedule}
+    if acceptance is not None:
+        options["acceptance"] = acceptance
+    if patience is not None:
+        options["patience"] = patience
+    if initial is not None:
+        if len(initial) != len(dm) or set(initial) != set(dm.vertex_ids):
+            raise SolverError("Начальный тур должен проходить по всем вершинам графа ровно один раз")
+        options["initial"] = dm.to_indices(initial).tolist()
+    return options
+
+
+@observed
+@presolved
+def simulated_annealing(graph, seed=None, chains=1, workers=None, schedule="geometric", acceptance=None, patience=None,
+                        initial=None, progress=None, observer=None, stats=None):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+
+    dm = graph.distance_matrix()
+    options = annealing_options(dm, schedule, acceptance, patience, initial)
+    if chains > 1:
+        best_tour, best_cost, chain_stats = parallel_annealing(dm.matrix, "sa", chains, seed, workers, options,
+                                                               telemetry=observer is not None)
+        replay_telemetry(chain_stats, observer)
+    else:
+        best_tour, best_cost, run_stats = annealing.simulated_annealing_tour(
+            dm.matrix, seed, translate_progress(dm, progress), observer=observer, **options)
+        chain_stats = [run_stats]
+    if stats is not None:
+        stats["evaluations"] = sum(chain["evaluations"] for chain in chain_stats)
+    return dm.to_ids(best_tour), dm.cost_value(best_cost)
+
+
+@observed
+@presolved
+def boltzmann_annealing(graph, seed=None, chains=1, workers=None, schedule="adaptive", acceptance=None,
+                        patience=None, initial=None, progress=None, observer=None, stats=None):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+
+    dm = graph.distance_matrix()
+    options = annealing_options(dm, schedule, acceptance, patience, initial)
+    if chains > 1:
+        best_tour, best_cost, chain_stats = parallel_annealing(dm.matrix, "boltzmann", chains, seed, workers, options,
+                                                               telemetry=observer is not None)
+        replay_telemetry(chain_stats, observer)
+    else:
+        best_tour, best_cost, run_stats = annealing.boltzmann_annealing_tour(
+            dm.matrix, seed, translate_progress(dm, progress), observer=observer, **options)
+        chain_stats = [run_stats]
+    if stats is not None:
+        stats["evaluations"] = sum(chain["evaluations"] for chain in chain_stats)
+    return dm.to_ids(best_tour), dm.cost_value(best_cost)
+
+
+@observed
+@presolved
+def parallel_tempering(graph, seed=None, replicas=16, candidates=16, acceptance=None, patience=None, initial=None,
+                       progress=None, observer=None, stats=None):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+    if replicas < 2 or candidates < 1:
+        raise SolverError("Нужно не меньше двух реплик и хотя бы один ход-кандидат за раунд")
+
+    dm = graph.distance_matrix()
+    options = annealing_options(dm, None, acceptance, patience, initial)
+    best_tour, best_cost, run_stats = tempering_tour(dm.matrix, seed, translate_progress(dm, progress), replicas,
+                                                     candidates, observer=observer, **options)
+    if stats is not None:
+        stats.update(run_stats)
+    return dm.to_ids(best_tour), dm.cost_value(best_cost)
+
+
+@observed
+@presolved
+def genetic(graph, seed=None, population=100, generations=500, elite=2, mutation_rate=0.2, progress=None,
+            stats=None):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+
+    dm = graph.distance_matrix()
+    best_tour, best_cost, run_stats = genetic_tour(dm.matrix, seed, population, generations, elite, mutation_rate,
+                                                   translate_progress(dm, progress))
+    if stats is not None:
+        stats.update(run_stats)
+    return dm.to_ids(best_tour), dm.cost_value(best_cost)
+
+
+@observed
+@presolved
+def ant_colony(graph, seed=None, ants=None, iterations=200, local_search=None, progress=None, stats=None):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+
+    dm = graph.distance_matrix()
+    if local_search == "auto":
+        local_search = "2-opt" if dm.symmetric else "or-2opt"
+    if local_search is not None and local_search not in NEIGHBOURHOODS:
+        raise SolverError(f"Неизвестная окрестность локального поиска: {local_search}")
+    best_tour, best_cost, run_stats = ant_colony_tour(dm.matrix, seed, ants, iterations, local_search=local_search,
+                                                      progress=translate_progress(dm, progress))
+    if stats is not None:
+        stats.update(run_stats)
+    return dm.to_ids(best_tour), dm.cost_value(best_cost)
+
+
+def held_karp_memory_estimate(graph):
+    n = len(graph.vertices)
+    return held_karp_memory(n, held_karp_dtype(graph.distance_matrix().matrix))
+
+
+@observed
+@presolved
+def held_karp(graph, progress=None, stats=None):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+    if len(vertex_ids) > HELD_KARP_MAX_VERTICES:
+        raise SolverError(f"Точное решение доступно не более чем для {HELD_KARP_MAX_VERTICES} вершин")
+
+    dm = graph.distance_matrix()
+    best_tour, best_cost = held_karp_tour(dm.matrix, translate_progress(dm, progress))
+    if best_tour is None:
+        raise SolverError("Расчёт остановлен")
+    if best_cost == np.inf:
+        raise SolverError("Невозможно найти путь")
+    if stats is not None:
+        stats["evaluations"] = (1 << (len(dm) - 1)) * (len(dm) - 1) ** 2
+    return dm.to_ids(best_tour), dm.cost_value(best_cost)
+
+
+@observed
+@presolved
+def branch_and_bound(graph, time_limit=10.0, incumbent="nn-2opt", seed=None, progress=None, stats=None):
+    vertex_ids = graph.vertex_ids
+    if len(vertex_ids) < 2:
+        raise SolverError("Недостаточно вершин для решения задачи")
+
+    dm = graph.distance_matrix()
+    initial = None
+    if isinstance(incumbent, str):
+        try:
+            if incumbent in RANDOMIZED:
+                path, _ = SOLVERS[incumbent](graph, seed=seed)
+            else:
+                path, _ = SOLVERS[incumbent](graph)
+            initial = dm.to_indices(path)
+        except SolverError:
+            pass
+    elif incumbent is not None:
+        initial = dm.to_indices(incumbent)
+
+    best_tour, best_cost, search_stats = branch_and_bound_tour(dm.matrix, initial, time_limit,
+                                                               translate_progress(dm, progress), dm.integral)
+    if stats is not None:
+        stats.update(search_stats)
+    if best_tour is None:
+        if not np.isfinite(search_stats["lower_bound"]):
+            raise SolverError("Невозможно найти путь")
+        raise SolverError("Путь не найден за отведённое время")
+    return dm.to_ids(best_tour), dm.cost_value(best_cost)
+
+
+SOLVERS = {
+    "nn": calculate_tsp,
+    "nn-2opt": calculate_tsp_modified,
+    "sa": simulated_annealing,
+    "boltzmann": boltzmann_annealing,
+    "pt": parallel_tempering,
+    "ga": genetic,
+    "aco": ant_colony,
+    "held-karp": held_karp,
+    "bnb": branch_and_bound,
+}
+
+RANDOMIZED = {"sa", "boltzmann"}
+SEEDED = RANDOMIZED | {"pt", "bnb", "ga", "aco"}
+
+
+def solve(graph, algo, seed=None, **options):
+    if algo not in SOLVERS:
+        raise SolverError(f"Неизвестный алгоритм: {algo}")
+    if algo in SEEDED:
+        return SOLVERS[algo](graph, seed=seed, **options)
+    return SOLVERS[algo](graph, **options)
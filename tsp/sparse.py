@@ -0,0 +1,144 @@
+import math
+
+import numpy as np
+
+from .matrix import DistanceMatrix
+
+
+class SparseRow(dict):
+    # Row of a MoveEngine: arcs that are not stored cost inf.
+    def __missing__(self, key):
+        return math.inf
+
+
+class SparseMatrix:
+    # CSR adjacency: the arcs leaving vertex i go to indices[indptr[i]:indptr[i + 1]], sorted by
+    # weight (ties by target), with their weights alongside. Memory and build time are O(n + arcs).
+    # Point lookups go through the arcs sorted by key row * n + col; anything not stored costs inf.
+    def __init__(self, vertex_ids, indptr, indices, weights, integral=False):
+        self.vertex_ids = list(vertex_ids)
+        self.index = {vertex_id: i for i, vertex_id in enumerate(self.vertex_ids)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.integral = integral
+        n = len(self.vertex_ids)
+        keys = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.indptr)) * n + self.indices
+        self.key_order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.key_order]
+
+    @classmethod
+    def from_arrays(cls, vertex_ids, rows, cols, weights, integral=False):
+        n = len(vertex_ids)
+        keep = rows != cols
+        rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        # A repeated arc keeps its last weight, as in DistanceMatrix.from_edges.
+        _, last = np.unique((rows * n + cols)[::-1], return_index=True)
+        last = len(rows) - 1 - last
+        rows, cols, weights = rows[last], cols[last], weights[last]
+        order = np.lexsort((cols, weights, rows))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(vertex_ids, indptr, cols[order], weights[order], integral)
+
+    @classmethod
+    def from_edges(cls, vertex_ids, edges):
+        vertex_ids = list(vertex_ids)
+        index = {vertex_id: i for i, vertex_id in enumerate(vertex_ids)}
+        rows = np.fromiter((index[s] for s, _, _ in edges), dtype=np.int64, count=len(edges))
+        cols = np.fromiter((index[e] for _, e, _ in edges), dtype=np.int64, count=len(edges))
+        weights = np.array([w for _, _, w in edges], dtype=np.float64)
+        integral = all(isinstance(w, int) for _, _, w in edges)
+        return cls.from_arrays(vertex_ids, rows, cols, weights, integral)
+
+    @classmethod
+    def from_dense(cls, dm):
+        rows, cols = np.nonzero(np.isfinite(dm.matrix))
+        return cls.from_arrays(dm.vertex_ids, rows, cols, dm.matrix[rows, cols], dm.integral)
+
+    def dense(self):
+        n = len(self)
+        matrix = np.full((n, n), np.inf)
+        matrix[np.repeat(np.arange(n), np.diff(self.indptr)), self.indices] = self.weights
+        return DistanceMatrix(self.vertex_ids, matrix, self.integral)
+
+    def transpose(self):
+        rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.indptr))
+        return SparseMatrix.from_arrays(self.vertex_ids, self.indices, rows, self.weights, self.integral)
+
+    @property
+    def matrix(self):
+        # Solvers hand dm.matrix to construction and local search, which accept the CSR form as is.
+        return self
+
+    def __len__(self):
+        return len(self.vertex_ids)
+
+    def __getitem__(self, item):
+        i, j = item
+        return float(self.lookup(np.array([i]), np.array([j]))[0])
+
+    @property
+    def arcs(self):
+        return len(self.indices)
+
+    @property
+    def symmetric(self):
+        transposed = self.transpose()
+        return bool(np.array_equal(self.keys, transposed.keys)
+                    and np.array_equal(self.weights[self.key_order], transposed.weights[transposed.key_order]))
+
+    def lookup(self, rows, cols):
+        keys = np.asarray(rows, dtype=np.int64) * len(self) + np.asarray(cols, dtype=np.int64)
+        if not len(self.keys):
+            return np.full(keys.shape, np.inf)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[positions] == keys
+        return np.where(found, self.weights[self.key_order[positions]], np.inf)
+
+    def row(self, i):
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def rows(self):
+        indices = self.indices.tolist()
+        weights = self.weights.tolist()
+        indptr = self.indptr.tolist()
+        return [SparseRow(zip(indices[indptr[i]:indptr[i + 1]], weights[indptr[i]:indptr[i + 1]]))
+                for i in range(len(self))]
+
+    def candidate_lists(self, k=10):
+        indices = self.indices.tolist()
+        indptr = self.indptr.tolist()
+        return [indices[indptr[i]:min(indptr[i] + k, indptr[i + 1])] for i in range(len(self))]
+
+    def sorted_rows(self, k=16):
+        # The k cheapest targets of every vertex, padded with -1 where a vertex has fewer arcs.
+        n = len(self)
+        degrees = np.diff(self.indptr)
+        k = max(1, min(k, int(degrees.max(initial=0))))
+        order = np.full((n, k), -1, dtype=np.int64)
+        slots = np.arange(k)
+        taken = slots < degrees[:, None]
+        order[taken] = self.indices[(self.indptr[:-1, None] + slots)[taken]]
+        return order
+
+    def to_indices(self, path):
+        return np.array([self.index[vertex_id] for vertex_id in path], dtype=np.int64)
+
+    def to_ids(self, tour):
+        return [self.vertex_ids[i] for i in tour]
+
+    def tour_cost(self, tour):
+        tour = np.asarray(tour)
+        return float(self.lookup(tour, np.roll(tour, -1)).sum())
+
+    def batch_tour_cost(self, tours):
+        tours = np.asarray(tours)
+        return self.lookup(tours, np.roll(tours, -1, axis=1)).sum(axis=1)
+
+    def cost_value(self, cost):
+        cost = float(cost)
+        if self.integral and math.isfinite(cost):
+            return int(cost)
+        return cost
@@ -0,0 +1,97 @@
+import math
+
+
+class GridIndex:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+    def cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, item):
+        self.cells.setdefault(self.cell(item.x, item.y), []).append(item)
+        self.count += 1
+
+    def remove(self, item):
+        key = self.cell(item.x, item.y)
+        bucket = self.cells.get(key)
+        if bucket is None or item not in bucket:
+            return
+        bucket.remove(item)
+        if not bucket:
+            del self.cells[key]
+        self.count -= 1
+
+    def clear(self):
+        self.cells.clear()
+        self.count = 0
+
+    def ring(self, cx, cy, r):
+        if r == 0:
+            yield cx, cy
+            return
+        for i in range(cx - r, cx + r + 1):
+            yield i, cy - r
+            yield i, cy + r
+        for j in range(cy - r + 1, cy + r):
+            yield cx - r, j
+            yield cx + r, j
+
+    def within(self, x, y, radius):
+        x0, y0 = self.cell(x - radius, y - radius)
+        x1, y1 = self.cell(x + radius, y + radius)
+        found = []
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                for item in self.cells.get((i, j), ()):
+                    if (item.x - x) ** 2 + (item.y - y) ** 2 < radius ** 2:
+                        found.append(item)
+        return found
+
+    def nearest(self, x, y, radius):
+        found = self.within(x, y, radius)
+        if not found:
+            return None
+        return min(found, key=lambda item: (item.x - x) ** 2 + (item.y - y) ** 2)
+
+    def k_nearest(self, x, y, k, exclude=None):
+        cx, cy = self.cell(x, y)
+        found = []
+        seen = 0
+        r = 0
+        while seen < self.count:
+            for key in self.ring(cx, cy, r):
+                for item in self.cells.get(key, ()):
+                    seen += 1
+                    if item is not exclude:
+                        found.append(((item.x - x) ** 2 + (item.y - y) ** 2, item))
+            # cells outside the rings visited so far are at least r * cell_size away
+            if len(found) >= k:
+                found.sort(key=lambda pair: pair[0])
+                if found[k - 1][0] <= (r * self.cell_size) ** 2:
+                    break
+            r += 1
+        found.sort(key=lambda pair: pair[0])
+        return [item for _, item in found[:k]]
+
+
+class Point:
+    def __init__(self, index, x, y):
+        self.index = index
+        self.x = x
+        self.y = y
+
+
+def candidate_lists_from_coords(coords, k=10):
+    points = [Point(i, x, y) for i, (x, y) in enumerate(coords)]
+    if not points:
+        return []
+    xs = [p.x for p in points]
+    ys = [p.y for p in points]
+    area = max(max(xs) - min(xs), 1) * max(max(ys) - min(ys), 1)
+    grid = GridIndex(math.sqrt(area * 2 / len(points)))
+    for point in points:
+        grid.insert(point)
+    return [[p.index for p in grid.k_nearest(point.x, point.y, k, exclude=point)] for point in points]
@@ -0,0 +1,54 @@
+import json
+import math
+import time
+
+
+def progress_observer(observer, progress=None):
+    # Solvers without their own telemetry report through progress; every report becomes a record.
+    started = time.perf_counter()
+
+    def report(iteration, temperature, best_cost, best_tour):
+        observer({"iteration": iteration, "time": time.perf_counter() - started, "temperature": temperature,
+                  "best": best_cost})
+        return progress is not None and progress(iteration, temperature, best_cost, best_tour)
+
+    return report
+
+
+def shifted(observer, offset):
+    # Costs of a reduced graph differ from the original by a constant.
+    def report(record):
+        record = dict(record)
+        for key in ("best", "current"):
+            if record.get(key) is not None:
+                record[key] += offset
+        observer(record)
+
+    return report
+
+
+def json_value(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class JsonlTrace:
+    # Observer that writes every record as a line of JSON; context is merged into each record,
+    # so one trace can hold several runs. Infinite costs are written as null.
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.context = {}
+
+    def __call__(self, record):
+        record = {key: json_value(value) for key, value in {**self.context, **record}.items()}
+        self.file.write(json.dumps(record, ensure_ascii=False, default=float) + "\n")
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
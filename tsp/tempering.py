@@ -0,0 +1,232 @@
+import itertools
+import time
+
+import numpy as np
+
+from .annealing import COLD_ACCEPTANCE, WARM_ACCEPTANCE
+from .cooling import calibrate_temperature
+from .matrix import tour_cost
+
+SWAP_SHARE = 0.3
+
+
+class ReplicaMoves:
+    # Random moves for a whole batch of tours at once: every row gets its own move, drawn from one
+    # batch of random numbers, and its delta comes from one gather of the tour positions it touches
+    # and one of the arcs it removes and adds. Missing arcs are counted apart from the finite
+    # weights, as (missing, total) in MoveEngine. Position 0 of a tour never moves; a cycle does
+    # not depend on where it starts.
+    # Arcs of each move kind as indices into its touched positions, removed ones first.
+    ARCS = {
+        # i - 1, i, i + 1, j - 1, j, j + 1
+        "swap": ([0, 1, 3, 4, 0, 4, 3, 1], [1, 2, 4, 5, 4, 2, 1, 5]),
+        # i - 1, i, j, j + 1
+        "reverse": ([0, 2, 0, 1], [1, 3, 2, 3]),
+        # i - 1, i, j, j + 1, k, k + 1: segment i..j goes after k
+        "insert": ([0, 2, 4, 0, 4, 2], [1, 3, 5, 3, 1, 5]),
+    }
+
+    def __init__(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        finite = np.isfinite(matrix)
+        self.n = len(matrix)
+        self.weights = np.where(finite, matrix, 0.0)
+        # The diagonal is never part of a tour.
+        np.fill_diagonal(finite, True)
+        self.missing = None if finite.all() else (~finite).astype(np.int64)
+        self.symmetric = bool(np.array_equal(matrix, matrix.T))
+        self.signs = {kind: np.repeat([-1.0, 1.0], len(starts) // 2) for kind, (starts, _) in self.ARCS.items()}
+
+    def measure(self, tours):
+        successors = np.roll(tours, -1, axis=1)
+        total = self.weights[tours, successors].sum(axis=1)
+        if self.missing is None:
+            return np.zeros(len(tours), dtype=np.int64), total
+        return self.missing[tours, successors].sum(axis=1), total
+
+    def propose(self, kind, shape, rng):
+        # Positions 1 <= i < j <= n - 1 and the positions the move touches, stacked along a new
+        # second to last axis; an insertion also gets the position k its segment goes after.
+        n = self.n
+        if kind != "insert":
+            i = rng.integers(1, n - 1, size=shape)
+            j = i + 1 + (rng.random(shape) * (n - 1 - i)).astype(np.int64)
+            if kind == "reverse":
+                return i, j, None, np.stack((i - 1, i, j, (j + 1) % n), axis=-2)
+            # Adjacent positions share the arc i -> j, which only turns around; with j - 1 replaced
+            # by j the extra arcs are a loop j -> j, removed and added again.
+            before = np.where(j == i + 1, j, j - 1)
+            return i, j, None, np.stack((i - 1, i, i + 1, before, j, (j + 1) % n), axis=-2)
+        # A segment i..j of at most n - 2 vertices, so that there is somewhere else to put it.
+        i = rng.integers(1, n, size=shape)
+        j = np.minimum(i + (rng.random(shape) * (n - i)).astype(np.int64), i + n - 3)
+        skipped = j - i + 2
+        k = (rng.random(shape) * (n - skipped)).astype(np.int64)
+        k = np.where(k < i - 1, k, k + skipped)
+        return i, j, k, np.stack((i - 1, i, j, (j + 1) % n, k, (k + 1) % n), axis=-2)
+
+    def delta(self, kind, tours, positions):
+        # positions: (..., touched, rows) as from propose(); the deltas come back as (..., rows).
+        vertices = tours[np.arange(len(tours)), positions]
+        starts, ends = self.ARCS[kind]
+        starts, ends = np.take(vertices, starts, axis=-2), np.take(vertices, ends, axis=-2)
+        total = self.signs[kind] @ self.weights[starts, ends]
+        if self.missing is None:
+            return np.zeros(total.shape, dtype=np.int64), total
+        return self.signs[kind].astype(np.int64) @ self.missing[starts, ends], total
+
+    def apply(self, kind, tours, rows, i, j, k):
+        if kind == "swap":
+            first = tours[rows, i]
+            tours[rows, i] = tours[rows, j]
+            tours[rows, j] = first
+            return
+        # Every accepted row is rearranged by one gather through a per-row permutation of positions.
+        p = np.arange(self.n)[None, :]
+        i, j = i[:, None], j[:, None]
+        if kind == "reverse":
+            source = np.where((p >= i) & (p <= j), i + j - p, p)
+        else:
+            k = k[:, None]
+            length = j - i + 1
+            before = k < i
+            source = np.select(
+                [before & (p > k) & (p <= k + length), before & (p > k + length) & (p <= j),
+                 ~before & (p >= i) & (p <= k - length), ~before & (p > k - length) & (p <= k)],
+                [i + p - k - 1, p - length, p + length, i + p - (k - length + 1)], p)
+        tours[rows] = np.take_along_axis(tours[rows], source, axis=1)
+
+
+def exchange(temps, missing, total, tours, offset, rng):
+    # Replica exchange between neighbouring temperatures (slots offset, offset + 2, ... and the next
+    # ones): configurations swap with probability min(1, exp((1 / T_cold - 1 / T_hot) * (E_cold - E_hot))),
+    # a configuration with fewer missing arcs always moves to the colder slot.
+    cold = np.arange(offset, len(temps) - 1, 2)
+    hot = cold + 1
+    if len(cold) == 0:
+        return 0
+    gap = total[cold] - total[hot]
+    with np.errstate(over="ignore"):
+        probability = np.exp(np.minimum((1 / temps[cold] - 1 / temps[hot]) * gap, 0.0))
+    swap = np.where(missing[cold] == missing[hot], rng.random(len(cold)) < probability, missing[cold] > missing[hot])
+    cold, hot = cold[swap], hot[swap]
+    for values in (missing, total, tours):
+        values[cold], values[hot] = values[hot].copy(), values[cold].copy()
+    return len(cold)
+
+
+def small_tour(matrix):
+    # Fewer than four vertices: every tour through vertex 0 is checked.
+    n = len(matrix)
+    tours = [[0, *rest] for rest in itertools.permutations(range(1, n))]
+    costs = [tour_cost(matrix, tour) for tour in tours]
+    best = int(np.argmin(costs))
+    return tours[best], costs[best], {"evaluations": len(tours), "accepted": 0, "steps": 0, "exchanges": 0}
+
+
+def tempering_tour(matrix, seed=None, progress=None, replicas=16, candidates=16, steps=200, iterations=100,
+                   acceptance=None, final_acceptance=0.001, samples=200, patience=20, observer=None, initial=None):
+    # Parallel tempering: replicas tours live in one (replicas, n) array, each at its own fixed
+    # temperature on a geometric ladder calibrated like the start and the end of anneal(). A step is
+    # iterations rounds in which every replica tries one move, all replicas together through array
+    # operations, followed by an exchange between neighbouring temperatures. The run stops after
+    # steps steps or patience steps without a new best tour. Moves are swaps and, in the remaining
+    # rounds, segment reversals, or on asymmetric weights segment insertions.
+    # In a round every replica evaluates candidates moves against its current tour and makes the
+    # first one that passes the Metropolis test. A rejected move leaves the tour as it was, so this is
+    # the same chain as trying them one by one, but a cold replica gets candidates tries per round.
+    matrix = np.asarray(matrix)
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    if n < 4:
+        return small_tour(matrix)
+
+    moves = ReplicaMoves(matrix)
+    segment = "reverse" if moves.symmetric else "insert"
+    replicas = max(replicas, 2)
+    if initial is None:
+        tours = rng.permuted(np.tile(np.arange(n), (replicas, 1)), axis=1)
+    else:
+        tours = np.tile(np.asarray(initial, dtype=np.int64), (replicas, 1))
+    if acceptance is None:
+        acceptance = COLD_ACCEPTANCE if initial is None else WARM_ACCEPTANCE
+
+    sampled = tours[np.arange(samples) % replicas]
+    kinds = rng.random(samples) < SWAP_SHARE
+    deltas = []
+    for kind, rows in (("swap", kinds), (segment, ~kinds)):
+        *_, positions = moves.propose(kind, int(rows.sum()), rng)
+        missing, total = moves.delta(kind, sampled[rows], positions)
+        deltas.extend(total[missing == 0].tolist())
+    hottest = calibrate_temperature(deltas, acceptance) or 1.0
+    coldest = calibrate_temperature(deltas, final_acceptance) or hottest
+    if coldest >= hottest:
+        coldest = hottest * final_acceptance
+    temps = coldest * (hottest / coldest) ** (np.arange(replicas) / (replicas - 1))
+
+    missing, total = moves.measure(tours)
+    best = int(np.lexsort((total, missing))[0])
+    best_tour, best_key = tours[best].copy(), (int(missing[best]), float(total[best]))
+    evaluations = samples
+    accepted_total = exchanges = 0
+    stagnant = 0
+    step = 0
+    replica_rows = np.arange(replicas)
+    clock = time.perf_counter
+    started = clock()
+
+    for step in range(1, steps + 1):
+        step_started = clock()
+        accepted = 0
+        swaps = rng.random(iterations) < SWAP_SHARE
+        shape = (iterations, candidates, replicas)
+        proposals = {kind: moves.propose(kind, shape, rng) for kind in ("swap", segment)}
+        thresholds = -temps * np.log(1 - rng.random(shape))
+        tried = 0
+        improved = False
+        for round_, swap in enumerate(swaps):
+            kind = "swap" if swap else segment
+            i, j, k, positions = (None if values is None else values[round_] for values in proposals[kind])
+            delta_missing, delta_total = moves.delta(kind, tours, positions)
+            # Metropolis: u < exp(-delta / T) is delta < -T ln u, drawn for the whole step at once.
+            accept = (delta_missing < 0) | ((delta_missing == 0) & (delta_total < thresholds[round_]))
+            first = accept.argmax(axis=0)
+            rows = np.flatnonzero(accept[first, replica_rows])
+            tried += candidates * replicas - int((candidates - 1 - first[rows]).sum())
+            if len(rows) == 0:
+                continue
+            first = first[rows]
+            moves.apply(kind, tours, rows, i[first, rows], j[first, rows], None if k is None else k[first, rows])
+            missing[rows] += delta_missing[first, rows]
+            total[rows] += delta_total[first, rows]
+            accepted += len(rows)
+
+            coldest_missing = missing[rows].min()
+            lowest = rows[missing[rows] == coldest_missing]
+            row = int(lowest[total[lowest].argmin()])
+            if (int(missing[row]), float(total[row])) < best_key:
+                best_tour, best_key = tours[row].copy(), (int(missing[row]), float(total[row]))
+                improved = True
+
+        evaluations += tried
+        # Summed again from scratch once a step, so the deltas do not drift.
+        missing, total = moves.measure(tours)
+        accepted_total += accepted
+        stagnant = 0 if improved else stagnant + 1
+        exchanges += exchange(temps, missing, total, tours, step % 2, rng)
+
+        best_cost = tour_cost(matrix, best_tour)
+        if observer is not None:
+            now = clock()
+            observer({"step": step, "iteration": evaluations, "time": now - started, "temperature": float(temps[0]),
+                      "best": best_cost, "current": float(total[0]) if missing[0] == 0 else float("inf"),
+                      "acceptance": accepted / tried, "evaluations_per_second": tried / (now - step_started),
+                      "exchanges": exchanges})
+        if progress is not None and progress(evaluations, float(temps[0]), best_cost, best_tour):
+            break
+        if stagnant >= patience:
+            break
+
+    stats = {"evaluations": evaluations, "accepted": accepted_total, "steps": step, "exchanges": exchanges,
+             "replicas": replicas, "initial_temperature": float(temps[-1])}
+    return best_tour.tolist(), tour_cost(matrix, best_tour), stats
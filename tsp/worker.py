@@ -0,0 +1,71 @@
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from .solvers import SolverError
+
+
+class SolverWorker(QThread):
+    progress = pyqtSignal(int, object, object)
+    improved = pyqtSignal(list, object)
+    done = pyqtSignal(list, object, bool)
+    failed = pyqtSignal(str)
+    telemetry = pyqtSignal(object)
+
+    def __init__(self, task, interval=0.1):
+        super().__init__()
+        self.task = task
+        self.interval = interval
+        self.cancelled = False
+        self.best_cost = None
+        self.best_tour = []
+        self.pending = False
+        self.last_emit = 0
+        self.records = []
+        self.last_flush = 0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, iteration, temperature, best_cost, best_tour):
+        if best_tour and (self.best_cost is None or best_cost < self.best_cost):
+            self.best_cost = best_cost
+            self.best_tour = list(best_tour)
+            self.pending = True
+
+        now = time.perf_counter()
+        if now - self.last_emit >= self.interval:
+            self.last_emit = now
+            self.progress.emit(iteration, temperature, best_cost)
+            if self.pending:
+                self.pending = False
+                self.improved.emit(self.best_tour, self.best_cost)
+        return self.cancelled
+
+    def observe(self, record):
+        # Telemetry records are sent in batches so that a fast solver does not flood the GUI thread.
+        self.records.append(record)
+        now = time.perf_counter()
+        if now - self.last_flush >= self.interval:
+            self.flush(now)
+
+    def flush(self, now):
+        self.last_flush = now
+        if self.records:
+            records, self.records = self.records, []
+            self.telemetry.emit(records)
+
+    def run(self):
+        try:
+            tour, cost = self.task(self.report, self.observe)
+        except SolverError as e:
+            self.flush(time.perf_counter())
+            self.failed.emit(str(e))
+            return
+        except Exception as e:
+            # An exception escaping QThread.run aborts the process and leaves the window busy.
+            self.flush(time.perf_counter())
+            self.failed.emit(f"Ошибка решателя: {type(e).__name__} {e}".rstrip())
+            return
+        self.flush(time.perf_counter())
+        self.done.emit(tour, cost, self.cancelled)